@@ -2,6 +2,7 @@
 Bariq Al-Yusr Application Factory
 """
 import os
+import click
 from flask import Flask, jsonify, send_from_directory
 from app.config import config
 from app.extensions import db, migrate, jwt, cors, limiter, socketio
@@ -24,6 +25,11 @@ def create_app(config_name=None):
     )
     app.config.from_object(config[config_name])
 
+    # orjson-backed jsonify/get_json when orjson is installed
+    from app.utils.json_provider import ORJSON_AVAILABLE, OrjsonProvider
+    if ORJSON_AVAILABLE and app.config.get('ORJSON_ENABLED', True):
+        app.json = OrjsonProvider(app)
+
     # Initialize extensions
     register_extensions(app)
 
@@ -54,6 +60,30 @@ def register_extensions(app):
     limiter.init_app(app)
     socketio.init_app(app)
 
+    from app.utils.report_cache import report_cache
+    report_cache.init_app(app)
+
+    from app.tasks.report_jobs import report_jobs
+    report_jobs.init_app(app)
+
+    from app.utils.admin_live_counters import admin_live_counters
+    admin_live_counters.init_app(app)
+
+    from app.utils.customer_search import customer_search
+    customer_search.init_app(app)
+
+    from app.utils.customer_lookup_cache import customer_lookup_cache
+    customer_lookup_cache.init_app(app)
+
+    from app.tasks.periodic import periodic_tasks
+    periodic_tasks.init_app(app)
+
+    from app.utils.reference_allocator import reference_allocator
+    reference_allocator.init_app(app)
+
+    from app.utils.idempotency import idempotency_store
+    idempotency_store.init_app(app)
+
     # JWT error handlers
     @jwt.expired_token_loader
     def expired_token_callback(jwt_header, jwt_payload):
@@ -166,3 +196,161 @@ def register_cli_commands(app):
         from scripts.seed_data import seed_all
         seed_all()
         print('Database seeded!')
+
+    @app.cli.command('rebuild-sales-rollup')
+    @click.option('--from-date', default=None, help='First day to rebuild (YYYY-MM-DD)')
+    @click.option('--to-date', default=None, help='Last day to rebuild (YYYY-MM-DD)')
+    def rebuild_sales_rollup(from_date, to_date):
+        """Rebuild the daily sales rollup from transactions"""
+        from app.services.sales_rollup_service import SalesRollupService
+        result = SalesRollupService.rebuild(from_date=from_date, to_date=to_date)
+        if not result['success']:
+            print(result['message'])
+            return
+        print(f"Sales rollup rebuilt: {result['data']['rows']} rows")
+
+    @app.cli.command('refresh-analytics-snapshot')
+    @click.option('--full', is_flag=True, help='Rebuild the snapshot from scratch')
+    def refresh_analytics_snapshot(full):
+        """Refresh the columnar snapshot used by admin analytics"""
+        from app.services.analytics_snapshot_service import AnalyticsSnapshotService
+        if not AnalyticsSnapshotService.is_enabled():
+            print('Analytics snapshot is disabled (numpy missing or ANALYTICS_SNAPSHOT_ENABLED=false)')
+            return
+        result = AnalyticsSnapshotService.refresh(full=full)
+        if not result['success']:
+            print(result['message'])
+            return
+        rows = ', '.join(f'{name}: {count}' for name, count in result['data']['rows'].items())
+        print(f'Analytics snapshot refreshed ({rows})')
+
+    @app.cli.command('rebuild-customer-search')
+    def rebuild_customer_search():
+        """Recompute customer search documents (run after migrating)"""
+        from app.utils.customer_search import customer_search
+        result = customer_search.rebuild()
+        if not result['success']:
+            print(result['message'])
+            return
+        print(f"Customer search rebuilt: {result['data']['updated']} customers updated")
+
+    @app.cli.command('mark-overdue-transactions')
+    @click.option('--batch-size', default=1000, help='Transactions per batch')
+    def mark_overdue_transactions(batch_size):
+        """Mark confirmed transactions past their due date as overdue (safe to re-run)"""
+        from app.services.transaction_service import TransactionService
+
+        def progress(metrics):
+            print(f"  batch {metrics['batches']}: {metrics['marked']} marked ({metrics['duration_ms']} ms)")
+
+        result = TransactionService.mark_overdue_transactions(batch_size=batch_size, progress=progress)
+        print(result['message'])
+
+    @app.cli.command('expire-pending-transactions')
+    @click.option('--minutes', default=None, type=int, help='Age in minutes (default PENDING_TRANSACTION_EXPIRY_MINUTES)')
+    @click.option('--batch-size', default=500, help='Transactions per batch')
+    def expire_pending_transactions(minutes, batch_size):
+        """Cancel pending transactions the customer did not confirm in time"""
+        from app.services.transaction_service import TransactionService
+
+        def progress(metrics):
+            print(f"  batch {metrics['batches']}: {metrics['expired']} expired ({metrics['duration_ms']} ms)")
+
+        result = TransactionService.expire_pending_transactions(
+            max_age_minutes=minutes, batch_size=batch_size, progress=progress
+        )
+        print(result['message'])
+
+    @app.cli.command('send-payment-reminders')
+    @click.option('--batch-size', default=1000, help='Transactions per batch')
+    def send_payment_reminders(batch_size):
+        """Remind customers of transactions due in PAYMENT_REMINDER_DAYS days (safe to re-run the same day)"""
+        from app.services.payment_service import PaymentService
+
+        def progress(metrics):
+            print(f"  batch {metrics['batches']}: {metrics['sent']} sent, {metrics['skipped']} skipped, "
+                  f"{metrics['failed']} failed ({metrics['duration_ms']} ms)")
+
+        result = PaymentService.send_payment_reminders(batch_size=batch_size, progress=progress)
+        print(result['message'])
+
+    @app.cli.command('rekey-uuid7')
+    @click.option('--table', 'tables', multiple=True,
+                  help='Table to rekey (repeatable; default transactions, payments, notifications, audit_logs)')
+    @click.option('--batch-size', default=1000, help='Rows per batch')
+    @click.option('--dry-run', is_flag=True, help='Only count the rows still on UUIDv4 keys')
+    def rekey_uuid7(tables, batch_size, dry_run):
+        """Move existing rows to time-ordered UUIDv7 keys, updating every reference (maintenance window)"""
+        from app.services.analytics_snapshot_service import AnalyticsSnapshotService
+        from app.utils.id_rekey import REKEY_TABLES, rekey_table
+        from app.utils.report_cache import report_cache
+
+        def progress(metrics):
+            print(f"  {metrics['table']} batch {metrics['batches']}: {metrics['rekeyed']} rows, "
+                  f"{metrics['references']} references ({metrics['duration_ms']} ms)")
+
+        for table_name in tables or REKEY_TABLES:
+            result = rekey_table(table_name, batch_size=batch_size, dry_run=dry_run, progress=progress)
+            if not result['success']:
+                print(result['message'])
+                return
+            data = result['data']
+            if dry_run:
+                print(f"{table_name}: {data['pending']} rows to rekey")
+            else:
+                print(f"{table_name}: rekeyed {data['rekeyed']} rows and {data['references']} references")
+
+        if not dry_run:
+            # Cached reports may name the old ids
+            report_cache.clear()
+            print('Report cache cleared')
+            # The analytics snapshot is keyed by id: merging into it would keep every old id as well
+            if AnalyticsSnapshotService.is_enabled():
+                result = AnalyticsSnapshotService.refresh(full=True)
+                if not result['success']:
+                    print(f"{result['message']}; run refresh-analytics-snapshot --full before serving admin reports")
+                    return
+                print('Analytics snapshot rebuilt (running workers reload it on their next admin report)')
+            else:
+                AnalyticsSnapshotService.discard()
+                print('Analytics snapshot discarded (rebuilt on the next refresh once enabled)')
+
+    @app.cli.command('ensure-transaction-partitions')
+    @click.option('--months-ahead', default=None, type=int,
+                  help='Months after the current one (default TRANSACTION_PARTITION_MONTHS_AHEAD)')
+    def ensure_transaction_partitions(months_ahead):
+        """Create upcoming monthly partitions of transactions (PostgreSQL)"""
+        from app.services.partition_service import PartitionService
+
+        result = PartitionService.ensure_partitions(months_ahead=months_ahead)
+        if not result['success']:
+            print(result['message'])
+            return
+        created = result['data']['created']
+        print(f"Created {len(created)} partitions" + (f": {', '.join(created)}" if created else ''))
+
+    @app.cli.command('archive-transaction-partitions')
+    @click.option('--retention-months', default=None, type=int,
+                  help='Months kept attached (default TRANSACTION_ARCHIVE_RETENTION_MONTHS)')
+    @click.option('--mode', type=click.Choice(['detach', 'move']), default='detach',
+                  help='detach: move each partition into the archive schema; move: copy rows into archive.transactions')
+    @click.option('--dry-run', is_flag=True, help='Only report what would be archived')
+    def archive_transaction_partitions(retention_months, mode, dry_run):
+        """Archive monthly transaction partitions older than the retention window (PostgreSQL)"""
+        from app.services.partition_service import PartitionService
+
+        result = PartitionService.archive_partitions(retention_months=retention_months, mode=mode, dry_run=dry_run)
+        if not result['success']:
+            print(result['message'])
+            return
+        data = result['data']
+        verb = 'Would archive' if dry_run else 'Archived'
+        print(f"{verb} {len(data['archived'])} partitions before {data['cutoff']}")
+        for name in data['archived']:
+            print(f"  {name}")
+        for skipped in data['skipped']:
+            if 'referenced_by' in skipped:
+                references = ', '.join(f'{count} {table}' for table, count in skipped['referenced_by'].items())
+                print(f"  skipped {skipped['partition']}: referenced by {references}")
+            else:
+                print(f"  skipped {skipped['partition']}: {skipped['open_transactions']} open transactions")
@@ -3,6 +3,7 @@ Admin Routes
 """
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, current_user
+from app.utils.pagination import paginate, pagination_args
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -30,15 +31,12 @@ def get_customers():
     status = request.args.get('status')
     search = request.args.get('search')
     city = request.args.get('city')
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
 
     result = AdminService.get_customers(
         status=status,
         search=search,
         city=city,
-        page=page,
-        per_page=per_page
+        **pagination_args()
     )
 
     return jsonify(result)
@@ -138,9 +136,8 @@ def get_credit_requests():
     from app.services.admin_service import AdminService
 
     status = request.args.get('status')
-    page = request.args.get('page', 1, type=int)
 
-    result = AdminService.get_credit_requests(status=status, page=page)
+    result = AdminService.get_credit_requests(status=status, **pagination_args())
 
     return jsonify(result)
 
@@ -199,15 +196,12 @@ def get_merchants():
     status = request.args.get('status')
     business_type = request.args.get('business_type')
     search = request.args.get('search')
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
 
     result = AdminService.get_merchants(
         status=status,
         business_type=business_type,
         search=search,
-        page=page,
-        per_page=per_page
+        **pagination_args()
     )
 
     return jsonify(result)
@@ -298,16 +292,13 @@ def get_transactions():
     merchant_id = request.args.get('merchant_id')
     from_date = request.args.get('from_date')
     to_date = request.args.get('to_date')
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
 
     result = AdminService.get_transactions(
         status=status,
         merchant_id=merchant_id,
         from_date=from_date,
         to_date=to_date,
-        page=page,
-        per_page=per_page
+        **pagination_args()
     )
 
     return jsonify(result)
@@ -334,12 +325,11 @@ def get_settlements():
 
     status = request.args.get('status')
     merchant_id = request.args.get('merchant_id')
-    page = request.args.get('page', 1, type=int)
 
     result = SettlementService.get_all_settlements(
         status=status,
         merchant_id=merchant_id,
-        page=page
+        **pagination_args()
     )
 
     return jsonify(result)
@@ -472,6 +462,87 @@ def get_reports_financial():
     return jsonify(result)
 
 
+@admin_bp.route('/reports/jobs', methods=['POST'])
+@jwt_required()
+def submit_report_job():
+    """Run a report in the background"""
+    from app.tasks.report_jobs import report_jobs
+
+    data = request.get_json() or {}
+
+    result = report_jobs.submit(
+        data.get('report_type', 'overview'),
+        {
+            'from_date': data.get('from_date'),
+            'to_date': data.get('to_date')
+        }
+    )
+
+    if not result['success']:
+        return jsonify(result), 400
+
+    return jsonify(result), 202
+
+
+@admin_bp.route('/reports/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_report_job(job_id):
+    """Report job status"""
+    from app.tasks.report_jobs import report_jobs
+
+    job = report_jobs.get(job_id)
+
+    if not job:
+        return jsonify({
+            'success': False,
+            'message': 'Report job not found',
+            'error_code': 'REPORT_001'
+        }), 404
+
+    return jsonify({
+        'success': True,
+        'data': {'job': job}
+    })
+
+
+@admin_bp.route('/reports/jobs/<job_id>/result', methods=['GET'])
+@jwt_required()
+def get_report_job_result(job_id):
+    """Download the result of a finished report job"""
+    from app.tasks.report_jobs import report_jobs
+
+    job, result = report_jobs.get_result(job_id)
+
+    if not job:
+        return jsonify({
+            'success': False,
+            'message': 'Report job not found',
+            'error_code': 'REPORT_001'
+        }), 404
+
+    if result is None:
+        return jsonify({
+            'success': False,
+            'message': f"Report job is {job['status']}",
+            'error_code': 'REPORT_002',
+            'data': {'job': job}
+        }), 409
+
+    return jsonify(result)
+
+
+@admin_bp.route('/reports/cache-stats', methods=['GET'])
+@jwt_required()
+def get_reports_cache_stats():
+    """Report cache hit/miss metrics"""
+    from app.utils.report_cache import report_cache
+
+    return jsonify({
+        'success': True,
+        'data': report_cache.stats()
+    })
+
+
 # ==================== Audit Logs ====================
 
 @admin_bp.route('/audit-logs', methods=['GET'])
@@ -483,13 +554,12 @@ def get_audit_logs():
     actor_type = request.args.get('actor_type')
     action = request.args.get('action')
     from_date = request.args.get('from_date')
-    page = request.args.get('page', 1, type=int)
 
     result = AuditService.get_audit_logs(
         actor_type=actor_type,
         action=action,
         from_date=from_date,
-        page=page
+        **pagination_args()
     )
 
     return jsonify(result)
@@ -507,8 +577,6 @@ def get_payments():
     customer_id = request.args.get('customer_id')
     from_date = request.args.get('from_date')
     to_date = request.args.get('to_date')
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
 
     query = Payment.query
 
@@ -517,19 +585,13 @@ def get_payments():
     if customer_id:
         query = query.filter(Payment.customer_id == customer_id)
 
-    query = query.order_by(Payment.created_at.desc())
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+    pagination = paginate(query, order_by=(Payment.created_at, Payment.id), **pagination_args())
 
     return jsonify({
         'success': True,
         'data': {
             'payments': [p.to_dict() for p in pagination.items],
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': pagination.total,
-                'pages': pagination.pages
-            }
+            'pagination': pagination.pagination
         }
     })
 
@@ -4,6 +4,8 @@ Customer Routes
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, current_user
 from app.extensions import limiter
+from app.utils.idempotency import idempotent
+from app.utils.pagination import pagination_args
 
 customers_bp = Blueprint('customers', __name__)
 
@@ -141,14 +143,11 @@ def get_transactions():
 
     # Get query params
     status = request.args.get('status')
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
 
     result = TransactionService.get_customer_transactions(
         identity['id'],
         status=status,
-        page=page,
-        per_page=per_page
+        **pagination_args()
     )
 
     return jsonify(result)
@@ -232,13 +231,10 @@ def get_payments():
     from app.services.payment_service import PaymentService
 
     identity = current_user
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
 
     result = PaymentService.get_customer_payments(
         identity['id'],
-        page=page,
-        per_page=per_page
+        **pagination_args()
     )
 
     return jsonify(result)
@@ -246,6 +242,7 @@ def get_payments():
 
 @customers_bp.route('/me/payments', methods=['POST'])
 @jwt_required()
+@idempotent('payments.create')
 def make_payment():
     """Make a payment for one or multiple transactions"""
     from app.services.payment_service import PaymentService
@@ -288,6 +285,36 @@ def make_payment():
     return jsonify(result), 201
 
 
+@customers_bp.route('/me/payments/bulk', methods=['POST'])
+@jwt_required()
+@idempotent('payments.bulk')
+def make_bulk_payment():
+    """Pay an amount across outstanding transactions, oldest first"""
+    from app.services.payment_service import PaymentService
+
+    identity = current_user
+    data = request.get_json() or {}
+
+    amount = data.get('amount')
+    if not amount:
+        return jsonify({
+            'success': False,
+            'message': 'amount is required',
+            'error_code': 'VAL_001'
+        }), 400
+
+    result = PaymentService.make_bulk_payment(
+        identity['id'],
+        amount,
+        data.get('payment_method', 'card')
+    )
+
+    if not result['success']:
+        return jsonify(result), 400
+
+    return jsonify(result), 201
+
+
 # ==================== Stores ====================
 
 @customers_bp.route('/stores', methods=['GET'])
@@ -298,14 +325,11 @@ def get_stores():
 
     city = request.args.get('city')
     search = request.args.get('search')
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
 
     result = MerchantService.get_stores_for_customer(
         city=city,
         search=search,
-        page=page,
-        per_page=per_page
+        **pagination_args()
     )
 
     return jsonify(result)
@@ -335,12 +359,11 @@ def get_notifications():
 
     identity = current_user
     unread_only = request.args.get('unread_only', 'false').lower() == 'true'
-    page = request.args.get('page', 1, type=int)
 
     result = NotificationService.get_customer_notifications(
         identity['id'],
         unread_only=unread_only,
-        page=page
+        **pagination_args()
     )
 
     return jsonify(result)
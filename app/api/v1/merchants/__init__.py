@@ -1,8 +1,10 @@
 """
 Merchant Routes
 """
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 from flask_jwt_extended import jwt_required, current_user
+from app.utils.idempotency import idempotent
+from app.utils.pagination import pagination_args
 
 merchants_bp = Blueprint('merchants', __name__)
 
@@ -16,14 +18,11 @@ def get_public_merchants():
 
     category = request.args.get('category')
     search = request.args.get('search')
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
 
     result = MerchantService.get_public_merchants(
         category=category,
         search=search,
-        page=page,
-        per_page=per_page
+        **pagination_args()
     )
 
     return jsonify(result)
@@ -231,7 +230,8 @@ def get_staff():
         identity['merchant_id'],
         requester_id=identity['id'],
         role=role,
-        branch_id=branch_id
+        branch_id=branch_id,
+        **pagination_args()
     )
 
     if not result['success'] and result.get('error_code') == 'AUTH_003':
@@ -306,9 +306,9 @@ def update_staff(staff_id):
 @jwt_required()
 def lookup_customer(bariq_id):
     """Look up customer by Bariq ID for transaction"""
-    from app.models.customer import Customer
+    from app.utils.customer_lookup_cache import customer_lookup_cache
 
-    customer = Customer.query.filter_by(bariq_id=bariq_id).first()
+    customer = customer_lookup_cache.get(bariq_id)
 
     if not customer:
         return jsonify({
@@ -336,6 +336,7 @@ def lookup_customer(bariq_id):
 
 @merchants_bp.route('/me/transactions', methods=['POST'])
 @jwt_required()
+@idempotent('transactions.create')
 def create_transaction():
     """Create new transaction/invoice"""
     from app.services.transaction_service import TransactionService
@@ -363,6 +364,30 @@ def create_transaction():
     return jsonify(result), 201
 
 
+@merchants_bp.route('/me/transactions/batch', methods=['POST'])
+@jwt_required()
+@idempotent('transactions.batch')
+def create_transactions_batch():
+    """Create queued transactions in one request (POS offline sync)"""
+    from app.services.transaction_service import TransactionService
+
+    identity = current_user
+    data = request.get_json() or {}
+
+    result = TransactionService.create_transactions_batch(
+        merchant_id=identity['merchant_id'],
+        branch_id=data.get('branch_id') or identity.get('branch_id'),
+        cashier_id=identity['id'],
+        transactions=data.get('transactions')
+    )
+
+    if not result['success']:
+        return jsonify(result), 400
+
+    # 207: entries succeeded or failed individually, see data.results
+    return jsonify(result), 201 if result['data']['failed'] == 0 else 207
+
+
 @merchants_bp.route('/me/transactions', methods=['GET'])
 @jwt_required()
 def get_transactions():
@@ -375,8 +400,6 @@ def get_transactions():
     status = request.args.get('status')
     from_date = request.args.get('from_date')
     to_date = request.args.get('to_date')
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
 
     result = TransactionService.get_merchant_transactions(
         merchant_id=identity['merchant_id'],
@@ -385,8 +408,7 @@ def get_transactions():
         status=status,
         from_date=from_date,
         to_date=to_date,
-        page=page,
-        per_page=per_page
+        **pagination_args()
     )
 
     if not result['success'] and result.get('error_code') == 'AUTH_003':
@@ -395,6 +417,40 @@ def get_transactions():
     return jsonify(result)
 
 
+@merchants_bp.route('/me/transactions/export', methods=['GET'])
+@jwt_required()
+def export_transactions():
+    """Stream transactions as CSV or NDJSON (role-filtered, unpaginated)"""
+    from app.services.transaction_service import TransactionService
+
+    identity = current_user
+
+    result = TransactionService.export_merchant_transactions(
+        merchant_id=identity['merchant_id'],
+        staff_id=identity['id'],
+        branch_id=request.args.get('branch_id'),
+        status=request.args.get('status'),
+        from_date=request.args.get('from_date'),
+        to_date=request.args.get('to_date'),
+        export_format=request.args.get('format', 'csv').lower()
+    )
+
+    if not result['success']:
+        if result.get('error_code') == 'AUTH_003':
+            return jsonify(result), 403
+        return jsonify(result), 400
+
+    export = result['data']
+    return Response(
+        stream_with_context(export['stream']),
+        content_type=export['content_type'],
+        headers={
+            'Content-Disposition': f"attachment; filename={export['filename']}",
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+
 @merchants_bp.route('/me/transactions/<transaction_id>', methods=['GET'])
 @jwt_required()
 def get_transaction(transaction_id):
@@ -487,7 +543,8 @@ def get_returns():
         staff_id=identity['id'],
         branch_id=branch_id,
         from_date=from_date,
-        to_date=to_date
+        to_date=to_date,
+        **pagination_args()
     )
 
     if not result['success'] and result.get('error_code') == 'AUTH_003':
@@ -564,14 +621,13 @@ def get_settlements():
 
     status = request.args.get('status')
     branch_id = request.args.get('branch_id')
-    page = request.args.get('page', 1, type=int)
 
     result = SettlementService.get_merchant_settlements(
         merchant_id=identity['merchant_id'],
         staff_id=identity['id'],
         branch_id=branch_id,
         status=status,
-        page=page
+        **pagination_args()
     )
 
     if not result['success'] and result.get('error_code') == 'AUTH_003':
@@ -725,12 +781,11 @@ def get_staff_notifications():
 
     identity = current_user
     unread_only = request.args.get('unread_only', 'false').lower() == 'true'
-    page = request.args.get('page', 1, type=int)
 
     result = NotificationService.get_merchant_staff_notifications(
         identity['id'],
         unread_only=unread_only,
-        page=page
+        **pagination_args()
     )
 
     return jsonify(result)
@@ -881,16 +936,13 @@ def get_my_transactions():
     status = request.args.get('status')
     from_date = request.args.get('from_date')
     to_date = request.args.get('to_date')
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
 
     result = TransactionService.get_staff_transactions(
         staff_id=identity['id'],
         status=status,
         from_date=from_date,
         to_date=to_date,
-        page=page,
-        per_page=per_page
+        **pagination_args()
     )
 
     return jsonify(result)
@@ -41,11 +41,57 @@ class Config:
     DEFAULT_COMMISSION_RATE = 2.5  # Percentage
     MIN_TRANSACTION_AMOUNT = 10  # SAR
     MAX_TRANSACTION_AMOUNT = 2000  # SAR
+    TRANSACTION_BATCH_MAX_SIZE = int(os.environ.get('TRANSACTION_BATCH_MAX_SIZE', '100'))  # POS offline sync
+    PENDING_TRANSACTION_EXPIRY_MINUTES = int(os.environ.get('PENDING_TRANSACTION_EXPIRY_MINUTES', '0'))  # 0 = never expire (opt-in)
+    PENDING_EXPIRY_SWEEP_INTERVAL = int(os.environ.get('PENDING_EXPIRY_SWEEP_INTERVAL', '60'))  # Seconds, 0 = cron only
+    TRANSACTION_PARTITION_MONTHS_AHEAD = int(os.environ.get('TRANSACTION_PARTITION_MONTHS_AHEAD', '3'))  # PostgreSQL monthly partitions kept ready
+    TRANSACTION_PARTITION_CHECK_INTERVAL = int(os.environ.get('TRANSACTION_PARTITION_CHECK_INTERVAL', '21600'))  # Seconds, 0 = cron only
+    TRANSACTION_ARCHIVE_RETENTION_MONTHS = int(os.environ.get('TRANSACTION_ARCHIVE_RETENTION_MONTHS', '24'))  # Months kept attached
+    TRANSACTION_ARCHIVE_SCHEMA = os.environ.get('TRANSACTION_ARCHIVE_SCHEMA', 'archive')
+    PAYMENT_REMINDER_DAYS = [int(days) for days in os.environ.get('PAYMENT_REMINDER_DAYS', '3,1,0').split(',')]  # Days before the due date
+    REFERENCE_BLOCK_SIZE = int(os.environ.get('REFERENCE_BLOCK_SIZE', '100'))  # Reference numbers reserved per worker at a time
+
+    # JSON responses (orjson encoder when installed)
+    ORJSON_ENABLED = os.environ.get('ORJSON_ENABLED', 'true').lower() == 'true'
 
     # Pagination
     DEFAULT_PAGE_SIZE = 20
     MAX_PAGE_SIZE = 100
 
+    # Report Cache
+    REPORT_CACHE_ENABLED = os.environ.get('REPORT_CACHE_ENABLED', 'true').lower() == 'true'
+    REPORT_CACHE_BACKEND = os.environ.get('REPORT_CACHE_BACKEND', 'memory')  # memory, shared
+    REPORT_CACHE_URL = os.environ.get('REPORT_CACHE_URL', '')  # Redis URL for the shared backend (empty = local stand-in)
+    REPORT_CACHE_TTL = int(os.environ.get('REPORT_CACHE_TTL', '300'))  # Seconds
+    REPORT_CACHE_MAX_ENTRIES = int(os.environ.get('REPORT_CACHE_MAX_ENTRIES', '1000'))
+    ADMIN_DASHBOARD_CACHE_TTL = int(os.environ.get('ADMIN_DASHBOARD_CACHE_TTL', '15'))  # Seconds, 0 = off
+
+    # Customer lookup cache (Bariq ID -> status/credit for the POS flow; same backend choice as the report cache)
+    CUSTOMER_LOOKUP_CACHE_ENABLED = os.environ.get('CUSTOMER_LOOKUP_CACHE_ENABLED', 'true').lower() == 'true'
+    CUSTOMER_LOOKUP_CACHE_TTL = int(os.environ.get('CUSTOMER_LOOKUP_CACHE_TTL', '30'))  # Seconds
+    CUSTOMER_LOOKUP_CACHE_MAX_ENTRIES = int(os.environ.get('CUSTOMER_LOOKUP_CACHE_MAX_ENTRIES', '10000'))
+
+    # Admin live counters (socket pushes to admin_room)
+    ADMIN_LIVE_COUNTERS_INTERVAL = float(os.environ.get('ADMIN_LIVE_COUNTERS_INTERVAL', '1.0'))  # Seconds between pushes
+
+    # Idempotency keys (Idempotency-Key header on transaction and payment creation),
+    # kept in the REPORT_CACHE_BACKEND store so every worker sees them
+    IDEMPOTENCY_KEY_TTL = int(os.environ.get('IDEMPOTENCY_KEY_TTL', '86400'))  # Seconds a stored response is replayed
+    IDEMPOTENCY_MAX_KEYS = int(os.environ.get('IDEMPOTENCY_MAX_KEYS', '100000'))
+    IDEMPOTENCY_WAIT_TIMEOUT = int(os.environ.get('IDEMPOTENCY_WAIT_TIMEOUT', '30'))  # Seconds a repeat waits for the first request
+    IDEMPOTENCY_IN_FLIGHT_TTL = int(os.environ.get('IDEMPOTENCY_IN_FLIGHT_TTL', '300'))  # Seconds a key stays claimed if its worker dies mid-request
+
+    # Report Jobs (status and results kept in the REPORT_CACHE_BACKEND store: use 'shared' with more than one worker)
+    REPORT_JOB_WORKERS = int(os.environ.get('REPORT_JOB_WORKERS', '2'))
+    REPORT_JOB_RESULT_TTL = int(os.environ.get('REPORT_JOB_RESULT_TTL', '3600'))  # Seconds
+    REPORT_JOB_MAX_JOBS = int(os.environ.get('REPORT_JOB_MAX_JOBS', '1000'))
+
+    # Analytics Snapshot (columnar copy used by platform-wide admin reports; needs numpy)
+    ANALYTICS_SNAPSHOT_ENABLED = os.environ.get('ANALYTICS_SNAPSHOT_ENABLED', 'true').lower() == 'true'
+    ANALYTICS_SNAPSHOT_DIR = os.environ.get('ANALYTICS_SNAPSHOT_DIR', '')  # Empty = <instance>/analytics
+    ANALYTICS_SNAPSHOT_REFRESH_INTERVAL = int(os.environ.get('ANALYTICS_SNAPSHOT_REFRESH_INTERVAL', '300'))  # Seconds, 0 = cron only
+    ANALYTICS_SNAPSHOT_LOOKBACK = int(os.environ.get('ANALYTICS_SNAPSHOT_LOOKBACK', '300'))  # Seconds re-read before the watermark (late commits)
+
     # PayTabs Configuration
     PAYTABS_PROFILE_ID = os.environ.get('PAYTABS_PROFILE_ID', '')
     PAYTABS_SERVER_KEY = os.environ.get('PAYTABS_SERVER_KEY', '')
@@ -90,8 +136,9 @@ class DevelopmentConfig(Config):
 class TestingConfig(Config):
     """Testing configuration"""
     TESTING = True
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URL', 'sqlite:///:memory:')
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(minutes=5)
+    ANALYTICS_SNAPSHOT_DIR = None  # Keep the snapshot in memory only
 
 
 class ProductionConfig(Config):
@@ -21,6 +21,8 @@ from app.models.system_setting import SystemSetting
 from app.models.promotion import Promotion
 from app.models.customer_rating import CustomerRating
 from app.models.device import CustomerDevice, MerchantUserDevice
+from app.models.daily_sales_rollup import DailySalesRollup
+from app.models.reference_counter import ReferenceCounter
 
 __all__ = [
     'Customer',
@@ -43,4 +45,6 @@ __all__ = [
     'CustomerRating',
     'CustomerDevice',
     'MerchantUserDevice',
+    'DailySalesRollup',
+    'ReferenceCounter',
 ]
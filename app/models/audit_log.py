@@ -2,8 +2,8 @@
 Audit Log Model
 """
 from app.extensions import db
+from app.models.mixins import generate_uuid7
 from datetime import datetime
-import uuid
 
 
 class AuditLog(db.Model):
@@ -11,7 +11,7 @@ class AuditLog(db.Model):
 
     __tablename__ = 'audit_logs'
 
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = db.Column(db.String(36), primary_key=True, default=generate_uuid7)
 
     actor_type = db.Column(db.String(20), nullable=False, index=True)
     actor_id = db.Column(db.String(36), nullable=True)
@@ -1,11 +1,13 @@
 """
 Customer Model
 """
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy.orm.attributes import set_committed_value
 from app.extensions import db
 from app.models.mixins import TimestampMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 import uuid
-import random
 
 
 class Customer(db.Model, TimestampMixin):
@@ -36,10 +38,16 @@ class Customer(db.Model, TimestampMixin):
             return False
         return check_password_hash(self.password_hash, password)
 
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        if not self.bariq_id:
+            self.bariq_id = Customer.generate_bariq_id()
+
     @staticmethod
     def generate_bariq_id():
-        """Generate unique Bariq ID (6 digits)"""
-        return str(random.randint(100000, 999999))
+        """Generate unique Bariq ID (7 digits; the random ones issued before have 6)"""
+        from app.utils.reference_allocator import reference_allocator
+        return str(reference_allocator.allocate('BARIQ_ID', start=1000000))
 
     # Personal Info
     full_name_ar = db.Column(db.String(200), nullable=False)
@@ -72,6 +80,9 @@ class Customer(db.Model, TimestampMixin):
     last_login_at = db.Column(db.DateTime, nullable=True)
     verified_at = db.Column(db.DateTime, nullable=True)
 
+    # Normalized search document, maintained by app.utils.customer_search
+    search_text = db.Column(db.Text, nullable=True)
+
     # Relationships
     transactions = db.relationship('Transaction', back_populates='customer', lazy='dynamic')
     payments = db.relationship('Payment', back_populates='customer', lazy='dynamic')
@@ -79,6 +90,11 @@ class Customer(db.Model, TimestampMixin):
     notifications = db.relationship('Notification', back_populates='customer', lazy='dynamic')
     ratings = db.relationship('CustomerRating', back_populates='customer', lazy='dynamic')
 
+    __table_args__ = (
+        # Incremental refresh of the analytics snapshot reads rows by updated_at
+        db.Index('ix_customers_updated_at', 'updated_at'),
+    )
+
     def __repr__(self):
         return f'<Customer {self.national_id}>'
 
@@ -109,14 +125,72 @@ class Customer(db.Model, TimestampMixin):
 
         return data
 
+    # ==================== Credit ====================
+    #
+    # Credit balances are only changed with single conditional UPDATE
+    # statements, never read into Python and written back, so concurrent
+    # confirms, payments and webhook retries cannot lose each other's
+    # updates. The row stays locked until the surrounding transaction
+    # commits or rolls back.
+
+    def _apply_credit_update(self, values, *conditions):
+        from app.utils.customer_lookup_cache import customer_lookup_cache
+
+        row = db.session.execute(
+            db.update(Customer)
+            .where(Customer.id == self.id, *conditions)
+            .values(updated_at=datetime.utcnow(), **values)
+            .returning(Customer.credit_limit, Customer.available_credit, Customer.used_credit, Customer.updated_at)
+            .execution_options(synchronize_session=False)
+        ).first()
+        if row is None:
+            return False
+        for name in ('credit_limit', 'available_credit', 'used_credit', 'updated_at'):
+            set_committed_value(self, name, getattr(row, name))
+        customer_lookup_cache.mark_dirty(db.session, self.bariq_id)
+        return True
+
+    def reserve_credit(self, amount):
+        """
+        Move amount from available to used credit if the account is active
+        and enough credit is available.
+
+        Returns:
+            True if reserved, False otherwise
+        """
+        amount = Decimal(str(amount))
+        return self._apply_credit_update(
+            {
+                'available_credit': Customer.available_credit - amount,
+                'used_credit': Customer.used_credit + amount
+            },
+            Customer.status == 'active',
+            Customer.available_credit >= amount
+        )
+
+    def release_credit(self, amount):
+        """Move amount from used back to available credit (payments, returns)"""
+        amount = Decimal(str(amount))
+        return self._apply_credit_update({
+            'available_credit': Customer.available_credit + amount,
+            'used_credit': Customer.used_credit - amount
+        })
+
+    def set_credit_limit(self, new_limit):
+        """Set the credit limit; available credit becomes the new limit minus used credit"""
+        new_limit = Decimal(str(new_limit))
+        return self._apply_credit_update({
+            'credit_limit': new_limit,
+            'available_credit': new_limit - Customer.used_credit
+        })
+
     def update_credit_usage(self, amount, operation='use'):
         """Update credit usage"""
         if operation == 'use':
-            self.used_credit = float(self.used_credit) + amount
-            self.available_credit = float(self.credit_limit) - float(self.used_credit)
+            return self.reserve_credit(amount)
         elif operation == 'release':
-            self.used_credit = max(0, float(self.used_credit) - amount)
-            self.available_credit = float(self.credit_limit) - float(self.used_credit)
+            return self.release_credit(amount)
+        return False
 
     def can_purchase(self, amount):
         """Check if customer can make a purchase"""
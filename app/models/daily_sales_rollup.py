@@ -0,0 +1,51 @@
+"""
+Daily Sales Rollup Model
+"""
+from app.extensions import db
+from datetime import datetime
+import uuid
+
+
+class DailySalesRollup(db.Model):
+    """Daily Sales Rollup model - Pre-aggregated transaction totals for dashboards"""
+
+    __tablename__ = 'daily_sales_rollup'
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+
+    # Key: (rollup_date, merchant_id, branch_id, cashier_id, status)
+    rollup_date = db.Column(db.Date, nullable=False)
+    merchant_id = db.Column(db.String(36), db.ForeignKey('merchants.id'), nullable=False)
+    branch_id = db.Column(db.String(36), db.ForeignKey('branches.id'), nullable=False)
+    # Empty string when the transaction has no cashier (keeps the unique key usable on all databases)
+    cashier_id = db.Column(db.String(36), default='', nullable=False)
+    status = db.Column(db.String(20), nullable=False)
+
+    # Aggregates
+    transaction_count = db.Column(db.Integer, default=0, nullable=False)
+    total_amount = db.Column(db.Numeric(14, 2), default=0, nullable=False)
+    paid_amount = db.Column(db.Numeric(14, 2), default=0, nullable=False)
+    returned_amount = db.Column(db.Numeric(14, 2), default=0, nullable=False)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint(
+            'rollup_date', 'merchant_id', 'branch_id', 'cashier_id', 'status',
+            name='uq_daily_sales_rollup_key'
+        ),
+        db.Index('ix_daily_sales_rollup_merchant_date', 'merchant_id', 'rollup_date'),
+    )
+
+    def to_dict(self):
+        return {
+            'date': self.rollup_date.isoformat() if self.rollup_date else None,
+            'merchant_id': self.merchant_id,
+            'branch_id': self.branch_id,
+            'cashier_id': self.cashier_id or None,
+            'status': self.status,
+            'transaction_count': self.transaction_count,
+            'total_amount': float(self.total_amount),
+            'paid_amount': float(self.paid_amount),
+            'returned_amount': float(self.returned_amount),
+        }
@@ -4,6 +4,7 @@ Database Model Mixins
 from datetime import datetime
 from sqlalchemy import Column, DateTime
 from app.extensions import db
+from uuid6 import uuid7
 import uuid
 
 
@@ -22,12 +23,28 @@ class UUIDMixin:
         return str(uuid.uuid4())
 
 
+def generate_uuid7():
+    """
+    Time-ordered UUIDv7 primary key (as a 36-character string).
+
+    Keys start with the creation time in milliseconds, so new rows land at
+    the right-hand edge of the primary key index instead of on random
+    pages. Used by the high-insert tables; older random UUIDv4 keys stay
+    valid alongside them.
+    """
+    return str(uuid7())
+
+
 def generate_reference(prefix, length=5):
-    """Generate a reference number like BRQ-2024-00001"""
-    from datetime import datetime
-    import random
-    import string
+    """
+    Generate a unique reference number like BRQ-2024-100001.
+
+    Numbers come from a per-prefix, per-year series and are length + 1
+    digits, so they never match the length-digit random references
+    issued before.
+    """
+    from app.utils.reference_allocator import reference_allocator
 
     year = datetime.now().year
-    random_part = ''.join(random.choices(string.digits, k=length))
-    return f"{prefix}-{year}-{random_part}"
+    number = reference_allocator.allocate(f"{prefix}-{year}", start=10 ** length)
+    return f"{prefix}-{year}-{number}"
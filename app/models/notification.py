@@ -2,8 +2,7 @@
 Notification Model
 """
 from app.extensions import db
-from app.models.mixins import TimestampMixin
-import uuid
+from app.models.mixins import TimestampMixin, generate_uuid7
 
 
 class Notification(db.Model, TimestampMixin):
@@ -11,9 +10,9 @@ class Notification(db.Model, TimestampMixin):
 
     __tablename__ = 'notifications'
 
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = db.Column(db.String(36), primary_key=True, default=generate_uuid7)
 
-    customer_id = db.Column(db.String(36), db.ForeignKey('customers.id'), nullable=True, index=True)
+    customer_id = db.Column(db.String(36), db.ForeignKey('customers.id'), nullable=True)
     merchant_user_id = db.Column(db.String(36), db.ForeignKey('merchant_users.id'), nullable=True)
     admin_user_id = db.Column(db.String(36), db.ForeignKey('admin_users.id'), nullable=True)
 
@@ -33,6 +32,12 @@ class Notification(db.Model, TimestampMixin):
     # Relationships
     customer = db.relationship('Customer', back_populates='notifications')
 
+    __table_args__ = (
+        # Notification lists and unread counts, per customer and per staff member
+        db.Index('ix_notifications_customer_unread', 'customer_id', 'is_read', 'created_at'),
+        db.Index('ix_notifications_merchant_user_unread', 'merchant_user_id', 'is_read', 'created_at'),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
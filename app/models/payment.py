@@ -2,9 +2,8 @@
 Payment Model
 """
 from app.extensions import db
-from app.models.mixins import TimestampMixin, generate_reference
+from app.models.mixins import TimestampMixin, generate_reference, generate_uuid7
 from datetime import datetime, timedelta
-import uuid
 
 
 class Payment(db.Model, TimestampMixin):
@@ -15,11 +14,11 @@ class Payment(db.Model, TimestampMixin):
     # Lock timeout in seconds (prevent stale locks)
     LOCK_TIMEOUT_SECONDS = 60
 
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = db.Column(db.String(36), primary_key=True, default=generate_uuid7)
     reference_number = db.Column(db.String(20), unique=True, nullable=False, index=True)
 
     transaction_id = db.Column(db.String(36), db.ForeignKey('transactions.id'), nullable=False, index=True)
-    customer_id = db.Column(db.String(36), db.ForeignKey('customers.id'), nullable=False, index=True)
+    customer_id = db.Column(db.String(36), db.ForeignKey('customers.id'), nullable=False)
 
     amount = db.Column(db.Numeric(10, 2), nullable=False)
     payment_method = db.Column(db.String(30), nullable=True)
@@ -39,6 +38,13 @@ class Payment(db.Model, TimestampMixin):
     transaction = db.relationship('Transaction', back_populates='payments')
     customer = db.relationship('Customer', back_populates='payments')
 
+    __table_args__ = (
+        # Incremental refresh of the analytics snapshot reads rows by updated_at
+        db.Index('ix_payments_updated_at', 'updated_at'),
+        # Customer payment history
+        db.Index('ix_payments_customer_created_at', 'customer_id', 'created_at'),
+    )
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         if not self.reference_number:
@@ -0,0 +1,19 @@
+"""
+Reference Counter Model
+"""
+from app.extensions import db
+from datetime import datetime
+
+
+class ReferenceCounter(db.Model):
+    """Reference Counter model - Next unallocated number per reference series (e.g. BRQ-2026)"""
+
+    __tablename__ = 'reference_counters'
+
+    name = db.Column(db.String(50), primary_key=True)
+    next_value = db.Column(db.BigInteger, nullable=False)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<ReferenceCounter {self.name}={self.next_value}>'
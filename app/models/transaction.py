@@ -2,9 +2,8 @@
 Transaction Model
 """
 from app.extensions import db
-from app.models.mixins import TimestampMixin, generate_reference
-from datetime import datetime, timedelta
-import uuid
+from app.models.mixins import TimestampMixin, generate_reference, generate_uuid7
+from datetime import date, datetime, timedelta
 
 
 class Transaction(db.Model, TimestampMixin):
@@ -12,12 +11,12 @@ class Transaction(db.Model, TimestampMixin):
 
     __tablename__ = 'transactions'
 
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    reference_number = db.Column(db.String(20), unique=True, nullable=False, index=True)
+    id = db.Column(db.String(36), primary_key=True, default=generate_uuid7)
+    reference_number = db.Column(db.String(20), nullable=False)
 
     # Parties
-    customer_id = db.Column(db.String(36), db.ForeignKey('customers.id'), nullable=False, index=True)
-    merchant_id = db.Column(db.String(36), db.ForeignKey('merchants.id'), nullable=False, index=True)
+    customer_id = db.Column(db.String(36), db.ForeignKey('customers.id'), nullable=False)
+    merchant_id = db.Column(db.String(36), db.ForeignKey('merchants.id'), nullable=False)
     branch_id = db.Column(db.String(36), db.ForeignKey('branches.id'), nullable=False, index=True)
     cashier_id = db.Column(db.String(36), db.ForeignKey('merchant_users.id'), nullable=True)
 
@@ -34,7 +33,7 @@ class Transaction(db.Model, TimestampMixin):
     due_date = db.Column(db.Date, nullable=False, index=True)
 
     # Status
-    status = db.Column(db.String(20), default='pending', nullable=False, index=True)
+    status = db.Column(db.String(20), default='pending', nullable=False)
     # pending, confirmed, paid, overdue, cancelled, refunded
 
     # Payment Info
@@ -60,6 +59,39 @@ class Transaction(db.Model, TimestampMixin):
     returns = db.relationship('TransactionReturn', back_populates='transaction', lazy='dynamic')
     payments = db.relationship('Payment', back_populates='transaction', lazy='dynamic')
 
+    __table_args__ = (
+        # Unique with the partition key, as on the partitioned PostgreSQL table (011_partition_transactions);
+        # reference numbers never repeat, and lookups by reference_number alone use the leading column
+        db.Index('ix_transactions_reference_number', 'reference_number', 'transaction_date', unique=True),
+        # Incremental refresh of the analytics snapshot reads rows by updated_at
+        db.Index('ix_transactions_updated_at', 'updated_at'),
+        # Pending rows only: the expiry sweep and pending counts stay cheap however many rows are settled
+        db.Index(
+            'ix_transactions_pending_created_at', 'created_at',
+            postgresql_where=db.text("status = 'pending'"), sqlite_where=db.text("status = 'pending'")
+        ),
+        db.Index(
+            'ix_transactions_pending_customer', 'customer_id',
+            postgresql_where=db.text("status = 'pending'"), sqlite_where=db.text("status = 'pending'")
+        ),
+        # Merchant dashboards and reports (created_at), merchant listings (transaction_date)
+        db.Index('ix_transactions_merchant_created_at', 'merchant_id', 'created_at'),
+        db.Index('ix_transactions_merchant_transaction_date', 'merchant_id', 'transaction_date'),
+        # Staff dashboards and listings
+        db.Index('ix_transactions_cashier_created_at', 'cashier_id', 'created_at'),
+        # Customer debt, outstanding list and next payment
+        db.Index('ix_transactions_customer_status_due_date', 'customer_id', 'status', 'due_date'),
+        # Overdue sweep and payment reminders
+        db.Index('ix_transactions_status_due_date', 'status', 'due_date'),
+        # Unsettled rows only: pending settlement amounts and settlement creation
+        db.Index(
+            'ix_transactions_unsettled', 'merchant_id', 'branch_id', 'status', 'transaction_date',
+            postgresql_where=db.text('settlement_id IS NULL'), sqlite_where=db.text('settlement_id IS NULL')
+        ),
+        # Settlement details
+        db.Index('ix_transactions_settlement_id', 'settlement_id'),
+    )
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         if not self.reference_number:
@@ -67,6 +99,47 @@ class Transaction(db.Model, TimestampMixin):
         if not self.due_date:
             self.due_date = (datetime.utcnow() + timedelta(days=10)).date()
 
+    @staticmethod
+    def day_range(column, from_date=None, to_date=None, slack_days=0):
+        """
+        Conditions on a datetime column covering whole days from_date..to_date.
+
+        Same rows as date(column) >= from_date / <= to_date, but as plain
+        range conditions an index on the column can serve. Unparseable
+        dates add no condition.
+        """
+        def start_of_day(value):
+            if isinstance(value, str):
+                try:
+                    value = date.fromisoformat(value[:10])
+                except ValueError:
+                    return None
+            if isinstance(value, datetime):
+                value = value.date()
+            return datetime.combine(value, datetime.min.time())
+
+        conditions = []
+        start = start_of_day(from_date) if from_date else None
+        if start is not None:
+            conditions.append(column >= start - timedelta(days=slack_days))
+        end = start_of_day(to_date) if to_date else None
+        if end is not None:
+            conditions.append(column < end + timedelta(days=1 + slack_days))
+        return conditions
+
+    @staticmethod
+    def date_range(from_date=None, to_date=None, slack_days=0):
+        """
+        Conditions on transaction_date covering whole days from_date..to_date.
+
+        On PostgreSQL transactions is partitioned by transaction_date month;
+        adding these conditions lets the planner skip the other months. Pass
+        slack_days=1 when the query itself filters on created_at (set in
+        the same insert, but not guaranteed to fall on the same side of
+        midnight).
+        """
+        return Transaction.day_range(Transaction.transaction_date, from_date, to_date, slack_days)
+
     @property
     def remaining_amount(self):
         """Calculate remaining amount to pay"""
@@ -1,3 +1,18 @@
 """
-Marshmallow Schemas Package
+Schemas Package
+
+Precompiled serializers used by the list endpoints
 """
+from app.schemas.serializers import (
+    compile_serializer,
+    serialize_transaction,
+    serialize_transaction_return,
+    serialize_payment,
+)
+
+__all__ = [
+    'compile_serializer',
+    'serialize_transaction',
+    'serialize_transaction_return',
+    'serialize_payment',
+]
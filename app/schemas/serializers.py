@@ -0,0 +1,88 @@
+"""
+Serializers - Precompiled model-to-dict functions for large API pages
+"""
+from sqlalchemy import Date, DateTime, Numeric, inspect
+from app.models.transaction import Transaction
+from app.models.transaction_return import TransactionReturn
+from app.models.payment import Payment
+
+
+def _convert(column, value):
+    """Source expression converting value (a variable name) for this column's type"""
+    if column is not None and isinstance(column.type, Numeric):
+        return f'float({value})'
+    if column is not None and isinstance(column.type, (Date, DateTime)):
+        return f'{value}.isoformat()'
+    return value
+
+
+def compile_serializer(model, fields, defaults=None):
+    """
+    Build a function returning the same dict as the model's to_dict().
+
+    The function body is generated once from the mapped column types:
+    Numeric columns become floats and Date/DateTime columns ISO strings,
+    nullable ones falling back to None. Fields that are not columns
+    (properties) are copied as they are. Column values are read straight
+    from the instance __dict__, skipping the ORM attribute machinery; an
+    instance with expired or unloaded columns goes through normal
+    attribute access instead.
+
+    Args:
+        model: mapped class
+        fields: attribute names, or (key, attribute) pairs to rename
+        defaults: {key: literal} returned instead when the value is falsy
+                  (to_dict's `x or []` / `float(x) if x else 0`)
+    """
+    defaults = defaults or {}
+    columns = inspect(model).columns
+
+    def body(read):
+        entries = []
+        for field in fields:
+            key, attr = field if isinstance(field, tuple) else (field, field)
+            column = columns.get(attr)
+            value = read(attr) if column is not None else f'obj.{attr}'
+            converted = _convert(column, '_v')
+            if key in defaults:
+                expr = f'({converted} if (_v := {value}) else {defaults[key]!r})'
+            elif converted == '_v':
+                expr = value
+            elif column.nullable or isinstance(column.type, (Date, DateTime)):
+                expr = f'({converted} if (_v := {value}) is not None else None)'
+            else:
+                expr = _convert(column, value)
+            entries.append(f'            {key!r}: {expr},')
+        return '\n'.join(entries)
+
+    name = f'serialize_{model.__tablename__}'
+    source = (
+        f'def {name}(obj):\n'
+        f'    _d = obj.__dict__\n'
+        f'    try:\n'
+        f'        return {{\n{body(lambda attr: f"_d[{attr!r}]")}\n        }}\n'
+        f'    except KeyError:\n'
+        f'        return {{\n{body(lambda attr: f"obj.{attr}")}\n        }}\n'
+    )
+    namespace = {}
+    exec(compile(source, f'<serializer {model.__name__}>', 'exec'), namespace)
+    serializer = namespace[name]
+    serializer.source = source
+    return serializer
+
+
+serialize_transaction = compile_serializer(Transaction, [
+    'id', 'reference_number', 'customer_id', 'merchant_id', 'branch_id',
+    'subtotal', 'discount', 'total_amount', 'items', 'transaction_date', 'due_date', 'status',
+    'paid_amount', 'returned_amount', 'remaining_amount', 'is_overdue',
+], defaults={'items': []})
+
+serialize_payment = compile_serializer(Payment, [
+    'id', 'reference_number', 'transaction_id', 'amount', 'payment_method', 'status',
+    'gateway_reference', 'refunded_amount', 'created_at', 'completed_at',
+], defaults={'refunded_amount': 0})
+
+serialize_transaction_return = compile_serializer(TransactionReturn, [
+    'id', 'transaction_id', 'return_amount', 'reason', 'reason_details', 'returned_items',
+    'status', 'created_at',
+], defaults={'returned_items': []})
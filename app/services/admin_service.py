@@ -2,9 +2,11 @@
 Admin Service - Full Implementation
 """
 from datetime import datetime, timedelta
+from flask import current_app
 from sqlalchemy import func, or_, and_
 from app import db
 from app.models.customer import Customer
+from app.models.daily_sales_rollup import DailySalesRollup
 from app.models.merchant import Merchant
 from app.models.transaction import Transaction
 from app.models.payment import Payment
@@ -13,6 +15,9 @@ from app.models.admin_user import AdminUser
 from app.models.system_setting import SystemSetting
 from app.models.credit_limit_request import CreditLimitRequest
 from app.services.audit_service import AuditService
+from app.utils.customer_search import customer_search
+from app.utils.pagination import InvalidCursorError, paginate
+from app.utils.report_cache import report_cache
 
 
 class AdminService:
@@ -22,42 +27,59 @@ class AdminService:
 
     @staticmethod
     def get_dashboard_stats():
-        """Get executive dashboard statistics"""
+        """Get executive dashboard statistics (cached for ADMIN_DASHBOARD_CACHE_TTL seconds)"""
+        ttl = current_app.config.get('ADMIN_DASHBOARD_CACHE_TTL', 0)
+        if not ttl:
+            return AdminService._compute_dashboard_stats()
+
+        # TTL-only entry: not dropped on every commit, so concurrent admins share one computation
+        return report_cache.get_or_compute(
+            'admin_dashboard', AdminService._compute_dashboard_stats,
+            from_date=datetime.utcnow().date(), ttl=ttl, invalidate_on_commit=False
+        )
+
+    @staticmethod
+    def _compute_dashboard_stats():
         try:
-            today = datetime.utcnow().date()
+            now = datetime.utcnow()
+            today = now.date()
             month_start = today.replace(day=1)
+            today_start = datetime.combine(today, datetime.min.time())
+            tomorrow_start = today_start + timedelta(days=1)
 
             # Customer stats
-            total_customers = Customer.query.count()
-            active_customers = Customer.query.filter_by(status='active').count()
-            new_customers_today = Customer.query.filter(
-                func.date(Customer.created_at) == today
-            ).count()
-
-            # Merchant stats
-            total_merchants = Merchant.query.count()
-            active_merchants = Merchant.query.filter_by(status='active').count()
-            pending_merchants = Merchant.query.filter_by(status='pending').count()
-
-            # Transaction stats for today
-            today_transactions = Transaction.query.filter(
-                func.date(Transaction.created_at) == today
-            ).all()
-            today_count = len(today_transactions)
-            today_amount = sum(float(t.total_amount or 0) for t in today_transactions)
-
-            # Month revenue
-            month_transactions = Transaction.query.filter(
-                Transaction.created_at >= month_start,
-                Transaction.status.in_(['paid', 'confirmed'])
-            ).all()
-            month_revenue = sum(float(t.total_amount or 0) for t in month_transactions)
-
-            # Overdue count
-            overdue_count = Transaction.query.filter_by(status='overdue').count()
-
-            # Pending settlements
-            pending_settlements = Settlement.query.filter_by(status='pending').count()
+            total_customers, active_customers, new_customers_today = db.session.query(
+                func.count(Customer.id),
+                func.count(Customer.id).filter(Customer.status == 'active'),
+                func.count(Customer.id).filter(
+                    Customer.created_at >= today_start,
+                    Customer.created_at < tomorrow_start
+                )
+            ).one()
+
+            # Merchant stats, plus overdue transactions and pending settlements as scalar subqueries
+            total_merchants, active_merchants, pending_merchants, overdue_count, pending_settlements = db.session.query(
+                func.count(Merchant.id),
+                func.count(Merchant.id).filter(Merchant.status == 'active'),
+                func.count(Merchant.id).filter(Merchant.status == 'pending'),
+                db.select(func.count(Transaction.id)).where(Transaction.status == 'overdue').scalar_subquery(),
+                db.select(func.count(Settlement.id)).where(Settlement.status == 'pending').scalar_subquery()
+            ).one()
+
+            # Today's transactions and month revenue (from the daily sales rollup)
+            is_today = DailySalesRollup.rollup_date == today
+            today_count, today_amount, month_revenue = db.session.query(
+                func.coalesce(func.sum(DailySalesRollup.transaction_count).filter(is_today), 0),
+                func.coalesce(func.sum(DailySalesRollup.total_amount).filter(is_today), 0),
+                func.coalesce(func.sum(DailySalesRollup.total_amount).filter(
+                    DailySalesRollup.status.in_(['paid', 'confirmed'])
+                ), 0)
+            ).filter(
+                DailySalesRollup.rollup_date >= month_start,
+                DailySalesRollup.rollup_date <= today
+            ).one()
+
+            today_amount = float(today_amount)
 
             return {
                 'success': True,
@@ -74,13 +96,13 @@ class AdminService:
                     },
                     'transactions': {
                         'today': {
-                            'count': today_count,
+                            'count': int(today_count),
                             'amount': today_amount
                         }
                     },
                     'revenue': {
                         'today': today_amount,
-                        'month': month_revenue
+                        'month': float(month_revenue)
                     },
                     'overdue_count': overdue_count,
                     'pending_settlements': pending_settlements
@@ -92,7 +114,7 @@ class AdminService:
     # ==================== Customer Management ====================
 
     @staticmethod
-    def get_customers(status=None, search=None, city=None, page=1, per_page=20):
+    def get_customers(status=None, search=None, city=None, page=1, per_page=20, cursor=None, include_total=True):
         """List all customers with filters"""
         try:
             query = Customer.query
@@ -104,18 +126,12 @@ class AdminService:
                 query = query.filter(Customer.city == city)
 
             if search:
-                search_term = f'%{search}%'
-                query = query.filter(or_(
-                    Customer.full_name_ar.ilike(search_term),
-                    Customer.full_name_en.ilike(search_term),
-                    Customer.email.ilike(search_term),
-                    Customer.phone.ilike(search_term),
-                    Customer.bariq_id.ilike(search_term),
-                    Customer.national_id.ilike(search_term)
-                ))
+                query = customer_search.filter_query(query, search)
 
-            query = query.order_by(Customer.created_at.desc())
-            pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+            pagination = paginate(
+                query, page, per_page, cursor=cursor, include_total=include_total,
+                order_by=(Customer.created_at, Customer.id)
+            )
 
             customers = []
             for c in pagination.items:
@@ -133,14 +149,11 @@ class AdminService:
                 'success': True,
                 'data': {
                     'customers': customers,
-                    'pagination': {
-                        'page': page,
-                        'per_page': per_page,
-                        'total': pagination.total,
-                        'pages': pagination.pages
-                    }
+                    'pagination': pagination.pagination
                 }
             }
+        except InvalidCursorError:
+            raise
         except Exception as e:
             return {'success': False, 'message': str(e)}
 
@@ -222,8 +235,7 @@ class AdminService:
                 return {'success': False, 'message': 'Customer not found'}
 
             old_limit = customer.credit_limit
-            customer.credit_limit = credit_limit
-            customer.updated_at = datetime.utcnow()
+            customer.set_credit_limit(credit_limit)
             db.session.commit()
 
             # Audit log
@@ -259,8 +271,7 @@ class AdminService:
             if new_limit < 0:
                 return {'success': False, 'message': 'Credit limit cannot be negative'}
 
-            customer.credit_limit = new_limit
-            customer.updated_at = datetime.utcnow()
+            customer.set_credit_limit(new_limit)
             db.session.commit()
 
             # Audit log
@@ -294,7 +305,7 @@ class AdminService:
     # ==================== Credit Requests ====================
 
     @staticmethod
-    def get_credit_requests(status=None, page=1, per_page=20):
+    def get_credit_requests(status=None, page=1, per_page=20, cursor=None, include_total=True):
         """List credit increase requests"""
         try:
             query = CreditLimitRequest.query
@@ -302,21 +313,20 @@ class AdminService:
             if status:
                 query = query.filter(CreditLimitRequest.status == status)
 
-            query = query.order_by(CreditLimitRequest.created_at.desc())
-            pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+            pagination = paginate(
+                query, page, per_page, cursor=cursor, include_total=include_total,
+                order_by=(CreditLimitRequest.created_at, CreditLimitRequest.id)
+            )
 
             return {
                 'success': True,
                 'data': {
                     'requests': [r.to_dict() for r in pagination.items],
-                    'pagination': {
-                        'page': page,
-                        'per_page': per_page,
-                        'total': pagination.total,
-                        'pages': pagination.pages
-                    }
+                    'pagination': pagination.pagination
                 }
             }
+        except InvalidCursorError:
+            raise
         except Exception as e:
             return {'success': False, 'message': str(e)}
 
@@ -341,7 +351,7 @@ class AdminService:
             # Update customer credit limit
             customer = Customer.query.get(credit_request.customer_id)
             if customer:
-                customer.credit_limit = approved_limit
+                customer.set_credit_limit(approved_limit)
 
             db.session.commit()
 
@@ -394,7 +404,7 @@ class AdminService:
     # ==================== Merchant Management ====================
 
     @staticmethod
-    def get_merchants(status=None, business_type=None, search=None, page=1, per_page=20):
+    def get_merchants(status=None, business_type=None, search=None, page=1, per_page=20, cursor=None, include_total=True):
         """List all merchants with filters"""
         try:
             query = Merchant.query
@@ -414,8 +424,10 @@ class AdminService:
                     Merchant.email.ilike(search_term)
                 ))
 
-            query = query.order_by(Merchant.created_at.desc())
-            pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+            pagination = paginate(
+                query, page, per_page, cursor=cursor, include_total=include_total,
+                order_by=(Merchant.created_at, Merchant.id)
+            )
 
             merchants = []
             for m in pagination.items:
@@ -429,14 +441,11 @@ class AdminService:
                 'success': True,
                 'data': {
                     'merchants': merchants,
-                    'pagination': {
-                        'page': page,
-                        'per_page': per_page,
-                        'total': pagination.total,
-                        'pages': pagination.pages
-                    }
+                    'pagination': pagination.pagination
                 }
             }
+        except InvalidCursorError:
+            raise
         except Exception as e:
             return {'success': False, 'message': str(e)}
 
@@ -564,7 +573,7 @@ class AdminService:
     # ==================== Transactions ====================
 
     @staticmethod
-    def get_transactions(status=None, merchant_id=None, from_date=None, to_date=None, page=1, per_page=20):
+    def get_transactions(status=None, merchant_id=None, from_date=None, to_date=None, page=1, per_page=20, cursor=None, include_total=True):
         """List all transactions with filters"""
         try:
             query = Transaction.query
@@ -581,21 +590,23 @@ class AdminService:
             if to_date:
                 query = query.filter(Transaction.created_at <= to_date)
 
-            query = query.order_by(Transaction.created_at.desc())
-            pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+            # Partition pruning on PostgreSQL
+            query = query.filter(*Transaction.date_range(from_date, to_date, slack_days=1))
+
+            pagination = paginate(
+                query, page, per_page, cursor=cursor, include_total=include_total,
+                order_by=(Transaction.created_at, Transaction.id)
+            )
 
             return {
                 'success': True,
                 'data': {
                     'transactions': [t.to_dict() for t in pagination.items],
-                    'pagination': {
-                        'page': page,
-                        'per_page': per_page,
-                        'total': pagination.total,
-                        'pages': pagination.pages
-                    }
+                    'pagination': pagination.pagination
                 }
             }
+        except InvalidCursorError:
+            raise
         except Exception as e:
             return {'success': False, 'message': str(e)}
 
@@ -0,0 +1,547 @@
+"""
+Analytics Snapshot Service - Columnar (NumPy) snapshot of transactions, payments and customers
+for platform-wide admin reports
+"""
+import os
+import logging
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from app.extensions import db
+from app.models.customer import Customer
+from app.models.payment import Payment
+from app.models.transaction import Transaction
+
+logger = logging.getLogger(__name__)
+
+# NumPy - optional import
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    logger.warning("numpy not installed. Admin analytics will query the database directly.")
+
+
+class ColumnarTable:
+    """
+    One table held as column arrays, addressable by row id.
+
+    Column kinds:
+        datetime - datetime64[us] (NaT for NULL)
+        float    - float64 (0 for NULL)
+        category - int32 codes into a per-column vocabulary
+        text     - fixed-width unicode
+    """
+
+    def __init__(self, name, model, columns):
+        self.name = name
+        self.model = model
+        self.columns = columns  # [(column name, kind)]
+        self.ids = np.array([], dtype='U36')
+        self.arrays = {col: self._empty(kind) for col, kind in columns}
+        self.vocab = {col: [] for col, kind in columns if kind == 'category'}
+        self._codes = {col: {} for col in self.vocab}
+        self._positions = {}
+        self.watermark = None
+
+    @staticmethod
+    def _empty(kind):
+        return np.array([], dtype={
+            'datetime': 'datetime64[us]',
+            'float': 'float64',
+            'category': 'int32',
+            'text': 'U1',
+        }[kind])
+
+    def __len__(self):
+        return len(self.ids)
+
+    def code(self, col, value):
+        """Code of a category value (-1 if it has never been seen)"""
+        return self._codes[col].get(value, -1)
+
+    def codes(self, col, values):
+        return [self.code(col, value) for value in values]
+
+    @staticmethod
+    def _encode(vocab, codes, value):
+        if value not in codes:
+            codes[value] = len(vocab)
+            vocab.append(value)
+        return codes[value]
+
+    def _column_values(self, col, kind, values, vocab, codes):
+        if kind == 'datetime':
+            return np.array(values, dtype='datetime64[us]')
+        if kind == 'float':
+            return np.array([float(v or 0) for v in values], dtype='float64')
+        if kind == 'category':
+            return np.array([
+                self._encode(vocab[col], codes[col], v if v is not None else '') for v in values
+            ], dtype='int32')
+        return np.array([v or '' for v in values], dtype=str)
+
+    def upsert(self, rows):
+        """
+        Merge changed rows (tuples of id followed by the columns, in order).
+
+        New arrays, vocabularies and positions are built off to the side and
+        swapped in together, so readers holding the previous ones are never
+        affected by a refresh in progress. Existing rows keep their position
+        and existing values their code; a reader pairing arrays with a newer
+        position map only has to skip positions past the end of its arrays.
+        """
+        if not rows:
+            return 0
+
+        latest = {}
+        for row in rows:
+            latest[row[0]] = row
+        changed = list(latest.values())
+
+        update_positions = []
+        update_rows = []
+        new_rows = []
+        for row in changed:
+            position = self._positions.get(row[0])
+            if position is None:
+                new_rows.append(row)
+            else:
+                update_positions.append(position)
+                update_rows.append(row)
+
+        vocab = {col: list(values) for col, values in self.vocab.items()}
+        codes = {col: dict(values) for col, values in self._codes.items()}
+        arrays = {}
+        for index, (col, kind) in enumerate(self.columns, start=1):
+            current = self.arrays[col]
+            if update_rows:
+                current = current.copy()
+                values = self._column_values(col, kind, [row[index] for row in update_rows], vocab, codes)
+                if kind == 'text' and values.dtype.itemsize > current.dtype.itemsize:
+                    current = current.astype(values.dtype)
+                current[np.array(update_positions, dtype='int64')] = values
+            if new_rows:
+                current = np.concatenate([
+                    current, self._column_values(col, kind, [row[index] for row in new_rows], vocab, codes)
+                ])
+            arrays[col] = current
+
+        ids, positions = self.ids, self._positions
+        if new_rows:
+            start = len(ids)
+            positions = dict(positions)
+            for offset, row in enumerate(new_rows):
+                positions[row[0]] = start + offset
+            ids = np.concatenate([ids, np.array([row[0] for row in new_rows], dtype=str)])
+
+        # One dict update: no reader sees new arrays with the old vocabularies
+        self.__dict__.update(vocab=vocab, _codes=codes, ids=ids, arrays=arrays, _positions=positions)
+        return len(changed)
+
+    # ==================== Persistence ====================
+
+    def save(self, directory):
+        """Write the table next to the others; a unique temp file keeps concurrent writers apart"""
+        path = os.path.join(directory, f'{self.name}.npz')
+        payload = {'ids': self.ids}
+        payload.update({f'col_{col}': array for col, array in self.arrays.items()})
+        payload.update({f'vocab_{col}': np.array(values, dtype=str) for col, values in self.vocab.items()})
+        if self.watermark is not None:
+            payload['watermark'] = np.array([self.watermark], dtype='datetime64[us]')
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f'.{self.name}.', suffix='.tmp.npz')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, **payload)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def load(self, directory):
+        path = os.path.join(directory, f'{self.name}.npz')
+        if not os.path.exists(path):
+            return False
+        with np.load(path, allow_pickle=False) as data:
+            self.ids = data['ids']
+            self.arrays = {col: data[f'col_{col}'] for col, _ in self.columns}
+            self.vocab = {col: data[f'vocab_{col}'].tolist() for col in self.vocab}
+            self.watermark = data['watermark'][0].astype(datetime) if 'watermark' in data else None
+        self._codes = {col: {v: i for i, v in enumerate(values)} for col, values in self.vocab.items()}
+        self._positions = {row_id: i for i, row_id in enumerate(self.ids.tolist())}
+        return True
+
+
+class AnalyticsSnapshotService:
+    """
+    Keeps a columnar copy of transactions, payments and customers and answers
+    the platform-wide admin reports with vectorized aggregation over it.
+
+    The snapshot is refreshed incrementally: only rows whose updated_at is at
+    or after the last refresh's high-water mark, less
+    ANALYTICS_SNAPSHOT_LOOKBACK seconds, are read. updated_at is set when
+    the row is written, not when it commits, so the lookback lets a refresh
+    pick up rows that committed after the previous one with an earlier
+    timestamp. Bulk UPDATE statements must set updated_at for their rows to
+    be picked up. Rows are never removed (the application does not delete
+    transactions, payments or customers); after ids change (rekey-uuid7)
+    the snapshot has to be rebuilt with refresh(full=True). A full rebuild
+    touches the generation file next to the snapshot, and every process
+    holding an older generation reloads it from disk instead of merging
+    into (and saving back) its stale copy.
+
+    Refreshes run from the periodic task or the refresh-analytics-snapshot
+    command only; reports read the snapshot as it is, so an admin request
+    never queries the OLTP tables for it.
+    """
+
+    REFRESH_CHUNK_SIZE = 10000
+    GENERATION_FILE = 'generation'
+
+    _state_lock = threading.Lock()
+
+    @classmethod
+    def is_enabled(cls):
+        return NUMPY_AVAILABLE and current_app.config.get('ANALYTICS_SNAPSHOT_ENABLED', True)
+
+    @classmethod
+    def _state(cls):
+        """Per-application snapshot state (tables, generation they were loaded from, lock)"""
+        with cls._state_lock:
+            return current_app.extensions.setdefault('analytics_snapshot', {
+                'tables': None,
+                'generation': None,
+                'lock': threading.Lock(),
+            })
+
+    @classmethod
+    def _directory(cls):
+        directory = current_app.config.get('ANALYTICS_SNAPSHOT_DIR', '')
+        if directory is None:
+            return None
+        return directory or os.path.join(current_app.instance_path, 'analytics')
+
+    @classmethod
+    def _generation(cls, directory):
+        """Generation of the persisted snapshot: when it was last fully rebuilt"""
+        try:
+            return os.stat(os.path.join(directory, cls.GENERATION_FILE)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    @classmethod
+    def _load_tables(cls, state, directory):
+        """Load the persisted snapshot into state; returns whether every table was found"""
+        generation = cls._generation(directory)
+        tables = cls._build_tables()
+        if not all([table.load(directory) for table in tables.values()]):
+            return False
+        state['tables'] = tables
+        state['generation'] = generation
+        return True
+
+    @classmethod
+    def _build_tables(cls):
+        return {
+            'transactions': ColumnarTable('transactions', Transaction, [
+                ('customer_id', 'category'),
+                ('created_at', 'datetime'),
+                ('status', 'category'),
+                ('total_amount', 'float'),
+                ('paid_amount', 'float'),
+                ('returned_amount', 'float'),
+            ]),
+            'payments': ColumnarTable('payments', Payment, [
+                ('created_at', 'datetime'),
+                ('status', 'category'),
+                ('payment_method', 'category'),
+                ('amount', 'float'),
+            ]),
+            'customers': ColumnarTable('customers', Customer, [
+                ('created_at', 'datetime'),
+                ('status', 'category'),
+                ('credit_limit', 'float'),
+                ('bariq_id', 'text'),
+                ('full_name_ar', 'text'),
+            ]),
+        }
+
+    # ==================== Refresh ====================
+
+    @classmethod
+    def refresh(cls, full=False):
+        """
+        Pull rows changed since the last refresh into the snapshot and persist it.
+
+        Args:
+            full: Discard the snapshot and rebuild it from scratch
+
+        Returns:
+            dict with success flag and the number of rows merged per table
+        """
+        state = cls._state()
+        with state['lock']:
+            try:
+                directory = cls._directory()
+                if not full and directory and (
+                        state['tables'] is None or cls._generation(directory) != state['generation']):
+                    # First refresh in this process, or another process rebuilt the snapshot
+                    cls._load_tables(state, directory)
+                tables = state['tables']
+                if full or tables is None:
+                    # Built aside and swapped in, so reports keep reading the old snapshot meanwhile
+                    tables = cls._build_tables()
+
+                lookback = timedelta(seconds=current_app.config.get('ANALYTICS_SNAPSHOT_LOOKBACK', 300))
+                merged = {}
+                for name, table in tables.items():
+                    merged[name] = cls._refresh_table(table, lookback)
+
+                state['tables'] = tables
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                    for table in tables.values():
+                        table.save(directory)
+                    if full:
+                        with open(os.path.join(directory, cls.GENERATION_FILE), 'w') as generation_file:
+                            generation_file.write(datetime.utcnow().isoformat())
+                        state['generation'] = cls._generation(directory)
+
+                return {
+                    'success': True,
+                    'data': {
+                        'merged': merged,
+                        'rows': {name: len(table) for name, table in tables.items()}
+                    }
+                }
+            except Exception as e:
+                return {
+                    'success': False,
+                    'message': f'Failed to refresh analytics snapshot: {str(e)}',
+                    'error_code': 'SYS_001'
+                }
+
+    @classmethod
+    def discard(cls):
+        """Drop the snapshot, in memory and on disk, so the next refresh rebuilds it"""
+        state = cls._state()
+        with state['lock']:
+            state['tables'] = None
+            state['generation'] = None
+            directory = cls._directory()
+            if directory and os.path.isdir(directory):
+                for name in os.listdir(directory):
+                    if name.endswith('.npz') or name == cls.GENERATION_FILE:
+                        os.remove(os.path.join(directory, name))
+
+    @classmethod
+    def _refresh_table(cls, table, lookback):
+        model = table.model
+        query = db.session.query(
+            model.id, *[getattr(model, col) for col, _ in table.columns], model.updated_at
+        )
+        if table.watermark is not None:
+            # Rows re-read inside the lookback window are merged by id, so re-reading them is harmless
+            query = query.filter(model.updated_at >= table.watermark - lookback)
+
+        merged = 0
+        watermark = table.watermark
+        chunk = []
+        for row in query.order_by(model.updated_at).yield_per(cls.REFRESH_CHUNK_SIZE):
+            chunk.append(row[:-1])
+            watermark = row[-1]
+            if len(chunk) >= cls.REFRESH_CHUNK_SIZE:
+                merged += table.upsert(chunk)
+                chunk = []
+        merged += table.upsert(chunk)
+        if watermark is not None and (table.watermark is None or watermark > table.watermark):
+            table.watermark = watermark
+        return merged
+
+    @classmethod
+    def get_tables(cls):
+        """
+        Snapshot tables as last refreshed, loading the persisted snapshot on
+        first use and after another process rebuilt it. Never reads the database.
+
+        Returns:
+            dict of ColumnarTable, or None if no snapshot has been built yet
+        """
+        state = cls._state()
+        directory = cls._directory()
+        if not directory:
+            return state['tables']
+        # A refresh holding the lock will swap its tables in when done; don't wait for it
+        if (state['tables'] is None or cls._generation(directory) != state['generation']) \
+                and state['lock'].acquire(blocking=False):
+            try:
+                if state['tables'] is None or cls._generation(directory) != state['generation']:
+                    cls._load_tables(state, directory)
+            finally:
+                state['lock'].release()
+        return state['tables']
+
+    @classmethod
+    def is_available(cls):
+        """Whether reports can be answered from the snapshot (enabled and built)"""
+        return cls.is_enabled() and cls.get_tables() is not None
+
+    # ==================== Helpers ====================
+
+    @staticmethod
+    def _in_range(dates, from_date=None, to_date=None):
+        mask = ~np.isnat(dates)
+        if from_date is not None:
+            mask &= dates >= np.datetime64(from_date, 'us')
+        if to_date is not None:
+            mask &= dates <= np.datetime64(to_date, 'us')
+        return mask
+
+    @staticmethod
+    def _status_counts(table, mask):
+        counts = np.bincount(table.arrays['status'][mask], minlength=len(table.vocab['status']))
+        return {status: int(counts[i]) for i, status in enumerate(table.vocab['status'])}
+
+    @staticmethod
+    def _daily(dates, weights_by_field):
+        """Group by calendar day: returns [{'date', 'count', <field>: sum}, ...] sorted by date"""
+        if not len(dates):
+            return []
+        days, inverse = np.unique(dates.astype('datetime64[D]'), return_inverse=True)
+        counts = np.bincount(inverse, minlength=len(days))
+        sums = {
+            field: np.bincount(inverse, weights=weights, minlength=len(days))
+            for field, weights in weights_by_field.items()
+        }
+        return [
+            dict({'date': str(day), 'count': int(counts[i])},
+                 **{field: float(values[i]) for field, values in sums.items()})
+            for i, day in enumerate(days)
+        ]
+
+    # ==================== Reports ====================
+
+    @classmethod
+    def overview_report(cls, from_date, to_date):
+        tables = cls.get_tables()
+        txns, payments = tables['transactions'], tables['payments']
+
+        mask = cls._in_range(txns.arrays['created_at'], from_date, to_date)
+        status_counts = cls._status_counts(txns, mask)
+
+        payment_mask = cls._in_range(payments.arrays['created_at'], from_date, to_date) & \
+            (payments.arrays['status'] == payments.code('status', 'completed'))
+
+        return {
+            'success': True,
+            'data': {
+                'total_transactions': int(mask.sum()),
+                'total_revenue': float(txns.arrays['total_amount'][mask].sum()),
+                'total_payments': float(payments.arrays['amount'][payment_mask].sum()),
+                'paid_transactions': status_counts.get('paid', 0),
+                'pending_transactions': status_counts.get('pending', 0) + status_counts.get('confirmed', 0),
+                'overdue_transactions': status_counts.get('overdue', 0),
+                'cancelled_transactions': status_counts.get('cancelled', 0)
+            }
+        }
+
+    @classmethod
+    def transactions_report(cls, from_date, to_date):
+        txns = cls.get_tables()['transactions']
+        arrays = txns.arrays
+
+        mask = cls._in_range(arrays['created_at'], from_date, to_date)
+        status_counts = cls._status_counts(txns, mask)
+        totals = arrays['total_amount'][mask]
+
+        overdue_mask = mask & (arrays['status'] == txns.code('status', 'overdue'))
+        overdue_amount = (
+            arrays['total_amount'][overdue_mask]
+            - arrays['paid_amount'][overdue_mask]
+            - arrays['returned_amount'][overdue_mask]
+        ).sum()
+
+        daily = cls._daily(arrays['created_at'][mask], {'amount': totals})
+
+        return {
+            'success': True,
+            'data': {
+                'total_transactions': int(mask.sum()),
+                'paid_transactions': status_counts.get('paid', 0),
+                'pending_transactions': status_counts.get('pending', 0) + status_counts.get('confirmed', 0),
+                'overdue_transactions': status_counts.get('overdue', 0),
+                'cancelled_transactions': status_counts.get('cancelled', 0),
+                'overdue_amount': float(overdue_amount),
+                'max_transaction': float(totals.max()) if len(totals) else 0,
+                'avg_transaction_value': float(totals.mean()) if len(totals) else 0,
+                'daily_transactions': daily
+            }
+        }
+
+    @classmethod
+    def customers_report(cls, from_date, to_date):
+        tables = cls.get_tables()
+        customers, txns = tables['customers'], tables['transactions']
+        cust, arrays = customers.arrays, txns.arrays
+
+        def count_status(status):
+            return int((cust['status'] == customers.code('status', status)).sum())
+
+        new_mask = cls._in_range(cust['created_at'], from_date, to_date)
+
+        open_mask = np.isin(arrays['status'], txns.codes('status', ['confirmed', 'pending', 'overdue']))
+        total_debt = (
+            arrays['total_amount'][open_mask]
+            - arrays['paid_amount'][open_mask]
+            - arrays['returned_amount'][open_mask]
+        ).sum()
+        total_credit = cust['credit_limit'].sum()
+        credit_utilization = (float(total_debt) / float(total_credit) * 100) if total_credit > 0 else 0
+
+        # Top customers by amount (transactions since from_date)
+        top_customers_data = []
+        since_mask = cls._in_range(arrays['created_at'], from_date)
+        customer_codes = arrays['customer_id'][since_mask]
+        if len(customer_codes):
+            size = len(txns.vocab['customer_id'])
+            counts = np.bincount(customer_codes, minlength=size)
+            totals = np.bincount(customer_codes, weights=arrays['total_amount'][since_mask], minlength=size)
+            paid = np.bincount(customer_codes, weights=arrays['paid_amount'][since_mask], minlength=size)
+            ranked = [code for code in np.argsort(-totals, kind='stable')[:10] if counts[code]]
+            positions = customers._positions
+            for code in ranked:
+                customer_id = txns.vocab['customer_id'][code]
+                position = positions.get(customer_id)
+                # A customer merged after cust was read is past its end
+                if position is None or position >= len(cust['bariq_id']):
+                    continue
+                total = float(totals[code])
+                top_customers_data.append({
+                    'bariq_id': str(cust['bariq_id'][position]) or None,
+                    'full_name_ar': str(cust['full_name_ar'][position]),
+                    'transactions_count': int(counts[code]),
+                    'total_amount': total,
+                    'payment_rate': (float(paid[code]) / (total or 1)) * 100
+                })
+
+        growth = [
+            {'date': day['date'], 'count': day['count']}
+            for day in cls._daily(cust['created_at'][new_mask], {})
+        ]
+
+        return {
+            'success': True,
+            'data': {
+                'total_customers': len(customers),
+                'active_customers': count_status('active'),
+                'pending_customers': count_status('pending'),
+                'suspended_customers': count_status('suspended'),
+                'new_customers': int(new_mask.sum()),
+                'credit_utilization': credit_utilization,
+                'top_customers': top_customers_data,
+                'customer_growth': growth
+            }
+        }
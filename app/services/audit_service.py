@@ -4,13 +4,14 @@ Audit Service - Full Implementation
 from datetime import datetime
 from app import db
 from app.models.audit_log import AuditLog
+from app.utils.pagination import InvalidCursorError, paginate
 
 
 class AuditService:
     """Audit service with full database implementation"""
 
     @staticmethod
-    def get_audit_logs(actor_type=None, action=None, from_date=None, page=1, per_page=20):
+    def get_audit_logs(actor_type=None, action=None, from_date=None, page=1, per_page=20, cursor=None, include_total=True):
         """Get audit logs with filters"""
         try:
             query = AuditLog.query
@@ -26,21 +27,20 @@ class AuditService:
                     from_date = datetime.strptime(from_date, '%Y-%m-%d')
                 query = query.filter(AuditLog.created_at >= from_date)
 
-            query = query.order_by(AuditLog.created_at.desc())
-            pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+            pagination = paginate(
+                query, page, per_page, cursor=cursor, include_total=include_total,
+                order_by=(AuditLog.created_at, AuditLog.id)
+            )
 
             return {
                 'success': True,
                 'data': {
                     'logs': [log.to_dict() for log in pagination.items],
-                    'pagination': {
-                        'page': page,
-                        'per_page': per_page,
-                        'total': pagination.total,
-                        'pages': pagination.pages
-                    }
+                    'pagination': pagination.pagination
                 }
             }
+        except InvalidCursorError:
+            raise
         except Exception as e:
             return {'success': False, 'message': str(e)}
 
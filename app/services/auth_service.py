@@ -8,6 +8,7 @@ from app.extensions import db
 from app.models.customer import Customer
 from app.models.merchant_user import MerchantUser
 from app.models.admin_user import AdminUser
+from app.utils.admin_live_counters import admin_live_counters
 
 
 class AuthService:
@@ -42,6 +43,7 @@ class AuthService:
                 verified_at=datetime.utcnow()
             )
             db.session.add(customer)
+            admin_live_counters.record(db.session, new_customers_today=1)
             db.session.commit()
 
         # Update last login
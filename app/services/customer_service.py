@@ -8,6 +8,8 @@ from app.models.customer import Customer
 from app.models.credit_limit_request import CreditLimitRequest
 from app.models.transaction import Transaction
 from app.models.notification import Notification
+from app.utils.customer_search import customer_search
+from app.utils.pagination import paginate
 
 
 class CustomerService:
@@ -400,7 +402,7 @@ class CustomerService:
             }
 
     @staticmethod
-    def get_credit_requests(customer_id, page=1, per_page=20):
+    def get_credit_requests(customer_id, page=1, per_page=20, cursor=None, include_total=True):
         """Get customer's credit increase requests"""
         customer = Customer.query.get(customer_id)
 
@@ -411,23 +413,20 @@ class CustomerService:
                 'error_code': 'CUST_001'
             }
 
-        pagination = CreditLimitRequest.query.filter_by(
+        query = CreditLimitRequest.query.filter_by(
             customer_id=customer_id
-        ).order_by(
-            CreditLimitRequest.created_at.desc()
-        ).paginate(page=page, per_page=per_page, error_out=False)
+        )
+        pagination = paginate(
+            query, page, per_page, cursor=cursor, include_total=include_total,
+            order_by=(CreditLimitRequest.created_at, CreditLimitRequest.id)
+        )
 
         return {
             'success': True,
             'data': {
                 'requests': [r.to_dict() for r in pagination.items]
             },
-            'meta': {
-                'page': page,
-                'per_page': per_page,
-                'total': pagination.total,
-                'total_pages': pagination.pages
-            }
+            'meta': pagination.meta
         }
 
     # ==================== Statistics ====================
@@ -589,13 +588,9 @@ class CustomerService:
         old_limit = float(customer.credit_limit)
         old_available = float(customer.available_credit)
 
-        # Calculate new available credit
-        # new_available = new_limit - used_credit
-        customer.credit_limit = new_limit
-        customer.available_credit = new_limit - float(customer.used_credit)
-        customer.updated_at = datetime.utcnow()
-
         try:
+            # new_available = new_limit - used_credit
+            customer.set_credit_limit(new_limit)
             db.session.commit()
 
             # Log the action
@@ -702,7 +697,7 @@ class CustomerService:
     # ==================== Search & List ====================
 
     @staticmethod
-    def search_customers(status=None, search=None, city=None, page=1, per_page=20):
+    def search_customers(status=None, search=None, city=None, page=1, per_page=20, cursor=None, include_total=True):
         """Search customers (admin only)"""
         query = Customer.query
 
@@ -713,29 +708,17 @@ class CustomerService:
             query = query.filter(Customer.city == city)
 
         if search:
-            search_term = f'%{search}%'
-            query = query.filter(
-                db.or_(
-                    Customer.full_name_ar.ilike(search_term),
-                    Customer.full_name_en.ilike(search_term),
-                    Customer.phone.ilike(search_term),
-                    Customer.national_id.ilike(search_term),
-                    Customer.email.ilike(search_term)
-                )
-            )
+            query = customer_search.filter_query(query, search)
 
-        query = query.order_by(Customer.created_at.desc())
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+        pagination = paginate(
+            query, page, per_page, cursor=cursor, include_total=include_total,
+            order_by=(Customer.created_at, Customer.id)
+        )
 
         return {
             'success': True,
             'data': {
                 'customers': [c.to_dict() for c in pagination.items]
             },
-            'meta': {
-                'page': page,
-                'per_page': per_page,
-                'total': pagination.total,
-                'total_pages': pagination.pages
-            }
+            'meta': pagination.meta
         }
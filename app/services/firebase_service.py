@@ -25,6 +25,9 @@ class FirebaseService:
     _initialized = False
     _app = None
 
+    # FCM accepts at most 500 device tokens per multicast
+    MULTICAST_MAX_TOKENS = 500
+
     @classmethod
     def initialize(cls):
         """Initialize Firebase Admin SDK"""
@@ -9,6 +9,9 @@ from app.models.region import Region
 from app.models.branch import Branch
 from app.models.merchant_user import MerchantUser
 from app.models.transaction import Transaction
+from app.services.sales_rollup_service import SalesRollupService
+from app.utils.pagination import paginate
+from app.utils.report_cache import report_cache
 from app.utils.role_access import (
     get_merchant_user,
     validate_branch_access,
@@ -620,7 +623,7 @@ class MerchantService:
     # ==================== Staff ====================
 
     @staticmethod
-    def get_staff(merchant_id, requester_id=None, role=None, branch_id=None, page=1, per_page=20):
+    def get_staff(merchant_id, requester_id=None, role=None, branch_id=None, page=1, per_page=20, cursor=None, include_total=True):
         """Get staff members for a merchant with role-based filtering"""
         merchant = Merchant.query.get(merchant_id)
 
@@ -668,8 +671,9 @@ class MerchantService:
         if role:
             query = query.filter_by(role=role)
 
-        pagination = query.order_by(MerchantUser.created_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
+        pagination = paginate(
+            query, page, per_page, cursor=cursor, include_total=include_total,
+            order_by=(MerchantUser.created_at, MerchantUser.id)
         )
 
         staff_data = []
@@ -684,12 +688,7 @@ class MerchantService:
             'data': {
                 'staff': staff_data
             },
-            'meta': {
-                'page': page,
-                'per_page': per_page,
-                'total': pagination.total,
-                'total_pages': pagination.pages
-            }
+            'meta': pagination.meta
         }
 
     @staticmethod
@@ -1041,7 +1040,7 @@ class MerchantService:
     # ==================== Public Store Listing ====================
 
     @staticmethod
-    def get_stores_for_customer(city=None, search=None, page=1, per_page=20):
+    def get_stores_for_customer(city=None, search=None, page=1, per_page=20, cursor=None, include_total=True):
         """Get approved stores for customer browsing"""
         query = Merchant.query.filter_by(status='active')
 
@@ -1062,8 +1061,9 @@ class MerchantService:
                 )
             )
 
-        pagination = query.order_by(Merchant.name_ar).paginate(
-            page=page, per_page=per_page, error_out=False
+        pagination = paginate(
+            query, page, per_page, cursor=cursor, include_total=include_total,
+            order_by=(Merchant.name_ar, Merchant.id), descending=False
         )
 
         merchants_data = []
@@ -1085,12 +1085,7 @@ class MerchantService:
             'data': {
                 'merchants': merchants_data
             },
-            'meta': {
-                'page': page,
-                'per_page': per_page,
-                'total': pagination.total,
-                'total_pages': pagination.pages
-            }
+            'meta': pagination.meta
         }
 
     @staticmethod
@@ -1143,7 +1138,7 @@ class MerchantService:
     # ==================== Admin Functions ====================
 
     @staticmethod
-    def search_merchants(status=None, search=None, city=None, page=1, per_page=20):
+    def search_merchants(status=None, search=None, city=None, page=1, per_page=20, cursor=None, include_total=True):
         """Search merchants (admin only)"""
         query = Merchant.query
 
@@ -1164,20 +1159,17 @@ class MerchantService:
                 )
             )
 
-        query = query.order_by(Merchant.created_at.desc())
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+        pagination = paginate(
+            query, page, per_page, cursor=cursor, include_total=include_total,
+            order_by=(Merchant.created_at, Merchant.id)
+        )
 
         return {
             'success': True,
             'data': {
                 'merchants': [m.to_dict() for m in pagination.items]
             },
-            'meta': {
-                'page': page,
-                'per_page': per_page,
-                'total': pagination.total,
-                'total_pages': pagination.pages
-            }
+            'meta': pagination.meta
         }
 
     @staticmethod
@@ -1263,6 +1255,8 @@ class MerchantService:
         merchant.updated_at = datetime.utcnow()
 
         try:
+            # Cached admin reports include commission at the old rate
+            report_cache.mark_dirty(db.session, merchant_id)
             db.session.commit()
 
             # Log the action
@@ -1295,7 +1289,7 @@ class MerchantService:
     # ==================== Public API for Mobile App ====================
 
     @staticmethod
-    def get_public_merchants(category=None, search=None, page=1, per_page=20):
+    def get_public_merchants(category=None, search=None, page=1, per_page=20, cursor=None, include_total=True):
         """Get list of active merchants for mobile app (public endpoint)"""
         query = Merchant.query.filter(Merchant.status == 'active')
 
@@ -1311,8 +1305,10 @@ class MerchantService:
                 )
             )
 
-        query = query.order_by(Merchant.name_ar)
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+        pagination = paginate(
+            query, page, per_page, cursor=cursor, include_total=include_total,
+            order_by=(Merchant.name_ar, Merchant.id), descending=False
+        )
 
         merchants_data = []
         for merchant in pagination.items:
@@ -1338,76 +1334,7 @@ class MerchantService:
             'data': {
                 'merchants': merchants_data
             },
-            'meta': {
-                'page': page,
-                'per_page': per_page,
-                'total': pagination.total,
-                'total_pages': pagination.pages
-            }
-        }
-
-    @staticmethod
-    def get_stores_for_customer(city=None, search=None, page=1, per_page=20):
-        """Get stores for customer app"""
-        return MerchantService.get_public_merchants(
-            category=None,
-            search=search,
-            page=page,
-            per_page=per_page
-        )
-
-    @staticmethod
-    def get_store_details(merchant_id):
-        """Get store details for customer app"""
-        merchant = Merchant.query.get(merchant_id)
-
-        if not merchant:
-            return {
-                'success': False,
-                'message': 'Store not found',
-                'error_code': 'MERCH_001'
-            }
-
-        if merchant.status != 'active':
-            return {
-                'success': False,
-                'message': 'Store is not available',
-                'error_code': 'MERCH_003'
-            }
-
-        # Get branches
-        branches = Branch.query.filter_by(
-            merchant_id=merchant_id,
-            is_active=True
-        ).all()
-
-        return {
-            'success': True,
-            'data': {
-                'merchant': {
-                    'id': merchant.id,
-                    'name_ar': merchant.name_ar,
-                    'name_en': merchant.name_en,
-                    'business_type': merchant.business_type,
-                    'city': merchant.city,
-                    'logo_url': None,
-                    'rating': 4.5
-                },
-                'branches': [
-                    {
-                        'id': b.id,
-                        'name_ar': b.name_ar,
-                        'name_en': b.name_en,
-                        'city': b.city,
-                        'district': b.district,
-                        'address_line': b.address_line,
-                        'phone': b.phone,
-                        'latitude': float(b.latitude) if b.latitude else None,
-                        'longitude': float(b.longitude) if b.longitude else None
-                    }
-                    for b in branches
-                ]
-            }
+            'meta': pagination.meta
         }
 
     # ==================== Mobile App Staff Methods ====================
@@ -1563,37 +1490,31 @@ class MerchantService:
 
         # Get accessible branch IDs based on role
         accessible_branch_ids = user.get_accessible_branch_ids()
+        scope_branch_ids = None
+        if not user.can_see_all_branches() and accessible_branch_ids:
+            scope_branch_ids = accessible_branch_ids
 
         # Build transaction query based on role
         tx_query = Transaction.query.filter(Transaction.merchant_id == merchant_id)
 
-        if not user.can_see_all_branches() and accessible_branch_ids:
-            tx_query = tx_query.filter(Transaction.branch_id.in_(accessible_branch_ids))
+        if scope_branch_ids:
+            tx_query = tx_query.filter(Transaction.branch_id.in_(scope_branch_ids))
 
         # Filter by date
-        tx_query = tx_query.filter(
-            db.func.date(Transaction.created_at) >= from_date,
-            db.func.date(Transaction.created_at) <= to_date
-        )
+        tx_query = tx_query.filter(*Transaction.day_range(Transaction.created_at, from_date, to_date))
 
-        # Calculate stats
-        total_transactions = tx_query.count()
-        total_sales = db.session.query(
-            db.func.coalesce(db.func.sum(Transaction.total_amount), 0)
-        ).filter(
-            Transaction.merchant_id == merchant_id,
-            Transaction.status.in_(['confirmed', 'paid']),
-            db.func.date(Transaction.created_at) >= from_date,
-            db.func.date(Transaction.created_at) <= to_date
+        # Calculate stats from the daily sales rollup
+        summary = SalesRollupService.get_summary(
+            merchant_id=merchant_id,
+            from_date=from_date,
+            to_date=to_date,
+            branch_ids=scope_branch_ids
         )
-
-        if not user.can_see_all_branches() and accessible_branch_ids:
-            total_sales = total_sales.filter(Transaction.branch_id.in_(accessible_branch_ids))
-
-        total_sales = total_sales.scalar() or 0
+        total_transactions = SalesRollupService.total(summary)
+        total_sales = SalesRollupService.total(summary, 'total_amount', ['confirmed', 'paid'])
 
         # Pending transactions
-        pending_count = tx_query.filter(Transaction.status == 'pending').count()
+        pending_count = SalesRollupService.total(summary, statuses=['pending'])
 
         # Get recent transactions (last 5)
         recent_transactions = tx_query.order_by(
@@ -1681,53 +1602,27 @@ class MerchantService:
         week_ago = today - timedelta(days=7)
 
         accessible_branch_ids = user.get_accessible_branch_ids()
-
-        # Base query
-        tx_query = Transaction.query.filter(Transaction.merchant_id == merchant_id)
-
+        scope_branch_ids = None
         if not user.can_see_all_branches() and accessible_branch_ids:
-            tx_query = tx_query.filter(Transaction.branch_id.in_(accessible_branch_ids))
+            scope_branch_ids = accessible_branch_ids
 
-        # Today's stats
-        today_tx = tx_query.filter(
-            db.func.date(Transaction.created_at) == today
+        # Today's and this week's stats from the daily sales rollup
+        today_summary = SalesRollupService.get_summary(
+            merchant_id=merchant_id, from_date=today, to_date=today, branch_ids=scope_branch_ids
         )
+        today_count = SalesRollupService.total(today_summary)
+        today_sales = SalesRollupService.total(today_summary, 'total_amount', ['confirmed', 'paid'])
 
-        today_count = today_tx.count()
-        today_sales = db.session.query(
-            db.func.coalesce(db.func.sum(Transaction.total_amount), 0)
-        ).filter(
-            Transaction.merchant_id == merchant_id,
-            Transaction.status.in_(['confirmed', 'paid']),
-            db.func.date(Transaction.created_at) == today
-        )
-
-        if not user.can_see_all_branches() and accessible_branch_ids:
-            today_sales = today_sales.filter(Transaction.branch_id.in_(accessible_branch_ids))
-
-        today_sales = today_sales.scalar() or 0
-
-        # Week stats
-        week_tx = tx_query.filter(
-            db.func.date(Transaction.created_at) >= week_ago
+        week_summary = SalesRollupService.get_summary(
+            merchant_id=merchant_id, from_date=week_ago, branch_ids=scope_branch_ids
         )
-
-        week_count = week_tx.count()
-        week_sales = db.session.query(
-            db.func.coalesce(db.func.sum(Transaction.total_amount), 0)
-        ).filter(
-            Transaction.merchant_id == merchant_id,
-            Transaction.status.in_(['confirmed', 'paid']),
-            db.func.date(Transaction.created_at) >= week_ago
-        )
-
-        if not user.can_see_all_branches() and accessible_branch_ids:
-            week_sales = week_sales.filter(Transaction.branch_id.in_(accessible_branch_ids))
-
-        week_sales = week_sales.scalar() or 0
+        week_count = SalesRollupService.total(week_summary)
+        week_sales = SalesRollupService.total(week_summary, 'total_amount', ['confirmed', 'paid'])
 
         # Pending count
-        pending_count = tx_query.filter(Transaction.status == 'pending').count()
+        pending_count = SalesRollupService.total(SalesRollupService.get_summary(
+            merchant_id=merchant_id, branch_ids=scope_branch_ids, statuses=['pending']
+        ))
 
         stats = {
             'today': {
@@ -1856,32 +1751,24 @@ class MerchantService:
         # Get transactions created by this staff member today
         my_tx_query = Transaction.query.filter(
             Transaction.cashier_id == staff_id,
-            db.func.date(Transaction.created_at) == today
+            *Transaction.day_range(Transaction.created_at, today, today)
         )
 
-        my_transaction_count = my_tx_query.count()
-        my_sales = db.session.query(
-            db.func.coalesce(db.func.sum(Transaction.total_amount), 0)
-        ).filter(
-            Transaction.cashier_id == staff_id,
-            Transaction.status.in_(['confirmed', 'paid']),
-            db.func.date(Transaction.created_at) == today
-        ).scalar() or 0
+        my_summary = SalesRollupService.get_summary(
+            from_date=today, to_date=today, cashier_id=staff_id
+        )
+        my_transaction_count = SalesRollupService.total(my_summary)
+        my_sales = SalesRollupService.total(my_summary, 'total_amount', ['confirmed', 'paid'])
 
         # Get pending transactions in my scope
         accessible_branch_ids = user.get_accessible_branch_ids()
-
-        pending_query = Transaction.query.filter(
-            Transaction.merchant_id == merchant_id,
-            Transaction.status == 'pending'
-        )
-
+        scope_branch_ids = None
         if not user.can_see_all_branches() and accessible_branch_ids:
-            pending_query = pending_query.filter(
-                Transaction.branch_id.in_(accessible_branch_ids)
-            )
+            scope_branch_ids = accessible_branch_ids
 
-        pending_count = pending_query.count()
+        pending_count = SalesRollupService.total(SalesRollupService.get_summary(
+            merchant_id=merchant_id, branch_ids=scope_branch_ids, statuses=['pending']
+        ))
 
         # Recent transactions by me
         my_recent = my_tx_query.order_by(
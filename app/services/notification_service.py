@@ -5,6 +5,7 @@ from datetime import datetime
 from app.extensions import db
 from app.models.notification import Notification
 from app.models.device import CustomerDevice, MerchantUserDevice
+from app.utils.pagination import paginate
 from app.utils.realtime import (
     emit_to_customer,
     emit_to_staff,
@@ -16,15 +17,17 @@ class NotificationService:
     """Notification service for customer notifications"""
 
     @staticmethod
-    def get_customer_notifications(customer_id, unread_only=False, page=1, per_page=20):
+    def get_customer_notifications(customer_id, unread_only=False, page=1, per_page=20, cursor=None, include_total=True):
         """Get customer notifications"""
         query = Notification.query.filter_by(customer_id=customer_id)
 
         if unread_only:
             query = query.filter_by(is_read=False)
 
-        query = query.order_by(Notification.created_at.desc())
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+        pagination = paginate(
+            query, page, per_page, cursor=cursor, include_total=include_total,
+            order_by=(Notification.created_at, Notification.id)
+        )
 
         # Get unread count
         unread_count = Notification.query.filter_by(
@@ -38,12 +41,7 @@ class NotificationService:
                 'notifications': [n.to_dict() for n in pagination.items],
                 'unread_count': unread_count
             },
-            'meta': {
-                'page': page,
-                'per_page': per_page,
-                'total': pagination.total,
-                'total_pages': pagination.pages
-            }
+            'meta': pagination.meta
         }
 
     @staticmethod
@@ -349,15 +347,17 @@ class NotificationService:
     # ==================== Merchant Staff Notifications ====================
 
     @staticmethod
-    def get_merchant_staff_notifications(staff_id, unread_only=False, page=1, per_page=20):
+    def get_merchant_staff_notifications(staff_id, unread_only=False, page=1, per_page=20, cursor=None, include_total=True):
         """Get notifications for merchant staff member"""
         query = Notification.query.filter_by(merchant_user_id=staff_id)
 
         if unread_only:
             query = query.filter_by(is_read=False)
 
-        query = query.order_by(Notification.created_at.desc())
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+        pagination = paginate(
+            query, page, per_page, cursor=cursor, include_total=include_total,
+            order_by=(Notification.created_at, Notification.id)
+        )
 
         # Get unread count
         unread_count = Notification.query.filter_by(
@@ -371,12 +371,7 @@ class NotificationService:
                 'notifications': [n.to_dict() for n in pagination.items],
                 'unread_count': unread_count
             },
-            'meta': {
-                'page': page,
-                'per_page': per_page,
-                'total': pagination.total,
-                'total_pages': pagination.pages
-            }
+            'meta': pagination.meta
         }
 
     @staticmethod
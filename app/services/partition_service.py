@@ -0,0 +1,215 @@
+"""
+Partition Service - Monthly partitions of the transactions table (PostgreSQL)
+"""
+import re
+from datetime import date
+from flask import current_app
+from sqlalchemy import text
+from app.extensions import db
+
+
+PARTITION_NAME = re.compile(r'^transactions_p(\d{4})(\d{2})$')
+
+# Rows in any other status are still being worked on and keep their partition attached
+ARCHIVABLE_STATUSES = ('paid', 'cancelled', 'refunded')
+
+# Rows moved to <archive schema>.<table> together with their month's transactions
+ARCHIVED_CHILD_TABLES = (('payments', 'transaction_id'), ('transaction_returns', 'transaction_id'))
+
+# Rows that keep a month attached while they point at one of its transactions
+PINNING_REFERENCES = (('customer_ratings', 'transaction_id'), ('support_tickets', 'related_transaction_id'))
+
+
+def _add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+class PartitionService:
+    """
+    Maintenance of the transactions table once migration
+    011_partition_transactions has made it a PostgreSQL table partitioned
+    by transaction_date month (transactions_pYYYYMM, plus
+    transactions_default for dates no partition covers).
+
+    Queries bounded on transaction_date (see Transaction.date_range) only
+    scan the partitions of those months.
+    """
+
+    @staticmethod
+    def is_partitioned():
+        if db.engine.dialect.name != 'postgresql':
+            return False
+        return bool(db.session.execute(text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('public.transactions'))"
+        )).scalar())
+
+    @staticmethod
+    def list_partitions():
+        """Monthly partitions attached to transactions, as [(name, first day of month)] oldest first"""
+        rows = db.session.execute(text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = 'public.transactions'::regclass"
+        )).scalars()
+        partitions = []
+        for name in rows:
+            match = PARTITION_NAME.match(name)
+            if match:
+                partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+        return sorted(partitions, key=lambda partition: partition[1])
+
+    @staticmethod
+    def ensure_partitions(months_ahead=None):
+        """
+        Create the partitions for this month and the next months_ahead months.
+
+        Returns:
+            dict with success flag and the partitions created
+        """
+        if not PartitionService.is_partitioned():
+            return {
+                'success': False,
+                'message': 'transactions is not partitioned (PostgreSQL only, run the migrations)',
+                'error_code': 'VAL_001'
+            }
+        if months_ahead is None:
+            months_ahead = current_app.config.get('TRANSACTION_PARTITION_MONTHS_AHEAD', 3)
+
+        existing = {month for _, month in PartitionService.list_partitions()}
+        this_month = date.today().replace(day=1)
+        created = []
+        try:
+            for offset in range(months_ahead + 1):
+                month = _add_months(this_month, offset)
+                if month in existing:
+                    continue
+                name = f'transactions_p{month:%Y%m}'
+                db.session.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF transactions "
+                    f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+                ))
+                db.session.commit()
+                created.append(name)
+
+            return {
+                'success': True,
+                'data': {'created': created}
+            }
+        except Exception as e:
+            # Typically rows for that month already sitting in transactions_default
+            db.session.rollback()
+            return {
+                'success': False,
+                'message': f'Failed to create transaction partitions: {str(e)}',
+                'error_code': 'SYS_001',
+                'data': {'created': created}
+            }
+
+    @staticmethod
+    def archive_partitions(retention_months=None, mode='detach', dry_run=False):
+        """
+        Take monthly partitions older than the retention window out of transactions.
+
+        Only partitions whose rows are all paid, cancelled or refunded, and
+        that no rating or support ticket points into, are archived; any other
+        partition is reported as skipped. The month's payments and returns
+        are moved to <archive schema>.payments and .transaction_returns in
+        the same transaction, so no live row is left pointing at an archived
+        transaction (detaching skips the reference triggers).
+
+        Args:
+            retention_months: months kept attached before the current one
+                              (TRANSACTION_ARCHIVE_RETENTION_MONTHS by default)
+            mode: 'detach' detaches each partition and moves it as its own
+                  table into the archive schema; 'move' copies its rows into
+                  <archive schema>.transactions and drops it
+            dry_run: report what would be archived without changing anything
+
+        Returns:
+            dict with success flag and the partitions archived and skipped
+        """
+        if mode not in ('detach', 'move'):
+            return {
+                'success': False,
+                'message': "mode must be 'detach' or 'move'",
+                'error_code': 'VAL_001'
+            }
+        if not PartitionService.is_partitioned():
+            return {
+                'success': False,
+                'message': 'transactions is not partitioned (PostgreSQL only, run the migrations)',
+                'error_code': 'VAL_001'
+            }
+        if retention_months is None:
+            retention_months = current_app.config.get('TRANSACTION_ARCHIVE_RETENTION_MONTHS', 24)
+        schema = current_app.config.get('TRANSACTION_ARCHIVE_SCHEMA', 'archive')
+
+        cutoff = _add_months(date.today().replace(day=1), -retention_months)
+        archived = []
+        skipped = []
+        try:
+            for name, month in PartitionService.list_partitions():
+                if month >= cutoff:
+                    break
+
+                statuses = ', '.join(f"'{status}'" for status in ARCHIVABLE_STATUSES)
+                open_rows = db.session.execute(text(
+                    f'SELECT count(*) FROM {name} WHERE status NOT IN ({statuses})'
+                )).scalar()
+                if open_rows:
+                    skipped.append({'partition': name, 'open_transactions': open_rows})
+                    continue
+                pinned = {
+                    table: count for table, count in (
+                        (table, db.session.execute(text(
+                            f'SELECT count(*) FROM {table} WHERE {column} IN (SELECT id FROM {name})'
+                        )).scalar())
+                        for table, column in PINNING_REFERENCES
+                    ) if count
+                }
+                if pinned:
+                    skipped.append({'partition': name, 'referenced_by': pinned})
+                    continue
+                if dry_run:
+                    archived.append(name)
+                    continue
+
+                db.session.execute(text(f'CREATE SCHEMA IF NOT EXISTS {schema}'))
+                for table, column in ARCHIVED_CHILD_TABLES:
+                    db.session.execute(text(
+                        f'CREATE TABLE IF NOT EXISTS {schema}.{table} (LIKE {table} INCLUDING DEFAULTS)'
+                    ))
+                    db.session.execute(text(
+                        f'INSERT INTO {schema}.{table} SELECT * FROM {table} WHERE {column} IN (SELECT id FROM {name})'
+                    ))
+                    db.session.execute(text(f'DELETE FROM {table} WHERE {column} IN (SELECT id FROM {name})'))
+                db.session.execute(text(f'ALTER TABLE transactions DETACH PARTITION {name}'))
+                if mode == 'detach':
+                    db.session.execute(text(f'ALTER TABLE {name} SET SCHEMA {schema}'))
+                else:
+                    db.session.execute(text(
+                        f'CREATE TABLE IF NOT EXISTS {schema}.transactions (LIKE {name} INCLUDING DEFAULTS)'
+                    ))
+                    db.session.execute(text(f'INSERT INTO {schema}.transactions SELECT * FROM {name}'))
+                    db.session.execute(text(f'DROP TABLE {name}'))
+                db.session.commit()
+                archived.append(name)
+
+            return {
+                'success': True,
+                'data': {
+                    'mode': mode,
+                    'cutoff': cutoff.isoformat(),
+                    'dry_run': dry_run,
+                    'archived': archived,
+                    'skipped': skipped
+                }
+            }
+        except Exception as e:
+            db.session.rollback()
+            return {
+                'success': False,
+                'message': f'Failed to archive transaction partitions: {str(e)}',
+                'error_code': 'SYS_001',
+                'data': {'archived': archived, 'skipped': skipped}
+            }
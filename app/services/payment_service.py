@@ -1,13 +1,18 @@
 """
 Payment Service - Full Implementation
 """
-from datetime import datetime
+from datetime import datetime, timedelta
+from decimal import Decimal
 from flask import current_app
 from app.extensions import db
+from app.models.mixins import generate_reference, generate_uuid7
 from app.models.payment import Payment
 from app.models.transaction import Transaction
 from app.models.customer import Customer
 from app.models.notification import Notification
+from app.schemas.serializers import serialize_payment
+from app.services.sales_rollup_service import SalesRollupService
+from app.utils.pagination import paginate
 from app.utils.realtime import (
     emit_to_customer,
     emit_to_merchant,
@@ -79,7 +84,7 @@ class PaymentService:
     # ==================== Payment History ====================
 
     @staticmethod
-    def get_customer_payments(customer_id, page=1, per_page=20):
+    def get_customer_payments(customer_id, page=1, per_page=20, cursor=None, include_total=True):
         """Get customer's payment history"""
         customer = Customer.query.get(customer_id)
 
@@ -91,17 +96,20 @@ class PaymentService:
             }
 
         query = Payment.query.filter_by(customer_id=customer_id)
-        query = query.order_by(Payment.created_at.desc())
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+        pagination = paginate(
+            query, page, per_page, cursor=cursor, include_total=include_total,
+            order_by=(Payment.created_at, Payment.id)
+        )
 
         payments_data = []
         for payment in pagination.items:
-            payment_dict = payment.to_dict()
+            payment_dict = serialize_payment(payment)
+            # None for a payment whose transaction was archived before its payments moved with it
             payment_dict['transaction'] = {
                 'id': payment.transaction.id,
                 'reference_number': payment.transaction.reference_number,
                 'merchant_name': payment.transaction.merchant.name_ar
-            }
+            } if payment.transaction else None
             payments_data.append(payment_dict)
 
         return {
@@ -109,12 +117,7 @@ class PaymentService:
             'data': {
                 'payments': payments_data
             },
-            'meta': {
-                'page': page,
-                'per_page': per_page,
-                'total': pagination.total,
-                'total_pages': pagination.pages
-            }
+            'meta': pagination.meta
         }
 
     # ==================== Make Payment ====================
@@ -186,6 +189,7 @@ class PaymentService:
             db.session.add(payment)
 
             # Update transaction
+            previous = SalesRollupService.snapshot(transaction)
             transaction.paid_amount = float(transaction.paid_amount) + amount
             transaction.updated_at = datetime.utcnow()
 
@@ -194,10 +198,10 @@ class PaymentService:
                 transaction.status = 'paid'
                 transaction.paid_at = datetime.utcnow()
 
+            SalesRollupService.record_transaction(transaction, previous)
+
             # Update customer credit
-            customer.available_credit = float(customer.available_credit) + amount
-            customer.used_credit = float(customer.used_credit) - amount
-            customer.updated_at = datetime.utcnow()
+            customer.release_credit(amount)
 
             db.session.commit()
 
@@ -322,6 +326,7 @@ class PaymentService:
                     main_payment_ref = payment.reference_number
 
                 # Update transaction
+                previous = SalesRollupService.snapshot(txn)
                 txn.paid_amount = float(txn.paid_amount) + payment_for_txn
                 txn.updated_at = datetime.utcnow()
 
@@ -329,6 +334,8 @@ class PaymentService:
                     txn.status = 'paid'
                     txn.paid_at = datetime.utcnow()
 
+                SalesRollupService.record_transaction(txn, previous)
+
                 payments_made.append({
                     'payment_id': payment.id,
                     'transaction_id': txn.id,
@@ -340,9 +347,7 @@ class PaymentService:
                 remaining_payment -= payment_for_txn
 
             # Update customer credit
-            customer.available_credit = float(customer.available_credit) + total_amount
-            customer.used_credit = float(customer.used_credit) - total_amount
-            customer.updated_at = datetime.utcnow()
+            customer.release_credit(total_amount)
 
             db.session.commit()
 
@@ -387,7 +392,15 @@ class PaymentService:
 
     @staticmethod
     def make_bulk_payment(customer_id, total_amount, payment_method='cash'):
-        """Pay multiple transactions at once (oldest first)"""
+        """
+        Pay multiple transactions at once (earliest due first).
+
+        The outstanding transactions are read once and locked, the amount is
+        allocated across them in due-date order, and the result is written
+        with one multi-row insert for the payments, one update for all the
+        transactions and one for the customer's credit. Merchants get one
+        payment_received event each, listing their transactions.
+        """
         customer = Customer.query.get(customer_id)
 
         if not customer:
@@ -406,23 +419,38 @@ class PaymentService:
                 'error_code': 'VAL_001'
             }
 
-        # Get outstanding transactions ordered by due date (oldest first)
-        outstanding = Transaction.query.filter(
-            Transaction.customer_id == customer_id,
-            Transaction.status.in_(['confirmed', 'overdue'])
-        ).order_by(Transaction.due_date.asc()).all()
+        # Outstanding transactions, earliest due first; locked until commit so
+        # a concurrent payment cannot allocate against the same balances
+        outstanding = db.session.execute(
+            db.select(
+                Transaction.id, Transaction.reference_number, Transaction.merchant_id,
+                Transaction.branch_id, Transaction.cashier_id, Transaction.created_at,
+                Transaction.transaction_date, Transaction.status, Transaction.total_amount,
+                Transaction.paid_amount, Transaction.returned_amount
+            ).where(
+                Transaction.customer_id == customer_id,
+                Transaction.status.in_(['confirmed', 'overdue'])
+            ).order_by(Transaction.due_date.asc(), Transaction.id.asc()).with_for_update()
+        ).all()
 
         if not outstanding:
+            db.session.rollback()
             return {
                 'success': False,
                 'message': 'No outstanding transactions to pay',
                 'error_code': 'TXN_001'
             }
 
+        def remaining_of(total, paid, returned):
+            return float(total) - float(paid) - float(returned)
+
         # Calculate total outstanding
-        total_outstanding = sum(t.remaining_amount for t in outstanding)
+        total_outstanding = sum(
+            remaining_of(txn.total_amount, txn.paid_amount, txn.returned_amount) for txn in outstanding
+        )
 
         if total_amount > total_outstanding:
+            db.session.rollback()
             return {
                 'success': False,
                 'message': f'Payment amount exceeds total outstanding of {total_outstanding} SAR',
@@ -430,51 +458,63 @@ class PaymentService:
             }
 
         try:
+            now = datetime.utcnow()
             remaining_payment = total_amount
             payments_made = []
+            payment_rows = []
+            allocations = []
+            rollup_changes = []
 
             for txn in outstanding:
                 if remaining_payment <= 0:
                     break
 
-                txn_remaining = txn.remaining_amount
-
                 # Determine how much to pay for this transaction
-                payment_for_txn = min(remaining_payment, txn_remaining)
-
-                # Create payment
-                payment = Payment(
-                    transaction_id=txn.id,
-                    customer_id=customer_id,
-                    amount=payment_for_txn,
-                    payment_method=payment_method,
-                    status='completed',
-                    completed_at=datetime.utcnow()
+                payment_for_txn = min(
+                    remaining_payment, remaining_of(txn.total_amount, txn.paid_amount, txn.returned_amount)
                 )
-                db.session.add(payment)
+                paid_amount = float(txn.paid_amount) + payment_for_txn
+                status = 'paid' if remaining_of(txn.total_amount, paid_amount, txn.returned_amount) <= 0 else txn.status
 
-                # Update transaction
-                txn.paid_amount = float(txn.paid_amount) + payment_for_txn
-                txn.updated_at = datetime.utcnow()
-
-                if txn.remaining_amount <= 0:
-                    txn.status = 'paid'
-                    txn.paid_at = datetime.utcnow()
+                payment_id = generate_uuid7()
+                payment_rows.append({
+                    'id': payment_id,
+                    'reference_number': generate_reference('PAY'),
+                    'transaction_id': txn.id,
+                    'customer_id': customer_id,
+                    'amount': payment_for_txn,
+                    'payment_method': payment_method,
+                    'status': 'completed',
+                    'completed_at': now,
+                    'refunded_amount': 0,
+                    'created_at': now,
+                    'updated_at': now,
+                })
+                allocations.append({
+                    'b_id': txn.id,
+                    'b_transaction_date': txn.transaction_date,
+                    'b_amount': Decimal(str(payment_for_txn)),
+                    'b_status': status,
+                })
+                previous = SalesRollupService.snapshot(txn)
+                rollup_changes.append((txn, previous, dict(previous, status=status, paid_amount=paid_amount)))
 
                 payments_made.append({
-                    'payment_id': payment.id,
+                    'payment_id': payment_id,
                     'transaction_id': txn.id,
                     'reference_number': txn.reference_number,
                     'amount': payment_for_txn,
-                    'transaction_status': txn.status
+                    'transaction_status': status
                 })
 
                 remaining_payment -= payment_for_txn
 
+            db.session.execute(db.insert(Payment).values(payment_rows))
+            PaymentService._apply_allocations(allocations, now)
+            SalesRollupService.record_changes(rollup_changes)
+
             # Update customer credit
-            customer.available_credit = float(customer.available_credit) + total_amount
-            customer.used_credit = float(customer.used_credit) - total_amount
-            customer.updated_at = datetime.utcnow()
+            customer.release_credit(total_amount)
 
             db.session.commit()
 
@@ -486,14 +526,21 @@ class PaymentService:
             })
             emit_to_customer(customer.id, 'credit_updated', build_credit_event_data(customer))
 
-            # Notify merchants for each transaction
-            for txn in outstanding:
-                if any(p['transaction_id'] == txn.id for p in payments_made):
-                    emit_to_merchant(txn.merchant_id, 'payment_received', {
-                        'transaction_id': txn.id,
-                        'reference_number': txn.reference_number,
-                        'customer_id': customer.id
-                    })
+            # One event per merchant for the transactions it was paid for
+            by_merchant = {}
+            for txn, payment in zip(outstanding, payments_made):
+                by_merchant.setdefault(txn.merchant_id, []).append(payment)
+            for merchant_id, merchant_payments in by_merchant.items():
+                emit_to_merchant(merchant_id, 'payment_received', {
+                    'transaction_id': merchant_payments[0]['transaction_id'],
+                    'reference_number': merchant_payments[0]['reference_number'],
+                    'customer_id': customer.id,
+                    'amount': sum(p['amount'] for p in merchant_payments),
+                    'transactions': [
+                        {key: p[key] for key in ('transaction_id', 'reference_number', 'amount', 'transaction_status')}
+                        for p in merchant_payments
+                    ]
+                })
 
             return {
                 'success': True,
@@ -515,32 +562,153 @@ class PaymentService:
                 'error_code': 'SYS_001'
             }
 
+    @staticmethod
+    def _apply_allocations(allocations, now):
+        """
+        Add each allocation's amount to its transaction's paid_amount and set
+        its status in one statement (paid_at too when it becomes paid).
+
+        allocations: dicts with b_id, b_transaction_date, b_amount and b_status
+        """
+        table = Transaction.__table__
+        if db.engine.dialect.name == 'postgresql':
+            # UPDATE ... FROM (VALUES ...); transaction_date in the join lets the
+            # planner go straight to each row's partition
+            allocation = db.values(
+                db.column('id', db.String), db.column('transaction_date', db.DateTime),
+                db.column('amount', db.Numeric(10, 2)), db.column('status', db.String),
+                name='allocation'
+            ).data([
+                (a['b_id'], a['b_transaction_date'], a['b_amount'], a['b_status']) for a in allocations
+            ])
+            db.session.execute(
+                table.update()
+                .where(table.c.id == allocation.c.id, table.c.transaction_date == allocation.c.transaction_date)
+                .values(
+                    paid_amount=table.c.paid_amount + allocation.c.amount,
+                    status=allocation.c.status,
+                    paid_at=db.case((allocation.c.status == 'paid', now), else_=table.c.paid_at),
+                    updated_at=now
+                )
+            )
+        else:
+            # SQLite cannot name the columns of a VALUES list: one statement, executed per allocation
+            db.session.execute(
+                table.update()
+                .where(table.c.id == db.bindparam('b_id'))
+                .values(
+                    paid_amount=table.c.paid_amount + db.bindparam('b_amount'),
+                    status=db.bindparam('b_status'),
+                    paid_at=db.case((db.bindparam('b_status') == 'paid', now), else_=table.c.paid_at),
+                    updated_at=now
+                ),
+                allocations
+            )
+
     # ==================== Payment Reminders ====================
 
     @staticmethod
-    def send_payment_reminders():
-        """Send payment reminders for due transactions (called by scheduler)"""
-        from datetime import timedelta
-
+    def send_payment_reminders(batch_size=1000, progress=None):
+        """
+        Send payment reminders for confirmed transactions due in one of the
+        PAYMENT_REMINDER_DAYS (called by scheduler).
+
+        One query covers every reminder offset, with the customer's language
+        and push preference joined in, and is walked in batches of
+        batch_size by id. Each batch writes its in-app notifications with one
+        bulk insert and is committed on its own. Transactions already
+        reminded today are skipped, so a run can simply be repeated; a batch
+        that fails is rolled back, counted as failed and the run carries on.
+        Push notifications are sent after the last batch: one per customer,
+        grouped by message and sent through FirebaseService.send_multicast
+        in chunks of FirebaseService.MULTICAST_MAX_TOKENS devices.
+
+        Args:
+            batch_size: transactions per batch
+            progress: optional callable receiving the running totals after each batch
+
+        Returns:
+            dict with success flag and the run's metrics (sent, skipped, failed,
+            pushed, push_failed, batches, duration_ms)
+        """
         today = datetime.utcnow().date()
+        started = datetime.utcnow()
         reminder_days = current_app.config.get('PAYMENT_REMINDER_DAYS', [3, 1, 0])
-
-        count = 0
-        for days in reminder_days:
-            due_date = today + timedelta(days=days)
-
-            transactions = Transaction.query.filter(
-                Transaction.status == 'confirmed',
-                Transaction.due_date == due_date
-            ).all()
-
-            for txn in transactions:
-                PaymentService._send_reminder(txn.customer, txn, days)
-                count += 1
-
+        days_until = {today + timedelta(days=days): days for days in reminder_days}
+        metrics = {'sent': 0, 'skipped': 0, 'failed': 0, 'pushed': 0, 'push_failed': 0, 'batches': 0, 'duration_ms': 0}
+
+        # Served by ix_transactions_status_due_date
+        due = db.select(
+            Transaction.id, Transaction.reference_number, Transaction.customer_id, Transaction.due_date,
+            Transaction.total_amount, Transaction.paid_amount, Transaction.returned_amount,
+            Customer.language, Customer.notifications_enabled
+        ).join(Customer, Customer.id == Transaction.customer_id).where(
+            Transaction.status == 'confirmed',
+            Transaction.due_date.in_(list(days_until))
+        ).order_by(Transaction.id).limit(batch_size)
+
+        # customer_id -> [language, days until the nearest due date, reminder count]
+        pushes = {}
+        last_id = None
+        while True:
+            batch = db.session.execute(due if last_id is None else due.where(Transaction.id > last_id)).all()
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            try:
+                reminded = set(db.session.execute(
+                    db.select(Notification.related_entity_id).where(
+                        Notification.customer_id.in_({row.customer_id for row in batch}),
+                        Notification.type == 'payment_reminder',
+                        Notification.related_entity_type == 'transaction',
+                        Notification.related_entity_id.in_([row.id for row in batch]),
+                        Notification.created_at >= datetime.combine(today, datetime.min.time())
+                    )
+                ).scalars())
+                pending = [row for row in batch if row.id not in reminded]
+                if pending:
+                    db.session.execute(db.insert(Notification), [
+                        PaymentService._reminder_notification_row(row, days_until[row.due_date]) for row in pending
+                    ])
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                metrics['failed'] += len(batch)
+                current_app.logger.error(f'Payment reminders: batch of {len(batch)} failed: {str(e)}')
+            else:
+                metrics['sent'] += len(pending)
+                metrics['skipped'] += len(batch) - len(pending)
+                for row in pending:
+                    if not row.notifications_enabled:
+                        continue
+                    push = pushes.setdefault(row.customer_id, [row.language, days_until[row.due_date], 0])
+                    push[1] = min(push[1], days_until[row.due_date])
+                    push[2] += 1
+
+            metrics['batches'] += 1
+            metrics['duration_ms'] = int((datetime.utcnow() - started).total_seconds() * 1000)
+            if progress:
+                progress(dict(metrics))
+
+        PaymentService._push_reminders(pushes, metrics)
+
+        metrics['duration_ms'] = int((datetime.utcnow() - started).total_seconds() * 1000)
+        message = (f"Payment reminders: {metrics['sent']} sent, {metrics['skipped']} skipped, "
+                   f"{metrics['failed']} failed; {metrics['pushed']} pushes delivered, "
+                   f"{metrics['push_failed']} failed")
+        current_app.logger.info(message)
+        if metrics['failed']:
+            return {
+                'success': False,
+                'message': message,
+                'error_code': 'SYS_001',
+                'data': metrics
+            }
         return {
             'success': True,
-            'message': f'Sent {count} payment reminders'
+            'message': message,
+            'data': metrics
         }
 
     # ==================== Admin/Report Functions ====================
@@ -599,7 +767,7 @@ class PaymentService:
         }
 
     @staticmethod
-    def get_all_payments(status=None, from_date=None, to_date=None, page=1, per_page=20):
+    def get_all_payments(status=None, from_date=None, to_date=None, page=1, per_page=20, cursor=None, include_total=True):
         """Get all payments for admin"""
         query = Payment.query
 
@@ -612,12 +780,14 @@ class PaymentService:
         if to_date:
             query = query.filter(Payment.created_at <= to_date)
 
-        query = query.order_by(Payment.created_at.desc())
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+        pagination = paginate(
+            query, page, per_page, cursor=cursor, include_total=include_total,
+            order_by=(Payment.created_at, Payment.id)
+        )
 
         payments_data = []
         for payment in pagination.items:
-            payment_dict = payment.to_dict()
+            payment_dict = serialize_payment(payment)
             payment_dict['customer'] = {
                 'id': payment.customer.id,
                 'name_ar': payment.customer.full_name_ar,
@@ -626,7 +796,7 @@ class PaymentService:
             payment_dict['transaction'] = {
                 'id': payment.transaction.id,
                 'reference_number': payment.transaction.reference_number
-            }
+            } if payment.transaction else None
             payments_data.append(payment_dict)
 
         return {
@@ -634,12 +804,7 @@ class PaymentService:
             'data': {
                 'payments': payments_data
             },
-            'meta': {
-                'page': page,
-                'per_page': per_page,
-                'total': pagination.total,
-                'total_pages': pagination.pages
-            }
+            'meta': pagination.meta
         }
 
     # ==================== Notifications ====================
@@ -663,30 +828,83 @@ class PaymentService:
             pass
 
     @staticmethod
-    def _send_reminder(customer, transaction, days_until_due):
-        """Send payment reminder notification"""
-        try:
-            if days_until_due == 0:
-                title_ar = 'تذكير: موعد السداد اليوم'
-                title_en = 'Reminder: Payment Due Today'
-                body_ar = f'موعد سداد المعاملة رقم {transaction.reference_number} اليوم. المبلغ المتبقي: {transaction.remaining_amount} ريال'
-                body_en = f'Payment for transaction {transaction.reference_number} is due today. Remaining: {transaction.remaining_amount} SAR'
-            else:
-                title_ar = f'تذكير: موعد السداد بعد {days_until_due} أيام'
-                title_en = f'Reminder: Payment Due in {days_until_due} Days'
-                body_ar = f'موعد سداد المعاملة رقم {transaction.reference_number} بعد {days_until_due} أيام. المبلغ المتبقي: {transaction.remaining_amount} ريال'
-                body_en = f'Payment for transaction {transaction.reference_number} is due in {days_until_due} days. Remaining: {transaction.remaining_amount} SAR'
+    def _reminder_titles(days_until_due):
+        """Arabic and English reminder titles for a due date days_until_due days away"""
+        if days_until_due == 0:
+            return 'تذكير: موعد السداد اليوم', 'Reminder: Payment Due Today'
+        return f'تذكير: موعد السداد بعد {days_until_due} أيام', f'Reminder: Payment Due in {days_until_due} Days'
 
-            notification = Notification(
-                customer_id=customer.id,
-                title_ar=title_ar,
-                title_en=title_en,
-                body_ar=body_ar,
-                body_en=body_en,
-                type='payment_reminder',
-                reference_id=transaction.id
-            )
-            db.session.add(notification)
-            db.session.commit()
-        except Exception:
-            pass
+    @staticmethod
+    def _reminder_notification_row(transaction, days_until_due):
+        """Notification values reminding the customer of a due transaction (for bulk inserts)"""
+        title_ar, title_en = PaymentService._reminder_titles(days_until_due)
+        remaining = float(transaction.total_amount) - float(transaction.paid_amount) - float(transaction.returned_amount)
+        if days_until_due == 0:
+            body_ar = f'موعد سداد المعاملة رقم {transaction.reference_number} اليوم. المبلغ المتبقي: {remaining} ريال'
+            body_en = f'Payment for transaction {transaction.reference_number} is due today. Remaining: {remaining} SAR'
+        else:
+            body_ar = f'موعد سداد المعاملة رقم {transaction.reference_number} بعد {days_until_due} أيام. المبلغ المتبقي: {remaining} ريال'
+            body_en = f'Payment for transaction {transaction.reference_number} is due in {days_until_due} days. Remaining: {remaining} SAR'
+        return {
+            'customer_id': transaction.customer_id,
+            'title_ar': title_ar,
+            'title_en': title_en,
+            'body_ar': body_ar,
+            'body_en': body_en,
+            'type': 'payment_reminder',
+            'related_entity_type': 'transaction',
+            'related_entity_id': transaction.id
+        }
+
+    @staticmethod
+    def _push_reminders(pushes, metrics):
+        """
+        Push one reminder per customer to their active devices.
+
+        pushes maps customer_id to (language, days until the nearest due
+        date, reminder count). Customers whose push reads the same share
+        send_multicast calls of up to MULTICAST_MAX_TOKENS devices; delivered
+        and failed device counts are added to metrics.
+        """
+        from app.models.device import CustomerDevice
+        from app.services.firebase_service import FirebaseService
+
+        # (language, days, count) -> device tokens
+        groups = {}
+        customer_ids = list(pushes)
+        for start in range(0, len(customer_ids), FirebaseService.MULTICAST_MAX_TOKENS):
+            try:
+                devices = db.session.execute(
+                    db.select(CustomerDevice.customer_id, CustomerDevice.fcm_token).where(
+                        CustomerDevice.customer_id.in_(customer_ids[start:start + FirebaseService.MULTICAST_MAX_TOKENS]),
+                        CustomerDevice.is_active == True
+                    )
+                ).all()
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.error(f'Payment reminders: failed to load devices: {str(e)}')
+                continue
+            for customer_id, fcm_token in devices:
+                groups.setdefault(tuple(pushes[customer_id]), []).append(fcm_token)
+
+        for (language, days, count), tokens in groups.items():
+            title_ar, title_en = PaymentService._reminder_titles(days)
+            if language == 'en':
+                title = title_en
+                when = 'today' if days == 0 else f'in {days} days'
+                body = f'You have a payment due {when}' if count == 1 else f'You have {count} payments due, the next one {when}'
+            else:
+                title = title_ar
+                when = 'اليوم' if days == 0 else f'بعد {days} أيام'
+                body = f'لديك دفعة مستحقة {when}' if count == 1 else f'لديك {count} دفعات مستحقة، أقربها {when}'
+            data = {'notification_type': 'payment_reminder', 'days_until_due': str(days)}
+
+            for start in range(0, len(tokens), FirebaseService.MULTICAST_MAX_TOKENS):
+                chunk = tokens[start:start + FirebaseService.MULTICAST_MAX_TOKENS]
+                try:
+                    result = FirebaseService.send_multicast(tokens=chunk, title=title, body=body, data=data)
+                    metrics['pushed'] += result['success_count']
+                    metrics['push_failed'] += result['failure_count']
+                except Exception as e:
+                    metrics['push_failed'] += len(chunk)
+                    current_app.logger.error(f'Payment reminders: push to {len(chunk)} devices failed: {str(e)}')
@@ -13,6 +13,7 @@ from app.models.payment import Payment
 from app.models.transaction import Transaction
 from app.models.customer import Customer
 from app.models.notification import Notification
+from app.services.sales_rollup_service import SalesRollupService
 
 
 class PayTabsService:
@@ -428,6 +429,7 @@ class PayTabsService:
                 payment_for_txn = min(remaining_payment, txn_remaining)
 
                 # Update transaction
+                previous = SalesRollupService.snapshot(txn)
                 txn.paid_amount = float(txn.paid_amount) + payment_for_txn
                 txn.updated_at = datetime.utcnow()
 
@@ -435,6 +437,8 @@ class PayTabsService:
                     txn.status = 'paid'
                     txn.paid_at = datetime.utcnow()
 
+                SalesRollupService.record_transaction(txn, previous)
+
                 payments_made.append({
                     'transaction_id': txn.id,
                     'reference_number': txn.reference_number,
@@ -446,9 +450,7 @@ class PayTabsService:
 
             # Update customer credit
             total_paid = float(amount) - remaining_payment
-            customer.available_credit = float(customer.available_credit) + total_paid
-            customer.used_credit = float(customer.used_credit) - total_paid
-            customer.updated_at = datetime.utcnow()
+            customer.release_credit(total_paid)
 
             # Send notification
             PayTabsService._notify_payment_success(customer, payment, payments_made)
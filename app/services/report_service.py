@@ -2,13 +2,17 @@
 Report Service - Full Implementation
 """
 from datetime import datetime, timedelta
-from sqlalchemy import func, and_
+from sqlalchemy import func, and_, cast, Integer, String
 from app import db
 from app.models.customer import Customer
+from app.models.daily_sales_rollup import DailySalesRollup
 from app.models.merchant import Merchant
 from app.models.transaction import Transaction
 from app.models.payment import Payment
 from app.models.settlement import Settlement
+from app.services.analytics_snapshot_service import AnalyticsSnapshotService
+from app.services.sales_rollup_service import SalesRollupService
+from app.utils.report_cache import report_cache
 from app.utils.role_access import (
     get_merchant_user,
     validate_branch_access,
@@ -23,7 +27,7 @@ class ReportService:
     def get_merchant_summary(merchant_id, staff_id=None, branch_id=None, from_date=None, to_date=None):
         """Get merchant summary report with role-based filtering"""
         try:
-            query = Transaction.query.filter_by(merchant_id=merchant_id)
+            scope_branch_ids = None
 
             # Apply role-based filtering if staff_id is provided
             if staff_id:
@@ -40,7 +44,7 @@ class ReportService:
                     if not user.can_see_all_branches():
                         accessible_branch_ids = user.get_accessible_branch_ids()
                         if accessible_branch_ids:
-                            query = query.filter(Transaction.branch_id.in_(accessible_branch_ids))
+                            scope_branch_ids = accessible_branch_ids
                         else:
                             return {
                                 'success': True,
@@ -62,7 +66,7 @@ class ReportService:
                                 'message': 'Access denied to this branch',
                                 'error_code': 'AUTH_003'
                             }
-                        query = query.filter_by(branch_id=branch_id)
+                        scope_branch_ids = [branch_id]
                 else:
                     return {
                         'success': False,
@@ -70,31 +74,38 @@ class ReportService:
                         'error_code': 'MERCH_006'
                     }
             elif branch_id:
-                query = query.filter_by(branch_id=branch_id)
-
-            if from_date:
-                query = query.filter(Transaction.created_at >= from_date)
-            if to_date:
-                query = query.filter(Transaction.created_at <= to_date)
-
-            transactions = query.all()
-
-            total_amount = sum(float(t.total_amount or 0) for t in transactions)
-            paid_amount = sum(float(t.paid_amount or 0) for t in transactions)
-            cancelled = [t for t in transactions if t.status == 'cancelled']
-            returns_amount = sum(float(t.total_amount or 0) for t in cancelled)
-
-            return {
-                'success': True,
-                'data': {
-                    'total_transactions': len(transactions),
-                    'total_amount': total_amount,
-                    'paid_amount': paid_amount,
-                    'total_returns': len(cancelled),
-                    'returns_amount': returns_amount,
-                    'net_amount': total_amount - returns_amount,
+                scope_branch_ids = [branch_id]
+
+            # Totals come from the daily sales rollup (date range is inclusive by day)
+            def compute():
+                summary = SalesRollupService.get_summary(
+                    merchant_id=merchant_id,
+                    from_date=from_date,
+                    to_date=to_date,
+                    branch_ids=scope_branch_ids
+                )
+
+                total_amount = SalesRollupService.total(summary, 'total_amount')
+                paid_amount = SalesRollupService.total(summary, 'paid_amount')
+                returns_amount = SalesRollupService.total(summary, 'total_amount', ['cancelled'])
+
+                return {
+                    'success': True,
+                    'data': {
+                        'total_transactions': SalesRollupService.total(summary),
+                        'total_amount': total_amount,
+                        'paid_amount': paid_amount,
+                        'total_returns': SalesRollupService.total(summary, statuses=['cancelled']),
+                        'returns_amount': returns_amount,
+                        'net_amount': total_amount - returns_amount,
+                    }
                 }
-            }
+
+            return report_cache.get_or_compute(
+                'merchant_summary', compute,
+                merchant_id=merchant_id, branch_ids=scope_branch_ids,
+                from_date=from_date, to_date=to_date
+            )
         except Exception as e:
             return {'success': False, 'message': str(e)}
 
@@ -102,7 +113,7 @@ class ReportService:
     def get_transaction_report(merchant_id, staff_id=None, branch_id=None, from_date=None, to_date=None, group_by='day'):
         """Get transaction report grouped by period with role-based filtering"""
         try:
-            query = Transaction.query.filter_by(merchant_id=merchant_id)
+            scope_branch_ids = None
 
             # Apply role-based filtering if staff_id is provided
             if staff_id:
@@ -119,7 +130,7 @@ class ReportService:
                     if not user.can_see_all_branches():
                         accessible_branch_ids = user.get_accessible_branch_ids()
                         if accessible_branch_ids:
-                            query = query.filter(Transaction.branch_id.in_(accessible_branch_ids))
+                            scope_branch_ids = accessible_branch_ids
                         else:
                             return {
                                 'success': True,
@@ -134,7 +145,7 @@ class ReportService:
                                 'message': 'Access denied to this branch',
                                 'error_code': 'AUTH_003'
                             }
-                        query = query.filter_by(branch_id=branch_id)
+                        scope_branch_ids = [branch_id]
                 else:
                     return {
                         'success': False,
@@ -142,45 +153,84 @@ class ReportService:
                         'error_code': 'MERCH_006'
                     }
             elif branch_id:
-                query = query.filter_by(branch_id=branch_id)
-
-            if from_date:
-                query = query.filter(Transaction.created_at >= from_date)
-            if to_date:
-                query = query.filter(Transaction.created_at <= to_date)
-
-            transactions = query.order_by(Transaction.created_at).all()
-
-            # Group by date
-            grouped = {}
-            for t in transactions:
-                if group_by == 'day':
-                    key = t.created_at.strftime('%Y-%m-%d')
-                elif group_by == 'week':
-                    key = t.created_at.strftime('%Y-W%W')
-                elif group_by == 'month':
-                    key = t.created_at.strftime('%Y-%m')
-                else:
-                    key = t.created_at.strftime('%Y-%m-%d')
-
-                if key not in grouped:
-                    grouped[key] = {'date': key, 'count': 0, 'amount': 0, 'paid': 0}
-                grouped[key]['count'] += 1
-                grouped[key]['amount'] += float(t.total_amount or 0)
-                grouped[key]['paid'] += float(t.paid_amount or 0)
-
-            return {
-                'success': True,
-                'data': {
-                    'data': list(grouped.values())
+                scope_branch_ids = [branch_id]
+
+            def compute():
+                query = Transaction.query.filter_by(merchant_id=merchant_id)
+                if scope_branch_ids is not None:
+                    query = query.filter(Transaction.branch_id.in_(scope_branch_ids))
+                if from_date:
+                    query = query.filter(Transaction.created_at >= from_date)
+                if to_date:
+                    query = query.filter(Transaction.created_at <= to_date)
+                # Partition pruning on PostgreSQL
+                query = query.filter(*Transaction.date_range(from_date, to_date, slack_days=1))
+
+                # Aggregate per period in the database instead of loading every row
+                period = ReportService._period_bucket(Transaction.created_at, group_by)
+                rows = query.with_entities(
+                    period.label('period'),
+                    func.count(Transaction.id),
+                    func.coalesce(func.sum(Transaction.total_amount), 0),
+                    func.coalesce(func.sum(Transaction.paid_amount), 0)
+                ).group_by(period).order_by(period).all()
+
+                grouped = [
+                    {'date': key, 'count': count, 'amount': float(amount), 'paid': float(paid)}
+                    for key, count, amount, paid in rows
+                ]
+
+                return {
+                    'success': True,
+                    'data': {
+                        'data': grouped
+                    }
                 }
-            }
+
+            return report_cache.get_or_compute(
+                'merchant_transactions', compute,
+                merchant_id=merchant_id, branch_ids=scope_branch_ids,
+                from_date=from_date, to_date=to_date, group_by=group_by
+            )
         except Exception as e:
             return {'success': False, 'message': str(e)}
 
+    @staticmethod
+    def _period_bucket(column, group_by='day'):
+        """
+        Build a SQL expression that renders a timestamp column as a period key.
+
+        Keys match the Python strftime formats used across the reports
+        ('%Y-%m-%d', '%Y-W%W', '%Y-%m') on both SQLite and PostgreSQL.
+        """
+        if db.engine.dialect.name == 'sqlite':
+            formats = {'week': '%Y-W%W', 'month': '%Y-%m'}
+            return func.strftime(formats.get(group_by, '%Y-%m-%d'), column)
+
+        if group_by == 'week':
+            # %W: week of the year with Monday as the first day (00-53)
+            week_number = func.floor(
+                (func.date_part('doy', column) + 7 - func.date_part('isodow', column)) / 7
+            )
+            return func.concat(
+                func.to_char(column, 'YYYY'), '-W',
+                func.lpad(cast(cast(week_number, Integer), String), 2, '0')
+            )
+        if group_by == 'month':
+            return func.to_char(column, 'YYYY-MM')
+        return func.to_char(column, 'YYYY-MM-DD')
+
     @staticmethod
     def get_admin_overview(from_date=None, to_date=None, report_type='overview'):
-        """Get admin overview report"""
+        """Get admin overview report (cached)"""
+        return report_cache.get_or_compute(
+            f'admin_{report_type}',
+            lambda: ReportService._compute_admin_overview(from_date, to_date, report_type),
+            from_date=from_date, to_date=to_date
+        )
+
+    @staticmethod
+    def _compute_admin_overview(from_date=None, to_date=None, report_type='overview'):
         try:
             # Parse dates
             if from_date:
@@ -193,27 +243,38 @@ class ReportService:
             else:
                 to_date = datetime.utcnow()
 
+            if report_type == 'merchants':
+                return ReportService._build_merchants_report(from_date, to_date)
+
+            # Platform-wide reports are answered from the columnar snapshot once it has been built
+            if AnalyticsSnapshotService.is_available():
+                if report_type == 'transactions':
+                    return AnalyticsSnapshotService.transactions_report(from_date, to_date)
+                elif report_type == 'customers':
+                    return AnalyticsSnapshotService.customers_report(from_date, to_date)
+                return AnalyticsSnapshotService.overview_report(from_date, to_date)
+
+            if report_type == 'customers':
+                return ReportService._build_customers_report(from_date, to_date)
+
             # Query transactions in range
             transactions = Transaction.query.filter(
                 Transaction.created_at >= from_date,
-                Transaction.created_at <= to_date
+                Transaction.created_at <= to_date,
+                *Transaction.date_range(from_date, to_date, slack_days=1)
             ).all()
 
+            # Build report based on type
+            if report_type == 'transactions':
+                return ReportService._build_transactions_report(transactions, from_date, to_date)
+
             # Query payments in range
             payments = Payment.query.filter(
                 Payment.created_at >= from_date,
                 Payment.created_at <= to_date
             ).all()
 
-            # Build report based on type
-            if report_type == 'transactions':
-                return ReportService._build_transactions_report(transactions, from_date, to_date)
-            elif report_type == 'customers':
-                return ReportService._build_customers_report(from_date, to_date)
-            elif report_type == 'merchants':
-                return ReportService._build_merchants_report(from_date, to_date)
-            else:
-                return ReportService._build_overview_report(transactions, payments, from_date, to_date)
+            return ReportService._build_overview_report(transactions, payments, from_date, to_date)
         except Exception as e:
             return {'success': False, 'message': str(e)}
 
@@ -315,7 +376,7 @@ class ReportService:
             func.sum(Transaction.total_amount).label('total_amount'),
             func.sum(Transaction.paid_amount).label('paid_amount')
         ).join(Transaction, Customer.id == Transaction.customer_id)\
-         .filter(Transaction.created_at >= from_date)\
+         .filter(Transaction.created_at >= from_date, *Transaction.date_range(from_date, slack_days=1))\
          .group_by(Customer.id)\
          .order_by(func.sum(Transaction.total_amount).desc())\
          .limit(10).all()
@@ -375,7 +436,7 @@ class ReportService:
             func.count(Transaction.id).label('transactions_count'),
             func.sum(Transaction.total_amount).label('total_sales')
         ).join(Transaction, Merchant.id == Transaction.merchant_id)\
-         .filter(Transaction.created_at >= from_date)\
+         .filter(Transaction.created_at >= from_date, *Transaction.date_range(from_date, slack_days=1))\
          .group_by(Merchant.id)\
          .order_by(func.sum(Transaction.total_amount).desc())\
          .limit(10).all()
@@ -412,7 +473,15 @@ class ReportService:
 
     @staticmethod
     def get_financial_report(from_date=None, to_date=None):
-        """Get financial report"""
+        """Get financial report (aggregated in SQL; date range is inclusive by day; cached)"""
+        return report_cache.get_or_compute(
+            'admin_financial',
+            lambda: ReportService._compute_financial_report(from_date, to_date),
+            from_date=from_date, to_date=to_date
+        )
+
+    @staticmethod
+    def _compute_financial_report(from_date=None, to_date=None):
         try:
             # Parse dates
             if from_date:
@@ -425,63 +494,71 @@ class ReportService:
             else:
                 to_date = datetime.utcnow()
 
-            # Query transactions
-            transactions = Transaction.query.filter(
-                Transaction.created_at >= from_date,
-                Transaction.created_at <= to_date
+            from_day = from_date.date() if isinstance(from_date, datetime) else from_date
+            to_day = to_date.date() if isinstance(to_date, datetime) else to_date
+
+            # Revenue and commission by day from the sales rollup, using each merchant's own rate
+            rate = func.coalesce(Merchant.commission_rate, 2.5)
+            day_rows = db.session.query(
+                DailySalesRollup.rollup_date,
+                func.sum(DailySalesRollup.transaction_count),
+                func.coalesce(func.sum(DailySalesRollup.total_amount), 0),
+                func.coalesce(func.sum(DailySalesRollup.paid_amount * rate / 100), 0)
+            ).join(
+                Merchant, Merchant.id == DailySalesRollup.merchant_id
+            ).filter(
+                DailySalesRollup.rollup_date >= from_day,
+                DailySalesRollup.rollup_date <= to_day
+            ).group_by(
+                DailySalesRollup.rollup_date
+            ).having(
+                func.sum(DailySalesRollup.transaction_count) > 0
             ).all()
 
-            # Query completed payments
-            payments = Payment.query.filter(
-                Payment.created_at >= from_date,
-                Payment.created_at <= to_date,
-                Payment.status == 'completed'
-            ).all()
+            daily = {}
+            for day, count, revenue, commission in day_rows:
+                key = day.isoformat() if hasattr(day, 'isoformat') else str(day)
+                daily[key] = {
+                    'date': key,
+                    'transactions_count': int(count),
+                    'revenue': float(revenue),
+                    'payments': 0,
+                    'commission': float(commission)
+                }
 
-            # Calculate totals
-            total_revenue = sum(float(t.total_amount or 0) for t in transactions)
-            total_paid = sum(float(p.amount or 0) for p in payments)
+            # Completed payments by day and method
+            payment_day = ReportService._period_bucket(Payment.created_at, 'day')
+            method = func.coalesce(Payment.payment_method, 'other')
+            payment_rows = db.session.query(
+                payment_day, method, func.coalesce(func.sum(Payment.amount), 0)
+            ).filter(
+                Payment.created_at >= datetime.combine(from_day, datetime.min.time()),
+                Payment.created_at < datetime.combine(to_day + timedelta(days=1), datetime.min.time()),
+                Payment.status == 'completed'
+            ).group_by(payment_day, method).all()
 
-            # Calculate commission
-            commission_by_merchant = {}
-            for t in transactions:
-                if t.merchant_id not in commission_by_merchant:
-                    merchant = Merchant.query.get(t.merchant_id)
-                    rate = float(merchant.commission_rate or 2.5) if merchant else 2.5
-                    commission_by_merchant[t.merchant_id] = rate
-                rate = commission_by_merchant[t.merchant_id]
-                # Commission is calculated on paid amount
+            total_paid = 0
+            payment_methods = {}
+            for day, method_name, amount in payment_rows:
+                amount = float(amount)
+                total_paid += amount
+                payment_methods[method_name] = payment_methods.get(method_name, 0) + amount
+                if day in daily:
+                    daily[day]['payments'] += amount
 
-            total_commission = sum(float(t.paid_amount or 0) * 0.025 for t in transactions)  # Simplified
+            total_revenue = sum(d['revenue'] for d in daily.values())
+            total_commission = sum(d['commission'] for d in daily.values())
 
-            # Outstanding debt
-            outstanding = Transaction.query.filter(
-                Transaction.status.in_(['confirmed', 'pending', 'overdue'])
-            ).with_entities(func.sum(Transaction.total_amount - Transaction.paid_amount - Transaction.returned_amount)).scalar() or 0
+            # Outstanding debt (all time)
+            open_summary = SalesRollupService.get_summary(statuses=['confirmed', 'pending', 'overdue'])
+            outstanding = (
+                SalesRollupService.total(open_summary, 'total_amount')
+                - SalesRollupService.total(open_summary, 'paid_amount')
+                - SalesRollupService.total(open_summary, 'returned_amount')
+            )
 
             collection_rate = (total_paid / total_revenue * 100) if total_revenue > 0 else 0
 
-            # Daily breakdown
-            daily = {}
-            for t in transactions:
-                day = t.created_at.strftime('%Y-%m-%d')
-                if day not in daily:
-                    daily[day] = {'date': day, 'transactions_count': 0, 'revenue': 0, 'payments': 0, 'commission': 0}
-                daily[day]['transactions_count'] += 1
-                daily[day]['revenue'] += float(t.total_amount or 0)
-                daily[day]['commission'] += float(t.paid_amount or 0) * 0.025
-
-            for p in payments:
-                day = p.created_at.strftime('%Y-%m-%d')
-                if day in daily:
-                    daily[day]['payments'] += float(p.amount or 0)
-
-            # Payment method breakdown
-            payment_methods = {}
-            for p in payments:
-                method = p.payment_method or 'other'
-                payment_methods[method] = payment_methods.get(method, 0) + float(p.amount or 0)
-
             return {
                 'success': True,
                 'data': {
@@ -0,0 +1,355 @@
+"""
+Sales Rollup Service - Incrementally maintained daily sales aggregates
+"""
+from datetime import datetime, date, time, timedelta
+import uuid
+from sqlalchemy import func
+from app.extensions import db
+from app.models.daily_sales_rollup import DailySalesRollup
+from app.models.transaction import Transaction
+from app.utils.admin_live_counters import admin_live_counters
+from app.utils.report_cache import report_cache
+
+
+ROLLUP_KEY_COLUMNS = ['rollup_date', 'merchant_id', 'branch_id', 'cashier_id', 'status']
+
+
+class SalesRollupService:
+    """
+    Keeps the daily_sales_rollup table in step with the transactions table.
+
+    Every code path that creates a transaction or changes its status or
+    amounts takes a snapshot before the change and calls record_transaction()
+    before committing, so the rollup is updated in the same database
+    transaction as the row it summarizes. The same hook queues the report
+    cache invalidation for that merchant/branch and the admin live counter
+    deltas.
+    """
+
+    # ==================== Incremental Updates ====================
+
+    @staticmethod
+    def snapshot(transaction):
+        """Capture the rollup-relevant state of a transaction before it changes"""
+        return {
+            'status': transaction.status,
+            'total_amount': float(transaction.total_amount or 0),
+            'paid_amount': float(transaction.paid_amount or 0),
+            'returned_amount': float(transaction.returned_amount or 0),
+        }
+
+    @staticmethod
+    def record_transaction(transaction, previous=None):
+        """
+        Apply the change of a transaction to the rollup.
+
+        Args:
+            transaction: Transaction in its new state (not yet committed)
+            previous: snapshot() taken before the change, None for new transactions
+        """
+        current = SalesRollupService.snapshot(transaction)
+        report_cache.mark_dirty(db.session, transaction.merchant_id, transaction.branch_id)
+        admin_live_counters.record(
+            db.session,
+            transactions_today=1 if previous is None else 0,
+            transactions_amount_today=current['total_amount'] if previous is None else 0,
+            collected_today=current['paid_amount'] - (previous['paid_amount'] if previous else 0)
+        )
+        created_at = transaction.created_at or datetime.utcnow()
+        key = {
+            'rollup_date': created_at.date(),
+            'merchant_id': transaction.merchant_id,
+            'branch_id': transaction.branch_id,
+            'cashier_id': transaction.cashier_id or '',
+        }
+
+        if previous is not None:
+            if previous == current:
+                return
+            SalesRollupService._apply_delta(
+                dict(key, status=previous['status']), -1,
+                -previous['total_amount'], -previous['paid_amount'], -previous['returned_amount']
+            )
+
+        SalesRollupService._apply_delta(
+            dict(key, status=current['status']), 1,
+            current['total_amount'], current['paid_amount'], current['returned_amount']
+        )
+
+    @staticmethod
+    def record_new_transactions(transactions):
+        """
+        Apply a batch of newly created transactions to the rollup.
+
+        Same effect as record_transaction() for each of them, but with one
+        upsert per rollup row instead of one per transaction.
+        """
+        deltas = {}
+        for transaction in transactions:
+            current = SalesRollupService.snapshot(transaction)
+            report_cache.mark_dirty(db.session, transaction.merchant_id, transaction.branch_id)
+            created_at = transaction.created_at or datetime.utcnow()
+            key = (created_at.date(), transaction.merchant_id, transaction.branch_id,
+                   transaction.cashier_id or '', current['status'])
+            delta = deltas.setdefault(key, [0, 0.0, 0.0, 0.0])
+            delta[0] += 1
+            delta[1] += current['total_amount']
+            delta[2] += current['paid_amount']
+            delta[3] += current['returned_amount']
+
+        admin_live_counters.record(
+            db.session,
+            transactions_today=sum(delta[0] for delta in deltas.values()),
+            transactions_amount_today=sum(delta[1] for delta in deltas.values()),
+            collected_today=sum(delta[2] for delta in deltas.values())
+        )
+        SalesRollupService._apply_deltas(deltas)
+
+    @staticmethod
+    def record_changes(changes):
+        """
+        Apply a batch of changes to existing transactions to the rollup.
+
+        changes is a list of (transaction, previous, current): the transaction
+        (or any row with its created_at, merchant_id, branch_id and
+        cashier_id) gives the rollup key, previous and current are snapshot()
+        dicts from before and after the change, so rows updated in bulk do
+        not have to be loaded as objects. Same effect as record_transaction()
+        for each of them, with one upsert per rollup row.
+        """
+        deltas = {}
+        collected = 0.0
+        for transaction, previous, current in changes:
+            if previous == current:
+                continue
+            report_cache.mark_dirty(db.session, transaction.merchant_id, transaction.branch_id)
+            collected += current['paid_amount'] - previous['paid_amount']
+            created_at = transaction.created_at or datetime.utcnow()
+            key = (created_at.date(), transaction.merchant_id, transaction.branch_id, transaction.cashier_id or '')
+            for snapshot, sign in ((previous, -1), (current, 1)):
+                delta = deltas.setdefault(key + (snapshot['status'],), [0, 0.0, 0.0, 0.0])
+                delta[0] += sign
+                delta[1] += sign * snapshot['total_amount']
+                delta[2] += sign * snapshot['paid_amount']
+                delta[3] += sign * snapshot['returned_amount']
+
+        admin_live_counters.record(db.session, collected_today=collected)
+        SalesRollupService._apply_deltas(deltas)
+
+    @staticmethod
+    def record_status_change(transactions, previous_status):
+        """
+        Apply a batch of status changes to the rollup.
+
+        For transactions whose status was changed in bulk from
+        previous_status with amounts unchanged (e.g. the overdue sweep):
+        one upsert per affected rollup row instead of two per transaction.
+        """
+        deltas = {}
+        for transaction in transactions:
+            current = SalesRollupService.snapshot(transaction)
+            if current['status'] == previous_status:
+                continue
+            report_cache.mark_dirty(db.session, transaction.merchant_id, transaction.branch_id)
+            created_at = transaction.created_at or datetime.utcnow()
+            key = (created_at.date(), transaction.merchant_id, transaction.branch_id, transaction.cashier_id or '')
+            for status, sign in ((previous_status, -1), (current['status'], 1)):
+                delta = deltas.setdefault(key + (status,), [0, 0.0, 0.0, 0.0])
+                delta[0] += sign
+                delta[1] += sign * current['total_amount']
+                delta[2] += sign * current['paid_amount']
+                delta[3] += sign * current['returned_amount']
+
+        SalesRollupService._apply_deltas(deltas)
+
+    @staticmethod
+    def _apply_delta(key, count, total_amount, paid_amount, returned_amount):
+        """Add a delta to one rollup row, creating it if needed (single upsert statement)"""
+        SalesRollupService._apply_deltas({
+            tuple(key[column] for column in ROLLUP_KEY_COLUMNS): (count, total_amount, paid_amount, returned_amount)
+        })
+
+    @staticmethod
+    def _apply_deltas(deltas):
+        """
+        Add deltas to many rollup rows, creating them if needed.
+
+        deltas maps a rollup key (tuple in ROLLUP_KEY_COLUMNS order) to
+        (count, total_amount, paid_amount, returned_amount); every row goes
+        through the same upsert statement in one executemany call.
+        """
+        if not deltas:
+            return
+        if db.engine.dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+
+        table = DailySalesRollup.__table__
+        now = datetime.utcnow()
+        rows = [
+            dict(
+                zip(ROLLUP_KEY_COLUMNS, key),
+                id=str(uuid.uuid4()),
+                transaction_count=count,
+                total_amount=total_amount,
+                paid_amount=paid_amount,
+                returned_amount=returned_amount,
+                updated_at=now
+            )
+            for key, (count, total_amount, paid_amount, returned_amount) in deltas.items()
+        ]
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=ROLLUP_KEY_COLUMNS,
+            set_={
+                'transaction_count': table.c.transaction_count + stmt.excluded.transaction_count,
+                'total_amount': table.c.total_amount + stmt.excluded.total_amount,
+                'paid_amount': table.c.paid_amount + stmt.excluded.paid_amount,
+                'returned_amount': table.c.returned_amount + stmt.excluded.returned_amount,
+                'updated_at': stmt.excluded.updated_at,
+            }
+        )
+        db.session.execute(stmt, rows)
+
+    # ==================== Reads ====================
+
+    @staticmethod
+    def get_summary(merchant_id=None, from_date=None, to_date=None, branch_ids=None, cashier_id=None, statuses=None):
+        """
+        Get rollup totals grouped by status.
+
+        Args:
+            merchant_id: Limit to one merchant (None = platform-wide)
+            from_date: First day included (date, datetime or 'YYYY-MM-DD')
+            to_date: Last day included (date, datetime or 'YYYY-MM-DD')
+            branch_ids: Limit to these branches
+            cashier_id: Limit to transactions created by this staff member
+            statuses: Limit to these transaction statuses
+
+        Returns:
+            dict: status -> {'count', 'total_amount', 'paid_amount', 'returned_amount'}
+        """
+        query = db.session.query(
+            DailySalesRollup.status,
+            func.coalesce(func.sum(DailySalesRollup.transaction_count), 0),
+            func.coalesce(func.sum(DailySalesRollup.total_amount), 0),
+            func.coalesce(func.sum(DailySalesRollup.paid_amount), 0),
+            func.coalesce(func.sum(DailySalesRollup.returned_amount), 0)
+        )
+
+        if merchant_id:
+            query = query.filter(DailySalesRollup.merchant_id == merchant_id)
+        if branch_ids is not None:
+            query = query.filter(DailySalesRollup.branch_id.in_(branch_ids))
+        if cashier_id:
+            query = query.filter(DailySalesRollup.cashier_id == cashier_id)
+        if statuses:
+            query = query.filter(DailySalesRollup.status.in_(statuses))
+        if from_date:
+            query = query.filter(DailySalesRollup.rollup_date >= SalesRollupService._to_date(from_date))
+        if to_date:
+            query = query.filter(DailySalesRollup.rollup_date <= SalesRollupService._to_date(to_date))
+
+        summary = {}
+        for status, count, total, paid, returned in query.group_by(DailySalesRollup.status).all():
+            summary[status] = {
+                'count': int(count),
+                'total_amount': float(total),
+                'paid_amount': float(paid),
+                'returned_amount': float(returned),
+            }
+        return summary
+
+    @staticmethod
+    def total(summary, field='count', statuses=None):
+        """Sum one field of a get_summary() result, optionally for some statuses only"""
+        return sum(
+            values[field] for status, values in summary.items()
+            if statuses is None or status in statuses
+        )
+
+    @staticmethod
+    def _to_date(value):
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+        return datetime.strptime(value[:10], '%Y-%m-%d').date()
+
+    # ==================== Rebuild / Backfill ====================
+
+    @staticmethod
+    def rebuild(from_date=None, to_date=None):
+        """
+        Recompute the rollup from the transactions table.
+
+        Rows for the given day range (or everything) are deleted and
+        re-aggregated with a single INSERT ... SELECT.
+
+        Returns:
+            dict with success flag and number of rollup rows written
+        """
+        try:
+            from_date = SalesRollupService._to_date(from_date) if from_date else None
+            to_date = SalesRollupService._to_date(to_date) if to_date else None
+
+            delete_query = DailySalesRollup.query
+            if from_date:
+                delete_query = delete_query.filter(DailySalesRollup.rollup_date >= from_date)
+            if to_date:
+                delete_query = delete_query.filter(DailySalesRollup.rollup_date <= to_date)
+            delete_query.delete(synchronize_session=False)
+
+            day = func.date(Transaction.created_at)
+            cashier = func.coalesce(Transaction.cashier_id, '')
+            if db.engine.dialect.name == 'postgresql':
+                row_id = func.gen_random_uuid().cast(db.String)
+            else:
+                row_id = func.lower(func.hex(func.randomblob(16)))
+
+            select = db.select(
+                row_id,
+                day,
+                Transaction.merchant_id,
+                Transaction.branch_id,
+                cashier,
+                Transaction.status,
+                func.count(Transaction.id),
+                func.coalesce(func.sum(Transaction.total_amount), 0),
+                func.coalesce(func.sum(Transaction.paid_amount), 0),
+                func.coalesce(func.sum(Transaction.returned_amount), 0),
+                func.max(Transaction.updated_at)
+            )
+            if from_date:
+                select = select.where(Transaction.created_at >= datetime.combine(from_date, time.min))
+            if to_date:
+                select = select.where(
+                    Transaction.created_at < datetime.combine(to_date + timedelta(days=1), time.min)
+                )
+            select = select.group_by(
+                day, Transaction.merchant_id, Transaction.branch_id, cashier, Transaction.status
+            )
+
+            result = db.session.execute(
+                DailySalesRollup.__table__.insert().from_select(
+                    ['id'] + ROLLUP_KEY_COLUMNS + [
+                        'transaction_count', 'total_amount', 'paid_amount', 'returned_amount', 'updated_at'
+                    ],
+                    select
+                )
+            )
+            db.session.commit()
+            report_cache.clear()
+
+            return {
+                'success': True,
+                'data': {'rows': result.rowcount}
+            }
+        except Exception as e:
+            db.session.rollback()
+            return {
+                'success': False,
+                'message': f'Failed to rebuild sales rollup: {str(e)}',
+                'error_code': 'SYS_001'
+            }
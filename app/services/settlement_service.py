@@ -9,6 +9,8 @@ from app.models.transaction import Transaction
 from app.models.transaction_return import TransactionReturn
 from app.models.merchant import Merchant
 from app.models.branch import Branch
+from app.utils.admin_live_counters import admin_live_counters
+from app.utils.pagination import paginate
 from app.utils.role_access import (
     get_merchant_user,
     validate_branch_access,
@@ -28,7 +30,7 @@ class SettlementService:
     # ==================== Merchant Views ====================
 
     @staticmethod
-    def get_merchant_settlements(merchant_id, staff_id=None, branch_id=None, status=None, page=1, per_page=20):
+    def get_merchant_settlements(merchant_id, staff_id=None, branch_id=None, status=None, page=1, per_page=20, cursor=None, include_total=True):
         """Get settlements for a merchant with role-based filtering"""
         merchant = Merchant.query.get(merchant_id)
 
@@ -85,8 +87,10 @@ class SettlementService:
         if status:
             query = query.filter_by(status=status)
 
-        query = query.order_by(Settlement.period_end.desc())
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+        pagination = paginate(
+            query, page, per_page, cursor=cursor, include_total=include_total,
+            order_by=(Settlement.period_end, Settlement.id)
+        )
 
         settlements_data = []
         for settlement in pagination.items:
@@ -103,12 +107,7 @@ class SettlementService:
             'data': {
                 'settlements': settlements_data
             },
-            'meta': {
-                'page': page,
-                'per_page': per_page,
-                'total': pagination.total,
-                'total_pages': pagination.pages
-            }
+            'meta': pagination.meta
         }
 
     @staticmethod
@@ -160,7 +159,9 @@ class SettlementService:
         }
 
         # Get transactions in this settlement
-        transactions = Transaction.query.filter_by(settlement_id=settlement_id).all()
+        transactions = Transaction.query.filter_by(settlement_id=settlement_id).filter(
+            *Transaction.date_range(settlement.period_start, settlement.period_end)
+        ).all()
         settlement_dict['transactions'] = [
             {
                 'id': t.id,
@@ -245,7 +246,7 @@ class SettlementService:
     # ==================== Admin Views ====================
 
     @staticmethod
-    def get_all_settlements(status=None, merchant_id=None, page=1, per_page=20):
+    def get_all_settlements(status=None, merchant_id=None, page=1, per_page=20, cursor=None, include_total=True):
         """Get all settlements for admin"""
         query = Settlement.query
 
@@ -255,8 +256,10 @@ class SettlementService:
         if merchant_id:
             query = query.filter_by(merchant_id=merchant_id)
 
-        query = query.order_by(Settlement.created_at.desc())
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+        pagination = paginate(
+            query, page, per_page, cursor=cursor, include_total=include_total,
+            order_by=(Settlement.created_at, Settlement.id)
+        )
 
         settlements_data = []
         for settlement in pagination.items:
@@ -276,12 +279,7 @@ class SettlementService:
             'data': {
                 'settlements': settlements_data
             },
-            'meta': {
-                'page': page,
-                'per_page': per_page,
-                'total': pagination.total,
-                'total_pages': pagination.pages
-            }
+            'meta': pagination.meta
         }
 
     @staticmethod
@@ -308,7 +306,9 @@ class SettlementService:
         }
 
         # Get transactions
-        transactions = Transaction.query.filter_by(settlement_id=settlement_id).all()
+        transactions = Transaction.query.filter_by(settlement_id=settlement_id).filter(
+            *Transaction.date_range(settlement.period_start, settlement.period_end)
+        ).all()
         settlement_dict['transactions'] = [
             {
                 'id': t.id,
@@ -406,6 +406,7 @@ class SettlementService:
 
             db.session.add(settlement)
             db.session.flush()
+            admin_live_counters.record(db.session, pending_settlements=1)
 
             # Link transactions to settlement
             for txn in transactions:
@@ -489,6 +490,7 @@ class SettlementService:
             settlement.approved_by = admin_id
             settlement.approved_at = datetime.utcnow()
             settlement.updated_at = datetime.utcnow()
+            admin_live_counters.record(db.session, pending_settlements=-1)
 
             db.session.commit()
 
@@ -605,9 +607,13 @@ class SettlementService:
         try:
             settlement.status = 'rejected'
             settlement.updated_at = datetime.utcnow()
+            if old_status == 'pending':
+                admin_live_counters.record(db.session, pending_settlements=-1)
 
             # Unlink transactions from this settlement
-            transactions = Transaction.query.filter_by(settlement_id=settlement_id).all()
+            transactions = Transaction.query.filter_by(settlement_id=settlement_id).filter(
+                *Transaction.date_range(settlement.period_start, settlement.period_end)
+            ).all()
             for txn in transactions:
                 txn.settlement_id = None
                 txn.updated_at = datetime.utcnow()
@@ -1,8 +1,13 @@
 """
 Transaction Service - Full Implementation
 """
+import csv
+import io
+import json
 from datetime import datetime, timedelta
 from flask import current_app
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 from app.extensions import db
 from app.models.transaction import Transaction
 from app.models.transaction_return import TransactionReturn
@@ -11,6 +16,10 @@ from app.models.merchant import Merchant
 from app.models.branch import Branch
 from app.models.merchant_user import MerchantUser
 from app.models.notification import Notification
+from app.schemas.serializers import serialize_transaction, serialize_transaction_return
+from app.services.sales_rollup_service import SalesRollupService
+from app.utils.customer_lookup_cache import customer_lookup_cache
+from app.utils.pagination import paginate
 from app.utils.role_access import (
     get_merchant_user,
     filter_transactions_by_role,
@@ -35,51 +44,65 @@ class TransactionService:
     # ==================== Create Transaction ====================
 
     @staticmethod
-    def create_transaction(merchant_id, branch_id, cashier_id, customer_bariq_id, items, discount=0, notes=None, payment_term_days=None):
-        """Create a new transaction (initiated by merchant/cashier)"""
-        # Validate merchant
+    def _validate_merchant_branch(merchant_id, branch_id):
+        """
+        Check that the merchant and branch exist and are active.
+
+        Returns:
+            (merchant, branch, None) or (None, None, error result)
+        """
         merchant = Merchant.query.get(merchant_id)
         if not merchant:
-            return {
+            return None, None, {
                 'success': False,
                 'message': 'Merchant not found',
                 'error_code': 'MERCH_001'
             }
 
         if merchant.status != 'active':
-            return {
+            return None, None, {
                 'success': False,
                 'message': 'Merchant is not active',
                 'error_code': 'MERCH_004'
             }
 
-        # Validate branch
         branch = Branch.query.filter_by(id=branch_id, merchant_id=merchant_id).first()
         if not branch:
-            return {
+            return None, None, {
                 'success': False,
                 'message': 'Branch not found',
                 'error_code': 'MERCH_005'
             }
 
         if not branch.is_active:
-            return {
+            return None, None, {
                 'success': False,
                 'message': 'Branch is not active',
                 'error_code': 'MERCH_005'
             }
 
-        # Find customer by Bariq ID
-        customer = Customer.query.filter_by(bariq_id=customer_bariq_id).first()
+        return merchant, branch, None
+
+    @staticmethod
+    def _price_transaction(customer, items, discount=0, payment_term_days=None):
+        """
+        Validate a sale for a customer and compute its amounts and due date.
+
+        customer needs id, status and available_credit (a Customer or a
+        cached lookup).
+
+        Returns:
+            (dict of transaction fields, None) or (None, error result)
+        """
         if not customer:
-            return {
+            return None, {
                 'success': False,
                 'message': 'Customer not found',
                 'error_code': 'CUST_001'
             }
 
         if customer.status != 'active':
-            return {
+            return None, {
                 'success': False,
                 'message': 'Customer account is not active',
                 'error_code': 'CUST_003'
@@ -87,7 +110,7 @@ class TransactionService:
 
         # Calculate amounts
         if not items or len(items) == 0:
-            return {
+            return None, {
                 'success': False,
                 'message': 'At least one item is required',
                 'error_code': 'VAL_001'
@@ -101,14 +124,14 @@ class TransactionService:
         discount = float(discount) if discount else 0
 
         if discount < 0:
-            return {
+            return None, {
                 'success': False,
                 'message': 'Discount cannot be negative',
                 'error_code': 'VAL_001'
             }
 
         if discount > subtotal:
-            return {
+            return None, {
                 'success': False,
                 'message': 'Discount cannot exceed subtotal',
                 'error_code': 'VAL_001'
@@ -118,7 +141,7 @@ class TransactionService:
 
         # Check customer credit limit
         if total_amount > float(customer.available_credit):
-            return {
+            return None, {
                 'success': False,
                 'message': f'Insufficient credit. Available: {customer.available_credit} SAR, Required: {total_amount} SAR',
                 'error_code': 'CUST_004'
@@ -129,14 +152,14 @@ class TransactionService:
         max_amount = current_app.config.get('MAX_TRANSACTION_AMOUNT', 5000)
 
         if total_amount < min_amount:
-            return {
+            return None, {
                 'success': False,
                 'message': f'Transaction amount must be at least {min_amount} SAR',
                 'error_code': 'VAL_001'
             }
 
         if total_amount > max_amount:
-            return {
+            return None, {
                 'success': False,
                 'message': f'Transaction amount cannot exceed {max_amount} SAR',
                 'error_code': 'VAL_001'
@@ -149,27 +172,50 @@ class TransactionService:
             repayment_days = current_app.config.get('REPAYMENT_DAYS', 30)
         due_date = (datetime.utcnow() + timedelta(days=repayment_days)).date()
 
+        return {
+            'customer_id': customer.id,
+            'subtotal': subtotal,
+            'discount': discount,
+            'total_amount': total_amount,
+            'items': items,
+            'due_date': due_date
+        }, None
+
+    @staticmethod
+    def create_transaction(merchant_id, branch_id, cashier_id, customer_bariq_id, items, discount=0, notes=None, payment_term_days=None):
+        """Create a new transaction (initiated by merchant/cashier)"""
+        merchant, branch, error = TransactionService._validate_merchant_branch(merchant_id, branch_id)
+        if error:
+            return error
+
+        # Find customer by Bariq ID
+        customer = customer_lookup_cache.get(customer_bariq_id)
+
+        fields, error = TransactionService._price_transaction(customer, items, discount, payment_term_days)
+        if error:
+            return error
+
         try:
             # Create transaction
             transaction = Transaction(
-                customer_id=customer.id,
                 merchant_id=merchant_id,
                 branch_id=branch_id,
                 cashier_id=cashier_id,
-                subtotal=subtotal,
-                discount=discount,
-                total_amount=total_amount,
-                items=items,
-                due_date=due_date,
                 status='pending',  # Requires customer confirmation
-                notes=notes
+                notes=notes,
+                **fields
             )
 
             db.session.add(transaction)
+            db.session.flush()
+            SalesRollupService.record_transaction(transaction)
             db.session.commit()
 
             # Send notification to customer
             TransactionService._notify_customer_new_transaction(customer, transaction, merchant, branch)
+            TransactionService._push_to_customers(
+                TransactionService._new_transaction_pushes([transaction], merchant)
+            )
 
             # Emit real-time event to customer
             emit_to_customer(customer.id, 'transaction_created', build_transaction_event_data(transaction))
@@ -194,10 +240,132 @@ class TransactionService:
                 'error_code': 'SYS_001'
             }
 
+    @staticmethod
+    def create_transactions_batch(merchant_id, branch_id, cashier_id, transactions):
+        """
+        Create many transactions at once (POS offline sync).
+
+        The merchant and branch are validated once and all customers are
+        resolved in one query. Each entry takes the same fields as
+        create_transaction (customer_bariq_id, items, discount, notes,
+        payment_term_days) and gets its own result; the valid ones are
+        inserted together in one database transaction.
+
+        Returns:
+            dict with per-entry results (in request order) and counts
+        """
+        max_size = current_app.config.get('TRANSACTION_BATCH_MAX_SIZE', 100)
+        if not transactions or not isinstance(transactions, list):
+            return {
+                'success': False,
+                'message': 'transactions must be a non-empty list',
+                'error_code': 'VAL_001'
+            }
+        if len(transactions) > max_size:
+            return {
+                'success': False,
+                'message': f'A batch can contain at most {max_size} transactions',
+                'error_code': 'VAL_001'
+            }
+
+        merchant, branch, error = TransactionService._validate_merchant_branch(merchant_id, branch_id)
+        if error:
+            return error
+
+        bariq_ids = {entry.get('customer_bariq_id') for entry in transactions if isinstance(entry, dict)}
+        customers = {
+            customer.bariq_id: customer
+            for customer in Customer.query.filter(Customer.bariq_id.in_(bariq_ids - {None})).all()
+        } if bariq_ids - {None} else {}
+
+        results = [None] * len(transactions)
+        created = []  # (index, transaction, customer)
+        for index, entry in enumerate(transactions):
+            if not isinstance(entry, dict):
+                results[index] = {
+                    'index': index,
+                    'success': False,
+                    'message': 'Each transaction must be an object',
+                    'error_code': 'VAL_001'
+                }
+                continue
+
+            customer = customers.get(entry.get('customer_bariq_id'))
+            fields, error = TransactionService._price_transaction(
+                customer, entry.get('items', []), entry.get('discount', 0), entry.get('payment_term_days')
+            )
+            if error:
+                results[index] = {'index': index, **error}
+                continue
+
+            transaction = Transaction(
+                merchant_id=merchant_id,
+                branch_id=branch_id,
+                cashier_id=cashier_id,
+                status='pending',  # Requires customer confirmation
+                notes=entry.get('notes'),
+                **fields
+            )
+            created.append((index, transaction, customer))
+
+        events = []
+        pushes = {}
+        if created:
+            try:
+                new_transactions = [transaction for _, transaction, _ in created]
+                db.session.add_all(new_transactions)
+                db.session.flush()
+                SalesRollupService.record_new_transactions(new_transactions)
+                db.session.add_all([
+                    TransactionService._new_transaction_notification(transaction, merchant)
+                    for transaction in new_transactions
+                ])
+
+                # Serialize before committing; the commit expires every loaded row
+                for index, transaction, customer in created:
+                    results[index] = {
+                        'index': index,
+                        'success': True,
+                        'data': {
+                            'transaction': transaction.to_dict(),
+                            'customer': {
+                                'id': customer.id,
+                                'name': customer.full_name_ar,
+                                'available_credit': float(customer.available_credit)
+                            }
+                        }
+                    }
+                    events.append((customer.id, build_transaction_event_data(transaction)))
+                pushes = TransactionService._new_transaction_pushes(new_transactions, merchant)
+
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                return {
+                    'success': False,
+                    'message': f'Failed to create transactions: {str(e)}',
+                    'error_code': 'SYS_001'
+                }
+
+        # Emit real-time events and pushes once everything is committed
+        for customer_id, event_data in events:
+            emit_to_customer(customer_id, 'transaction_created', event_data)
+        TransactionService._push_to_customers(pushes)
+
+        return {
+            'success': True,
+            'message': f'{len(created)} of {len(transactions)} transactions created',
+            'data': {
+                'results': results,
+                'created': len(created),
+                'failed': len(transactions) - len(created)
+            }
+        }
+
     # ==================== Customer Transaction Views ====================
 
     @staticmethod
-    def get_customer_transactions(customer_id, status=None, page=1, per_page=20):
+    def get_customer_transactions(customer_id, status=None, page=1, per_page=20, cursor=None, include_total=True):
         """Get customer's transactions"""
         customer = Customer.query.get(customer_id)
 
@@ -208,17 +376,22 @@ class TransactionService:
                 'error_code': 'CUST_001'
             }
 
-        query = Transaction.query.filter_by(customer_id=customer_id)
+        query = Transaction.query.filter_by(customer_id=customer_id).options(
+            selectinload(Transaction.merchant),
+            selectinload(Transaction.branch)
+        )
 
         if status:
             query = query.filter_by(status=status)
 
-        query = query.order_by(Transaction.transaction_date.desc())
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+        pagination = paginate(
+            query, page, per_page, cursor=cursor, include_total=include_total,
+            order_by=(Transaction.transaction_date, Transaction.id)
+        )
 
         transactions_data = []
         for txn in pagination.items:
-            txn_dict = txn.to_dict()
+            txn_dict = serialize_transaction(txn)
             txn_dict['merchant'] = {
                 'id': txn.merchant.id,
                 'name_ar': txn.merchant.name_ar,
@@ -236,12 +409,7 @@ class TransactionService:
             'data': {
                 'transactions': transactions_data
             },
-            'meta': {
-                'page': page,
-                'per_page': per_page,
-                'total': pagination.total,
-                'total_pages': pagination.pages
-            }
+            'meta': pagination.meta
         }
 
     @staticmethod
@@ -320,9 +488,11 @@ class TransactionService:
 
         try:
             # Update transaction status to rejected
+            previous = SalesRollupService.snapshot(transaction)
             transaction.status = 'rejected'
             transaction.cancellation_reason = reason or 'Rejected by customer'
             transaction.updated_at = datetime.utcnow()
+            SalesRollupService.record_transaction(transaction, previous)
 
             db.session.commit()
 
@@ -382,6 +552,13 @@ class TransactionService:
 
         customer = Customer.query.get(customer_id)
 
+        if customer.status != 'active':
+            return {
+                'success': False,
+                'message': 'Customer account is not active',
+                'error_code': 'CUST_003'
+            }
+
         # Re-check credit availability
         if float(transaction.total_amount) > float(customer.available_credit):
             return {
@@ -391,14 +568,44 @@ class TransactionService:
             }
 
         try:
-            # Update transaction status
-            transaction.status = 'confirmed'
-            transaction.updated_at = datetime.utcnow()
+            previous = SalesRollupService.snapshot(transaction)
+
+            # Move the transaction out of pending with one conditional UPDATE: of two
+            # concurrent confirms (or a confirm racing the pending expiry sweep) only
+            # one matches a row, the other waits on its row lock and then finds none
+            claimed = db.session.execute(
+                db.update(Transaction)
+                .where(
+                    Transaction.id == transaction.id,
+                    Transaction.transaction_date == transaction.transaction_date,
+                    Transaction.status == 'pending'
+                )
+                .values(status='confirmed', updated_at=datetime.utcnow())
+                .returning(Transaction.status, Transaction.updated_at)
+                .execution_options(synchronize_session=False)
+            ).first()
+            if claimed is None:
+                db.session.rollback()
+                return {
+                    'success': False,
+                    'message': 'Transaction is no longer pending',
+                    'error_code': 'TXN_002'
+                }
 
-            # Deduct from customer's available credit
-            customer.available_credit = float(customer.available_credit) - float(transaction.total_amount)
-            customer.used_credit = float(customer.used_credit) + float(transaction.total_amount)
-            customer.updated_at = datetime.utcnow()
+            # Deduct from customer's available credit (atomic; fails if a concurrent
+            # confirm used the credit up or the account was suspended since the checks
+            # above), in the same database transaction as the status change
+            if not customer.reserve_credit(transaction.total_amount):
+                db.session.rollback()
+                return {
+                    'success': False,
+                    'message': 'Insufficient credit to confirm this transaction',
+                    'error_code': 'CUST_004'
+                }
+
+            set_committed_value(transaction, 'status', claimed.status)
+            set_committed_value(transaction, 'updated_at', claimed.updated_at)
+            SalesRollupService.record_transaction(transaction, previous)
 
             db.session.commit()
 
@@ -429,17 +636,13 @@ class TransactionService:
     # ==================== Merchant Transaction Views ====================
 
     @staticmethod
-    def get_merchant_transactions(merchant_id, staff_id=None, branch_id=None, status=None, from_date=None, to_date=None, page=1, per_page=20):
-        """Get merchant's transactions with role-based filtering"""
-        merchant = Merchant.query.get(merchant_id)
-
-        if not merchant:
-            return {
-                'success': False,
-                'message': 'Merchant not found',
-                'error_code': 'MERCH_001'
-            }
+    def _merchant_transactions_query(merchant_id, staff_id=None, branch_id=None, status=None, from_date=None, to_date=None):
+        """
+        Build the role-filtered transaction query shared by the merchant listing and export.
 
+        Returns:
+            (query, None) on success, (None, error_result) when access is denied
+        """
         query = Transaction.query.filter_by(merchant_id=merchant_id)
 
         # Apply role-based filtering if staff_id is provided
@@ -456,14 +659,14 @@ class TransactionService:
                 # If branch_id is specified, validate access
                 if branch_id:
                     if not validate_branch_access(user, branch_id):
-                        return {
+                        return None, {
                             'success': False,
                             'message': 'Access denied to this branch',
                             'error_code': 'AUTH_003'
                         }
                     query = query.filter_by(branch_id=branch_id)
             else:
-                return {
+                return None, {
                     'success': False,
                     'message': 'Staff member not found',
                     'error_code': 'MERCH_006'
@@ -480,12 +683,42 @@ class TransactionService:
         if to_date:
             query = query.filter(Transaction.transaction_date <= to_date)
 
-        query = query.order_by(Transaction.transaction_date.desc())
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+        return query, None
+
+    @staticmethod
+    def get_merchant_transactions(merchant_id, staff_id=None, branch_id=None, status=None, from_date=None, to_date=None, page=1, per_page=20, cursor=None, include_total=True):
+        """Get merchant's transactions with role-based filtering"""
+        merchant = Merchant.query.get(merchant_id)
+
+        if not merchant:
+            return {
+                'success': False,
+                'message': 'Merchant not found',
+                'error_code': 'MERCH_001'
+            }
+
+        query, error = TransactionService._merchant_transactions_query(
+            merchant_id, staff_id=staff_id, branch_id=branch_id,
+            status=status, from_date=from_date, to_date=to_date
+        )
+        if error:
+            return error
+
+        # Related rows for the whole page in one query each, not three lazy loads per row
+        query = query.options(
+            selectinload(Transaction.customer),
+            selectinload(Transaction.branch),
+            selectinload(Transaction.cashier)
+        )
+
+        pagination = paginate(
+            query, page, per_page, cursor=cursor, include_total=include_total,
+            order_by=(Transaction.transaction_date, Transaction.id)
+        )
 
         transactions_data = []
         for txn in pagination.items:
-            txn_dict = txn.to_dict()
+            txn_dict = serialize_transaction(txn)
             txn_dict['customer'] = {
                 'id': txn.customer.id,
                 'name_ar': txn.customer.full_name_ar,
@@ -507,11 +740,126 @@ class TransactionService:
             'data': {
                 'transactions': transactions_data
             },
-            'meta': {
-                'page': page,
-                'per_page': per_page,
-                'total': pagination.total,
-                'total_pages': pagination.pages
+            'meta': pagination.meta
+        }
+
+    EXPORT_COLUMNS = [
+        'id', 'reference_number', 'transaction_date', 'due_date', 'status',
+        'customer_name', 'customer_phone', 'branch_name', 'cashier_name',
+        'subtotal', 'discount', 'total_amount', 'paid_amount', 'returned_amount', 'remaining_amount'
+    ]
+
+    EXPORT_FORMATS = {
+        'csv': 'text/csv; charset=utf-8',
+        'ndjson': 'application/x-ndjson',
+    }
+
+    @staticmethod
+    def export_merchant_transactions(merchant_id, staff_id=None, branch_id=None, status=None, from_date=None, to_date=None, export_format='csv', chunk_size=1000):
+        """
+        Export merchant's transactions as a stream of CSV or NDJSON chunks.
+
+        Rows are read with a server-side cursor (yield_per) and only plain
+        column tuples are loaded, so memory stays flat whatever the row count.
+
+        Returns:
+            dict whose data holds the content type, a download filename and
+            the chunk generator (to be wrapped in stream_with_context)
+        """
+        if export_format not in TransactionService.EXPORT_FORMATS:
+            return {
+                'success': False,
+                'message': 'Unsupported export format',
+                'error_code': 'VAL_001'
+            }
+
+        merchant = Merchant.query.get(merchant_id)
+
+        if not merchant:
+            return {
+                'success': False,
+                'message': 'Merchant not found',
+                'error_code': 'MERCH_001'
+            }
+
+        query, error = TransactionService._merchant_transactions_query(
+            merchant_id, staff_id=staff_id, branch_id=branch_id,
+            status=status, from_date=from_date, to_date=to_date
+        )
+        if error:
+            return error
+
+        query = query.join(Customer, Transaction.customer_id == Customer.id) \
+            .join(Branch, Transaction.branch_id == Branch.id) \
+            .outerjoin(MerchantUser, Transaction.cashier_id == MerchantUser.id) \
+            .with_entities(
+                Transaction.id,
+                Transaction.reference_number,
+                Transaction.transaction_date,
+                Transaction.due_date,
+                Transaction.status,
+                Customer.full_name_ar,
+                Customer.phone,
+                Branch.name_ar,
+                MerchantUser.full_name,
+                Transaction.subtotal,
+                Transaction.discount,
+                Transaction.total_amount,
+                Transaction.paid_amount,
+                Transaction.returned_amount
+            ) \
+            .order_by(Transaction.transaction_date.desc(), Transaction.id) \
+            .yield_per(chunk_size)
+
+        def rows():
+            for row in query:
+                subtotal, discount, total, paid, returned = (float(v or 0) for v in row[9:])
+                yield dict(zip(TransactionService.EXPORT_COLUMNS, [
+                    row[0],
+                    row[1],
+                    row[2].isoformat() if row[2] else None,
+                    row[3].isoformat() if row[3] else None,
+                    row[4],
+                    row[5],
+                    row[6],
+                    row[7],
+                    row[8],
+                    subtotal,
+                    discount,
+                    total,
+                    paid,
+                    returned,
+                    round(total - paid - returned, 2),
+                ]))
+
+        def generate():
+            buffer = io.StringIO()
+            if export_format == 'csv':
+                writer = csv.DictWriter(buffer, fieldnames=TransactionService.EXPORT_COLUMNS)
+                writer.writeheader()
+                write = writer.writerow
+            else:
+                write = lambda record: buffer.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+            pending = 0
+            for record in rows():
+                write(record)
+                pending += 1
+                if pending >= chunk_size:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate(0)
+                    pending = 0
+
+            if buffer.tell():
+                yield buffer.getvalue()
+
+        return {
+            'success': True,
+            'data': {
+                'content_type': TransactionService.EXPORT_FORMATS[export_format],
+                'filename': f"transactions-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}.{export_format}",
+                'stream': generate()
             }
         }
 
@@ -521,6 +869,10 @@ class TransactionService:
         transaction = Transaction.query.filter_by(
             id=transaction_id,
             merchant_id=merchant_id
+        ).options(
+            joinedload(Transaction.customer),
+            joinedload(Transaction.branch),
+            joinedload(Transaction.cashier)
         ).first()
 
         if not transaction:
@@ -627,9 +979,11 @@ class TransactionService:
             }
 
         try:
+            previous = SalesRollupService.snapshot(transaction)
             transaction.status = 'cancelled'
             transaction.cancellation_reason = reason
             transaction.updated_at = datetime.utcnow()
+            SalesRollupService.record_transaction(transaction, previous)
 
             db.session.commit()
 
@@ -739,18 +1093,19 @@ class TransactionService:
             db.session.add(transaction_return)
 
             # Update transaction
+            previous = SalesRollupService.snapshot(transaction)
             transaction.returned_amount = float(transaction.returned_amount) + return_amount
             transaction.updated_at = datetime.utcnow()
 
             # Restore customer credit
-            customer.available_credit = float(customer.available_credit) + return_amount
-            customer.used_credit = float(customer.used_credit) - return_amount
-            customer.updated_at = datetime.utcnow()
+            customer.release_credit(return_amount)
 
             # Check if fully refunded
             if transaction.remaining_amount <= 0:
                 transaction.status = 'refunded'
 
+            SalesRollupService.record_transaction(transaction, previous)
+
             db.session.commit()
 
             # Notify customer
@@ -781,7 +1136,7 @@ class TransactionService:
             }
 
     @staticmethod
-    def get_merchant_returns(merchant_id, staff_id=None, branch_id=None, from_date=None, to_date=None, page=1, per_page=20):
+    def get_merchant_returns(merchant_id, staff_id=None, branch_id=None, from_date=None, to_date=None, page=1, per_page=20, cursor=None, include_total=True):
         """Get merchant's returns with role-based filtering"""
         merchant = Merchant.query.get(merchant_id)
 
@@ -794,6 +1149,8 @@ class TransactionService:
 
         query = TransactionReturn.query.join(Transaction).filter(
             Transaction.merchant_id == merchant_id
+        ).options(
+            selectinload(TransactionReturn.transaction).selectinload(Transaction.customer)
         )
 
         # Apply role-based filtering if staff_id is provided
@@ -843,12 +1200,14 @@ class TransactionService:
         if to_date:
             query = query.filter(TransactionReturn.created_at <= to_date)
 
-        query = query.order_by(TransactionReturn.created_at.desc())
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+        pagination = paginate(
+            query, page, per_page, cursor=cursor, include_total=include_total,
+            order_by=(TransactionReturn.created_at, TransactionReturn.id)
+        )
 
         returns_data = []
         for ret in pagination.items:
-            ret_dict = ret.to_dict()
+            ret_dict = serialize_transaction_return(ret)
             ret_dict['transaction'] = {
                 'id': ret.transaction.id,
                 'reference_number': ret.transaction.reference_number,
@@ -865,61 +1224,265 @@ class TransactionService:
             'data': {
                 'returns': returns_data
             },
-            'meta': {
-                'page': page,
-                'per_page': per_page,
-                'total': pagination.total,
-                'total_pages': pagination.pages
-            }
+            'meta': pagination.meta
         }
 
     # ==================== Overdue Processing ====================
 
     @staticmethod
-    def mark_overdue_transactions():
-        """Mark transactions as overdue (called by scheduler)"""
+    def mark_overdue_transactions(batch_size=1000, progress=None):
+        """
+        Mark confirmed transactions past their due date as overdue (called by scheduler).
+
+        Works in batches: each batch is one UPDATE ... RETURNING over up to
+        batch_size rows, a grouped rollup delta and one bulk insert of
+        notifications, committed on its own; socket events for the batch
+        are sent after its commit. Every batch picks rows that are still
+        confirmed, so a sweep that is interrupted (or fails) can simply be
+        run again and carries on where it stopped.
+
+        Args:
+            batch_size: transactions per batch
+            progress: optional callable receiving the running totals after each batch
+
+        Returns:
+            dict with success flag and the sweep's metrics
+        """
         today = datetime.utcnow().date()
+        started = datetime.utcnow()
+        metrics = {'marked': 0, 'batches': 0, 'notifications': 0, 'duration_ms': 0}
 
-        overdue_transactions = Transaction.query.filter(
+        candidates = db.select(Transaction.id).where(
             Transaction.status == 'confirmed',
             Transaction.due_date < today
-        ).all()
+        ).order_by(Transaction.id).limit(batch_size)
+        if db.engine.dialect.name == 'postgresql':
+            # Concurrent sweeps split the work instead of waiting on each other's rows
+            candidates = candidates.with_for_update(skip_locked=True)
+
+        while True:
+            try:
+                overdue = db.session.execute(
+                    db.update(Transaction)
+                    .where(Transaction.id.in_(candidates.scalar_subquery()), Transaction.status == 'confirmed')
+                    .values(status='overdue', updated_at=datetime.utcnow())
+                    .returning(Transaction)
+                    .execution_options(synchronize_session=False)
+                ).scalars().all()
+                if not overdue:
+                    break
+
+                SalesRollupService.record_status_change(overdue, 'confirmed')
+                db.session.execute(
+                    db.insert(Notification),
+                    [TransactionService._overdue_notification_row(txn) for txn in overdue]
+                )
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                metrics['duration_ms'] = int((datetime.utcnow() - started).total_seconds() * 1000)
+                return {
+                    'success': False,
+                    'message': f'Failed to update overdue transactions: {str(e)}',
+                    'error_code': 'SYS_001',
+                    'data': metrics
+                }
 
-        count = 0
-        overdue_list = []
-        for txn in overdue_transactions:
-            txn.status = 'overdue'
-            txn.updated_at = datetime.utcnow()
-            count += 1
-            overdue_list.append(txn)
+            # Emit real-time events after the batch is committed
+            for txn in overdue:
+                emit_to_customer(txn.customer_id, 'transaction_overdue', build_transaction_event_data(txn))
+            db.session.expunge_all()
+
+            metrics['marked'] += len(overdue)
+            metrics['batches'] += 1
+            metrics['notifications'] += len(overdue)
+            metrics['duration_ms'] = int((datetime.utcnow() - started).total_seconds() * 1000)
+            current_app.logger.info(
+                f"Overdue sweep: batch {metrics['batches']}, {len(overdue)} marked, {metrics['marked']} total"
+            )
+            if progress:
+                progress(dict(metrics))
 
-            # Notify customer
-            TransactionService._notify_customer_overdue(txn.customer, txn)
+        count = metrics['marked']
 
-        try:
-            db.session.commit()
+        # Notify admins about overdue transactions
+        if count > 0:
+            emit_to_admins('overdue_alert', {
+                'count': count,
+                'message': f'{count} transactions marked as overdue'
+            })
 
-            # Emit real-time events after successful commit
-            for txn in overdue_list:
-                emit_to_customer(txn.customer_id, 'transaction_overdue', build_transaction_event_data(txn))
+        metrics['duration_ms'] = int((datetime.utcnow() - started).total_seconds() * 1000)
+        return {
+            'success': True,
+            'message': f'{count} transactions marked as overdue',
+            'data': metrics
+        }
 
-            # Notify admins about overdue transactions
-            if count > 0:
-                emit_to_admins('overdue_alert', {
-                    'count': count,
-                    'message': f'{count} transactions marked as overdue'
-                })
+    # ==================== Pending Expiry ====================
 
+    @staticmethod
+    def expire_pending_transactions(max_age_minutes=None, batch_size=500, progress=None):
+        """
+        Cancel pending transactions the customer did not confirm in time.
+
+        Same batching as mark_overdue_transactions: one UPDATE ... RETURNING
+        per batch over rows still pending and created more than
+        max_age_minutes ago (PENDING_TRANSACTION_EXPIRY_MINUTES by default),
+        with grouped rollup deltas and bulk notification inserts, committed
+        per batch. Socket events and push notifications for a batch are sent
+        after its commit.
+
+        Returns:
+            dict with success flag and the sweep's metrics
+        """
+        if max_age_minutes is None:
+            max_age_minutes = current_app.config.get('PENDING_TRANSACTION_EXPIRY_MINUTES', 0)
+        if not max_age_minutes or max_age_minutes <= 0:
             return {
                 'success': True,
-                'message': f'{count} transactions marked as overdue'
+                'message': 'Pending transaction expiry is disabled',
+                'data': {'expired': 0, 'batches': 0, 'duration_ms': 0}
             }
+
+        cutoff = datetime.utcnow() - timedelta(minutes=max_age_minutes)
+        reason = f'Expired: not confirmed within {max_age_minutes} minutes'
+        started = datetime.utcnow()
+        metrics = {'expired': 0, 'batches': 0, 'duration_ms': 0}
+
+        # Served by the partial index on pending rows (ix_transactions_pending_created_at)
+        candidates = db.select(Transaction.id).where(
+            Transaction.status == 'pending',
+            Transaction.created_at < cutoff
+        ).order_by(Transaction.created_at).limit(batch_size)
+        if db.engine.dialect.name == 'postgresql':
+            candidates = candidates.with_for_update(skip_locked=True)
+
+        while True:
+            try:
+                expired = db.session.execute(
+                    db.update(Transaction)
+                    .where(Transaction.id.in_(candidates.scalar_subquery()), Transaction.status == 'pending')
+                    .values(status='cancelled', cancellation_reason=reason, updated_at=datetime.utcnow())
+                    .returning(Transaction)
+                    .execution_options(synchronize_session=False)
+                ).scalars().all()
+                if not expired:
+                    break
+
+                SalesRollupService.record_status_change(expired, 'pending')
+                db.session.execute(
+                    db.insert(Notification),
+                    [TransactionService._expired_notification_row(txn) for txn in expired]
+                )
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                metrics['duration_ms'] = int((datetime.utcnow() - started).total_seconds() * 1000)
+                return {
+                    'success': False,
+                    'message': f'Failed to expire pending transactions: {str(e)}',
+                    'error_code': 'SYS_001',
+                    'data': metrics
+                }
+
+            # Emit real-time events after the batch is committed
+            for txn in expired:
+                event_data = build_transaction_event_data(txn)
+                emit_to_customer(txn.customer_id, 'transaction_cancelled', event_data)
+                emit_to_merchant(txn.merchant_id, 'transaction_cancelled', event_data)
+            TransactionService._push_expired(expired)
+            db.session.expunge_all()
+
+            metrics['expired'] += len(expired)
+            metrics['batches'] += 1
+            metrics['duration_ms'] = int((datetime.utcnow() - started).total_seconds() * 1000)
+            current_app.logger.info(
+                f"Pending expiry: batch {metrics['batches']}, {len(expired)} expired, {metrics['expired']} total"
+            )
+            if progress:
+                progress(dict(metrics))
+
+        metrics['duration_ms'] = int((datetime.utcnow() - started).total_seconds() * 1000)
+        return {
+            'success': True,
+            'message': f"{metrics['expired']} pending transactions expired",
+            'data': metrics
+        }
+
+    @staticmethod
+    def _push_to_customers(pushes):
+        """
+        Push one message per customer to their active devices.
+
+        pushes maps customer_id to (title, body, data). One device query
+        covers every customer; each customer's devices then get one
+        send_multicast call (chunked at MULTICAST_MAX_TOKENS devices).
+        Failures are logged, never raised: the pushes go out after the
+        commit and must not fail the request.
+        """
+        from app.models.device import CustomerDevice
+        from app.services.firebase_service import FirebaseService
+
+        if not pushes:
+            return
+        try:
+            tokens = {}
+            for customer_id, fcm_token in db.session.query(CustomerDevice.customer_id, CustomerDevice.fcm_token).filter(
+                CustomerDevice.customer_id.in_(list(pushes)),
+                CustomerDevice.is_active == True
+            ):
+                tokens.setdefault(customer_id, []).append(fcm_token)
+
+            for customer_id, customer_tokens in tokens.items():
+                title, body, data = pushes[customer_id]
+                for start in range(0, len(customer_tokens), FirebaseService.MULTICAST_MAX_TOKENS):
+                    FirebaseService.send_multicast(
+                        tokens=customer_tokens[start:start + FirebaseService.MULTICAST_MAX_TOKENS],
+                        title=title,
+                        body=body,
+                        data=data
+                    )
         except Exception as e:
-            db.session.rollback()
-            return {
-                'success': False,
-                'message': f'Failed to update overdue transactions: {str(e)}'
-            }
+            current_app.logger.error(f'Failed to push to customers: {str(e)}')
+
+    @staticmethod
+    def _new_transaction_pushes(transactions, merchant):
+        """Build the confirm-request pushes for new transactions, one per customer"""
+        by_customer = {}
+        for transaction in transactions:
+            by_customer.setdefault(transaction.customer_id, []).append(transaction)
+
+        pushes = {}
+        for customer_id, customer_transactions in by_customer.items():
+            if len(customer_transactions) == 1:
+                transaction = customer_transactions[0]
+                body = f'لديك معاملة جديدة من {merchant.name_ar} بمبلغ {transaction.total_amount} ريال. الرجاء التأكيد.'
+                data = {'notification_type': 'transaction', 'entity_type': 'transaction', 'entity_id': transaction.id}
+            else:
+                body = f'لديك {len(customer_transactions)} معاملات جديدة من {merchant.name_ar}. الرجاء التأكيد.'
+                data = {'notification_type': 'transaction', 'entity_type': 'transaction'}
+            pushes[customer_id] = ('معاملة جديدة', body, data)
+        return pushes
+
+    @staticmethod
+    def _push_expired(transactions):
+        """Push expiry notices for a batch: one push per customer"""
+        by_customer = {}
+        for txn in transactions:
+            by_customer.setdefault(txn.customer_id, []).append(txn)
+
+        pushes = {}
+        for customer_id, customer_transactions in by_customer.items():
+            if len(customer_transactions) == 1:
+                txn = customer_transactions[0]
+                body = f'تم إلغاء المعاملة رقم {txn.reference_number} لعدم تأكيدها في الوقت المحدد'
+                data = {'notification_type': 'transaction', 'entity_type': 'transaction', 'entity_id': txn.id}
+            else:
+                body = f'تم إلغاء {len(customer_transactions)} معاملات لعدم تأكيدها في الوقت المحدد'
+                data = {'notification_type': 'transaction', 'entity_type': 'transaction'}
+            pushes[customer_id] = ('انتهت صلاحية المعاملة', body, data)
+        TransactionService._push_to_customers(pushes)
 
     # ==================== Statistics ====================
 
@@ -972,7 +1535,7 @@ class TransactionService:
     # ==================== Staff Transactions (Mobile App) ====================
 
     @staticmethod
-    def get_staff_transactions(staff_id, status=None, from_date=None, to_date=None, page=1, per_page=20):
+    def get_staff_transactions(staff_id, status=None, from_date=None, to_date=None, page=1, per_page=20, cursor=None, include_total=True):
         """Get transactions created by a specific staff member"""
         user = MerchantUser.query.get(staff_id)
 
@@ -983,23 +1546,25 @@ class TransactionService:
                 'error_code': 'MERCH_006'
             }
 
-        query = Transaction.query.filter(Transaction.cashier_id == staff_id)
+        query = Transaction.query.filter(Transaction.cashier_id == staff_id).options(
+            selectinload(Transaction.customer),
+            selectinload(Transaction.branch)
+        )
 
         if status:
             query = query.filter(Transaction.status == status)
 
-        if from_date:
-            query = query.filter(db.func.date(Transaction.created_at) >= from_date)
-
-        if to_date:
-            query = query.filter(db.func.date(Transaction.created_at) <= to_date)
+        # Whole days as a range on created_at, so the index on (cashier_id, created_at) applies
+        query = query.filter(*Transaction.day_range(Transaction.created_at, from_date, to_date))
 
-        query = query.order_by(Transaction.created_at.desc())
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+        pagination = paginate(
+            query, page, per_page, cursor=cursor, include_total=include_total,
+            order_by=(Transaction.created_at, Transaction.id)
+        )
 
         transactions = []
         for tx in pagination.items:
-            tx_dict = tx.to_dict()
+            tx_dict = serialize_transaction(tx)
             tx_dict['customer'] = {
                 'id': tx.customer.id,
                 'full_name_ar': tx.customer.full_name_ar,
@@ -1014,30 +1579,30 @@ class TransactionService:
             'data': {
                 'transactions': transactions
             },
-            'meta': {
-                'page': page,
-                'per_page': per_page,
-                'total': pagination.total,
-                'total_pages': pagination.pages
-            }
+            'meta': pagination.meta
         }
 
     # ==================== Notifications ====================
 
+    @staticmethod
+    def _new_transaction_notification(transaction, merchant):
+        """Notification asking the customer to confirm a new transaction"""
+        return Notification(
+            customer_id=transaction.customer_id,
+            title_ar='معاملة جديدة',
+            title_en='New Transaction',
+            body_ar=f'لديك معاملة جديدة من {merchant.name_ar} بمبلغ {transaction.total_amount} ريال. الرجاء التأكيد.',
+            body_en=f'New transaction from {merchant.name_en or merchant.name_ar} for {transaction.total_amount} SAR. Please confirm.',
+            type='transaction',
+            related_entity_type='transaction',
+            related_entity_id=transaction.id
+        )
+
     @staticmethod
     def _notify_customer_new_transaction(customer, transaction, merchant, branch):
         """Send notification for new transaction"""
         try:
-            notification = Notification(
-                customer_id=customer.id,
-                title_ar='معاملة جديدة',
-                title_en='New Transaction',
-                body_ar=f'لديك معاملة جديدة من {merchant.name_ar} بمبلغ {transaction.total_amount} ريال. الرجاء التأكيد.',
-                body_en=f'New transaction from {merchant.name_en or merchant.name_ar} for {transaction.total_amount} SAR. Please confirm.',
-                type='transaction',
-                reference_id=transaction.id
-            )
-            db.session.add(notification)
+            db.session.add(TransactionService._new_transaction_notification(transaction, merchant))
             db.session.commit()
         except Exception:
             pass
@@ -1079,19 +1644,29 @@ class TransactionService:
             pass
 
     @staticmethod
-    def _notify_customer_overdue(customer, transaction):
-        """Send notification for overdue transaction"""
-        try:
-            notification = Notification(
-                customer_id=customer.id,
-                title_ar='معاملة متأخرة',
-                title_en='Overdue Transaction',
-                body_ar=f'المعاملة رقم {transaction.reference_number} متأخرة عن موعد السداد. الرجاء السداد في أقرب وقت.',
-                body_en=f'Transaction {transaction.reference_number} is overdue. Please pay as soon as possible.',
-                type='payment_reminder',
-                reference_id=transaction.id
-            )
-            db.session.add(notification)
-            db.session.commit()
-        except Exception:
-            pass
+    def _expired_notification_row(transaction):
+        """Notification values telling the customer a pending transaction expired (for bulk inserts)"""
+        return {
+            'customer_id': transaction.customer_id,
+            'title_ar': 'انتهت صلاحية المعاملة',
+            'title_en': 'Transaction Expired',
+            'body_ar': f'تم إلغاء المعاملة رقم {transaction.reference_number} لعدم تأكيدها في الوقت المحدد',
+            'body_en': f'Transaction {transaction.reference_number} was cancelled because it was not confirmed in time',
+            'type': 'transaction',
+            'related_entity_type': 'transaction',
+            'related_entity_id': transaction.id
+        }
+
+    @staticmethod
+    def _overdue_notification_row(transaction):
+        """Notification values telling the customer a transaction is overdue (for bulk inserts)"""
+        return {
+            'customer_id': transaction.customer_id,
+            'title_ar': 'معاملة متأخرة',
+            'title_en': 'Overdue Transaction',
+            'body_ar': f'المعاملة رقم {transaction.reference_number} متأخرة عن موعد السداد. الرجاء السداد في أقرب وقت.',
+            'body_en': f'Transaction {transaction.reference_number} is overdue. Please pay as soon as possible.',
+            'type': 'payment_reminder',
+            'related_entity_type': 'transaction',
+            'related_entity_id': transaction.id
+        }
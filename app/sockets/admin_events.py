@@ -3,6 +3,7 @@ Admin Socket Events - Real-time updates for admin dashboard
 """
 from flask import request, current_app
 from flask_socketio import Namespace, emit
+from app.utils.admin_live_counters import admin_live_counters
 from app.sockets.auth import (
     verify_socket_token,
     register_socket_connection,
@@ -29,10 +30,13 @@ class AdminNamespace(Namespace):
     - overdue_alert: Transaction became overdue
     - system_stats: System statistics update
     - notification_new: New notification
+    - dashboard_snapshot: Full live dashboard counters (on connect and on request)
+    - dashboard_delta: Batched changes to the live dashboard counters
 
     Events FROM admins:
     - ping: Keep-alive ping
     - get_system_stats: Request current system stats
+    - get_dashboard_snapshot: Request the full live dashboard counters
     - broadcast: Broadcast message to all users (super_admin only)
     """
 
@@ -75,6 +79,9 @@ class AdminNamespace(Namespace):
             'message': 'Connected to admin real-time updates'
         })
 
+        # Start the client from a full snapshot; dashboard_delta events follow
+        emit('dashboard_snapshot', admin_live_counters.snapshot())
+
         return True
 
     def on_disconnect(self):
@@ -105,6 +112,11 @@ class AdminNamespace(Namespace):
 
         emit('system_stats', stats)
 
+    @socket_authenticated
+    def on_get_dashboard_snapshot(self, data=None):
+        """Get the full live dashboard counters (e.g. after missing a delta)."""
+        emit('dashboard_snapshot', admin_live_counters.snapshot())
+
     @socket_authenticated
     def on_subscribe_merchant(self, data):
         """
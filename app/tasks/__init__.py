@@ -1,3 +1,3 @@
 """
-Celery Tasks Package
+Background Tasks Package
 """
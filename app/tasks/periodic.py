@@ -0,0 +1,99 @@
+"""
+Periodic Tasks - In-process background loops for recurring maintenance
+"""
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def _expire_pending_transactions():
+    from app.services.transaction_service import TransactionService
+    return TransactionService.expire_pending_transactions()
+
+
+def _ensure_transaction_partitions():
+    from app.services.partition_service import PartitionService
+    if not PartitionService.is_partitioned():
+        return {'success': True}
+    return PartitionService.ensure_partitions()
+
+
+def _refresh_analytics_snapshot():
+    from app.services.analytics_snapshot_service import AnalyticsSnapshotService
+    if not AnalyticsSnapshotService.is_enabled():
+        return {'success': True}
+    return AnalyticsSnapshotService.refresh()
+
+
+# name -> (config key holding the interval in seconds, default interval, task)
+PERIODIC_TASKS = {
+    'expire-pending-transactions': ('PENDING_EXPIRY_SWEEP_INTERVAL', 60, _expire_pending_transactions),
+    'ensure-transaction-partitions': ('TRANSACTION_PARTITION_CHECK_INTERVAL', 21600, _ensure_transaction_partitions),
+    'refresh-analytics-snapshot': ('ANALYTICS_SNAPSHOT_REFRESH_INTERVAL', 300, _refresh_analytics_snapshot),
+}
+
+
+class PeriodicTasks:
+    """
+    Runs each task in PERIODIC_TASKS every <interval> seconds on its own
+    background task.
+
+    Loops start with the first request, so CLI commands and scripts never
+    run them. Every worker process runs its own loops; the tasks are safe
+    to overlap (the expiry sweep only touches rows still pending, partition
+    creation is IF NOT EXISTS, each worker refreshes its own analytics
+    snapshot). An interval of 0 disables a task; each one
+    also has a flask command for deployments that prefer cron.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.intervals = {}
+        self.started = False
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.intervals = {
+            name: app.config.get(config_key, default)
+            for name, (config_key, default, _) in PERIODIC_TASKS.items()
+        }
+        if app.config.get('PENDING_TRANSACTION_EXPIRY_MINUTES', 0) <= 0:
+            self.intervals['expire-pending-transactions'] = 0
+        app.extensions['periodic_tasks'] = self
+        if not app.testing and any(interval > 0 for interval in self.intervals.values()):
+            app.before_request(self._start_on_request)
+
+    def _start_on_request(self):
+        if not self.started:
+            self.start()
+
+    def start(self):
+        with self._lock:
+            if self.started:
+                return
+            self.started = True
+        from app.extensions import socketio
+        for name, interval in self.intervals.items():
+            if interval > 0:
+                socketio.start_background_task(self._run, name, interval)
+
+    def _run(self, name, interval):
+        from app.extensions import db, socketio
+
+        task = PERIODIC_TASKS[name][2]
+        while True:
+            socketio.sleep(interval)
+            with self.app.app_context():
+                try:
+                    result = task()
+                    if not result['success']:
+                        logger.error(f"{name}: {result['message']}")
+                except Exception as e:
+                    logger.error(f'{name} failed: {str(e)}')
+                finally:
+                    db.session.remove()
+
+
+periodic_tasks = PeriodicTasks()
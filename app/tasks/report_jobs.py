@@ -0,0 +1,185 @@
+"""
+Report Jobs - Background execution of long-range admin reports
+"""
+import hashlib
+import json
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from app.utils.report_cache import create_backend
+
+
+def _run_admin_overview(report_type):
+    def run(from_date=None, to_date=None):
+        from app.services.report_service import ReportService
+        return ReportService.get_admin_overview(from_date=from_date, to_date=to_date, report_type=report_type)
+    return run
+
+
+def _run_financial(from_date=None, to_date=None):
+    from app.services.report_service import ReportService
+    return ReportService.get_financial_report(from_date=from_date, to_date=to_date)
+
+
+REPORT_JOB_TYPES = {
+    'overview': _run_admin_overview('overview'),
+    'transactions': _run_admin_overview('transactions'),
+    'customers': _run_admin_overview('customers'),
+    'merchants': _run_admin_overview('merchants'),
+    'financial': _run_financial,
+}
+
+
+class ReportJobQueue:
+    """
+    Worker pool for report jobs.
+
+    Jobs run on a thread pool inside an application context, in the process
+    that accepted them. Their status and result are kept in the
+    REPORT_CACHE_BACKEND store, so with the shared backend a poll can land
+    on any worker. Finished jobs keep their result for REPORT_JOB_RESULT_TTL
+    seconds; a job whose worker died stays 'running' for that long, then
+    disappears. Submitting a job identical to one still queued or running
+    returns the existing job instead of starting another (claimed with an
+    atomic add, so this holds across workers too).
+    """
+
+    def __init__(self):
+        self.app = None
+        self.executor = None
+        self.backend = None
+        self.result_ttl = 3600
+
+    def init_app(self, app):
+        self.app = app
+        self.result_ttl = app.config.get('REPORT_JOB_RESULT_TTL', 3600)
+        self.executor = ThreadPoolExecutor(
+            max_workers=app.config.get('REPORT_JOB_WORKERS', 2),
+            thread_name_prefix='report-job'
+        )
+        self.backend = create_backend(
+            app.config.get('REPORT_CACHE_BACKEND', 'memory'),
+            url=app.config.get('REPORT_CACHE_URL'),
+            max_entries=app.config.get('REPORT_JOB_MAX_JOBS', 1000),
+            prefix='bariq:report-jobs:'
+        )
+        app.extensions['report_jobs'] = self
+
+    def submit(self, report_type, params=None):
+        """
+        Queue a report job.
+
+        Returns:
+            dict with success flag and the job (new or deduplicated)
+        """
+        if report_type not in REPORT_JOB_TYPES:
+            return {
+                'success': False,
+                'message': 'Unknown report type',
+                'error_code': 'VAL_001'
+            }
+
+        params = {k: v for k, v in (params or {}).items() if v is not None}
+        dedupe_key = 'in-flight:' + hashlib.sha256(
+            json.dumps([report_type, params], sort_keys=True).encode()
+        ).hexdigest()
+
+        job = {
+            'id': str(uuid.uuid4()),
+            'report_type': report_type,
+            'params': params,
+            'status': 'queued',
+            'error': None,
+            'submitted_at': datetime.utcnow().isoformat(),
+            'started_at': None,
+            'finished_at': None,
+            'expires_at': None,
+        }
+        self._save(job)
+
+        # Two attempts: the job holding the claim may finish between the add and the lookup
+        for _ in range(2):
+            if self.backend.add(dedupe_key, job['id'], self.result_ttl):
+                break
+            existing = self._load(self.backend.get(dedupe_key))
+            if existing and existing['status'] in ('queued', 'running'):
+                self.backend.delete('job:' + job['id'])
+                return {
+                    'success': True,
+                    'message': 'Identical report job already in progress',
+                    'data': {'job': existing}
+                }
+            self.backend.delete(dedupe_key)
+        else:
+            self.backend.delete('job:' + job['id'])
+            return {
+                'success': False,
+                'message': 'Identical report job is being submitted, try again',
+                'error_code': 'SYS_001'
+            }
+
+        self.executor.submit(self._run, job, dedupe_key)
+
+        return {
+            'success': True,
+            'message': 'Report job submitted',
+            'data': {'job': job}
+        }
+
+    def get(self, job_id):
+        """Get job status (without the result)"""
+        return self._load(job_id)
+
+    def get_result(self, job_id):
+        """
+        Get the result of a finished job.
+
+        Returns:
+            (job, result) - result is None while the job has not finished
+        """
+        job = self._load(job_id)
+        if not job:
+            return None, None
+        result = self.backend.get('result:' + job_id) if job['status'] in ('completed', 'failed') else None
+        return job, json.loads(result) if result is not None else None
+
+    def _run(self, job, dedupe_key):
+        job['status'] = 'running'
+        job['started_at'] = datetime.utcnow().isoformat()
+        self._save(job)
+
+        result, error = None, None
+        with self.app.app_context():
+            try:
+                result = REPORT_JOB_TYPES[job['report_type']](**job['params'])
+                if not result.get('success'):
+                    error = result.get('message')
+            except Exception as e:
+                error = str(e)
+                result = {'success': False, 'message': error, 'error_code': 'SYS_001'}
+            finally:
+                from app.extensions import db
+                db.session.remove()
+
+        finished_at = datetime.utcnow()
+        # The result goes in first: a job read as finished always has one
+        self.backend.set('result:' + job['id'], self.app.json.dumps(result), self.result_ttl, [])
+        job['status'] = 'failed' if error else 'completed'
+        job['error'] = error
+        job['finished_at'] = finished_at.isoformat()
+        job['expires_at'] = (finished_at + timedelta(seconds=self.result_ttl)).isoformat()
+        self._save(job)
+        if self.backend.get(dedupe_key) == job['id']:
+            self.backend.delete(dedupe_key)
+
+    def _save(self, job):
+        self.backend.set('job:' + job['id'], json.dumps(job), self.result_ttl, [])
+
+    def _load(self, job_id):
+        if not job_id:
+            return None
+        stored = self.backend.get('job:' + job_id)
+        return json.loads(stored) if stored is not None else None
+
+
+report_jobs = ReportJobQueue()
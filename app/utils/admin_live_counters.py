@@ -0,0 +1,183 @@
+"""
+Admin Live Counters - In-memory dashboard counters pushed to admins as throttled deltas
+"""
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+
+
+PENDING_DELTAS_KEY = 'admin_live_counter_deltas'
+
+COUNTERS = [
+    'transactions_today',
+    'transactions_amount_today',
+    'collected_today',
+    'new_customers_today',
+    'pending_settlements',
+]
+
+
+class AdminLiveCounters:
+    """
+    Today's platform counters, kept in memory and updated from committed changes.
+
+    Services call record() with deltas before committing; the deltas are
+    applied only once the session commits. Applied deltas are batched and
+    pushed to admin_room as a 'dashboard_delta' event at most once every
+    ADMIN_LIVE_COUNTERS_INTERVAL seconds. Clients start from a
+    'dashboard_snapshot' (sent on connect or on request) and apply deltas
+    whose version follows the last one seen; a gap means they should ask for
+    a new snapshot.
+
+    Counters are seeded from the database on first use and again when the
+    day changes. They are per process, like the socket connections.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.interval = 1.0
+        self.day = None
+        self.version = 0
+        self.values = dict.fromkeys(COUNTERS, 0)
+        self._pending = {}
+        self._flush_scheduled = False
+        self._needs_snapshot = False
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.interval = app.config.get('ADMIN_LIVE_COUNTERS_INTERVAL', 1.0)
+        app.extensions['admin_live_counters'] = self
+
+    # ==================== Recording ====================
+
+    def record(self, session, **deltas):
+        """Queue counter deltas, applied when the session commits"""
+        pending = session.info.setdefault(PENDING_DELTAS_KEY, {})
+        for name, value in deltas.items():
+            if value:
+                pending[name] = pending.get(name, 0) + value
+
+    def apply(self, deltas):
+        """Apply committed deltas and schedule a push to admins"""
+        if self.app is None:
+            return
+        with self._lock:
+            if self.day != datetime.utcnow().date():
+                # Not seeded yet or the day rolled over: the next push reseeds and sends a snapshot
+                self._needs_snapshot = True
+            else:
+                for name, value in deltas.items():
+                    self.values[name] = self.values.get(name, 0) + value
+                    self._pending[name] = self._pending.get(name, 0) + value
+            self._schedule_flush()
+
+    # ==================== Snapshot ====================
+
+    def snapshot(self):
+        """Full counter values (seeding from the database when needed)"""
+        with self._lock:
+            if self.day != datetime.utcnow().date():
+                self._seed()
+            return self._snapshot_payload()
+
+    def _snapshot_payload(self):
+        return {
+            'date': self.day.isoformat(),
+            'version': self.version,
+            'counters': dict(self.values)
+        }
+
+    def _seed(self):
+        from app.extensions import db
+        from app.models.customer import Customer
+        from app.models.daily_sales_rollup import DailySalesRollup
+        from app.models.payment import Payment
+        from app.models.settlement import Settlement
+
+        today = datetime.utcnow().date()
+        today_start = datetime.combine(today, datetime.min.time())
+        tomorrow_start = today_start + timedelta(days=1)
+
+        transactions_today, amount_today = db.session.query(
+            func.coalesce(func.sum(DailySalesRollup.transaction_count), 0),
+            func.coalesce(func.sum(DailySalesRollup.total_amount), 0)
+        ).filter(DailySalesRollup.rollup_date == today).one()
+
+        collected_today, new_customers_today, pending_settlements = db.session.query(
+            db.select(func.coalesce(func.sum(Payment.amount), 0)).where(
+                Payment.status == 'completed',
+                Payment.created_at >= today_start,
+                Payment.created_at < tomorrow_start
+            ).scalar_subquery(),
+            db.select(func.count(Customer.id)).where(
+                Customer.created_at >= today_start,
+                Customer.created_at < tomorrow_start
+            ).scalar_subquery(),
+            db.select(func.count(Settlement.id)).where(Settlement.status == 'pending').scalar_subquery()
+        ).one()
+
+        self.day = today
+        self.version += 1
+        self.values = {
+            'transactions_today': int(transactions_today),
+            'transactions_amount_today': float(amount_today),
+            'collected_today': float(collected_today),
+            'new_customers_today': int(new_customers_today),
+            'pending_settlements': int(pending_settlements),
+        }
+        self._pending = {}
+        self._needs_snapshot = False
+
+    # ==================== Push ====================
+
+    def _schedule_flush(self):
+        if self._flush_scheduled:
+            return
+        self._flush_scheduled = True
+        from app.extensions import socketio
+        socketio.start_background_task(self._flush_later)
+
+    def _flush_later(self):
+        from app.extensions import db, socketio
+
+        socketio.sleep(self.interval)
+        with self.app.app_context():
+            try:
+                with self._lock:
+                    self._flush_scheduled = False
+                    if self._needs_snapshot or self.day != datetime.utcnow().date():
+                        self._seed()
+                        event_name, payload = 'dashboard_snapshot', self._snapshot_payload()
+                    elif self._pending:
+                        self.version += 1
+                        event_name = 'dashboard_delta'
+                        payload = {
+                            'date': self.day.isoformat(),
+                            'version': self.version,
+                            'deltas': self._pending
+                        }
+                        self._pending = {}
+                    else:
+                        return
+                socketio.emit(event_name, payload, room='admin_room', namespace='/admin')
+            except Exception as e:
+                self.app.logger.error(f"Failed to push admin live counters: {str(e)}")
+            finally:
+                db.session.remove()
+
+
+admin_live_counters = AdminLiveCounters()
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_committed_deltas(session):
+    deltas = session.info.pop(PENDING_DELTAS_KEY, None)
+    if deltas:
+        admin_live_counters.apply(deltas)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_pending_deltas(session):
+    session.info.pop(PENDING_DELTAS_KEY, None)
@@ -0,0 +1,151 @@
+"""
+Customer Lookup Cache - Short-lived cache of customers by Bariq ID for the POS flow
+"""
+import json
+import threading
+from collections import namedtuple
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app.extensions import db
+from app.models.customer import Customer
+from app.utils.report_cache import create_backend
+
+
+PENDING_BARIQ_IDS_KEY = 'customer_lookup_invalidations'
+
+CachedCustomer = namedtuple('CachedCustomer', [
+    'id', 'bariq_id', 'full_name_ar', 'full_name_en', 'status',
+    'credit_limit', 'available_credit', 'used_credit'
+])
+
+
+class CustomerLookupCache:
+    """
+    Customers by bariq_id (status, names, credit) with a short TTL.
+
+    Any change to a customer evicts its entry twice: when the change is made
+    (so lookups during the transaction go to the database) and again in the
+    committing thread right after the commit, before the request carries on.
+    A lookup racing with an eviction does not store what it loaded, and a
+    session with uncommitted changes to a customer never caches it.
+
+    Spending credit is still checked in the database by
+    Customer.reserve_credit, so even a stale entry cannot let a suspended
+    customer buy.
+    """
+
+    def __init__(self):
+        self.backend = None
+        self.enabled = False
+        self.ttl = 30
+        self._loading = {}  # bariq_id -> token of the load allowed to store its result
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.enabled = app.config.get('CUSTOMER_LOOKUP_CACHE_ENABLED', True)
+        self.ttl = app.config.get('CUSTOMER_LOOKUP_CACHE_TTL', 30)
+        self.backend = create_backend(
+            app.config.get('REPORT_CACHE_BACKEND', 'memory'),
+            url=app.config.get('REPORT_CACHE_URL'),
+            max_entries=app.config.get('CUSTOMER_LOOKUP_CACHE_MAX_ENTRIES', 10000),
+            prefix='bariq:customer-lookup:'
+        )
+        app.extensions['customer_lookup_cache'] = self
+
+    @staticmethod
+    def _key(bariq_id):
+        return f'bariq:{bariq_id}'
+
+    # ==================== Lookups ====================
+
+    def get(self, bariq_id):
+        """
+        Look up a customer by Bariq ID.
+
+        Returns:
+            CachedCustomer, or None if no customer has this Bariq ID
+        """
+        if not bariq_id:
+            return None
+        if not self.enabled or self.backend is None or \
+                bariq_id in db.session.info.get(PENDING_BARIQ_IDS_KEY, ()):
+            return self._load(bariq_id)
+
+        cached = self.backend.get(self._key(bariq_id))
+        if cached is not None:
+            return CachedCustomer(*json.loads(cached))
+
+        token = object()
+        with self._lock:
+            self._loading[bariq_id] = token
+
+        customer = self._load(bariq_id)
+
+        with self._lock:
+            if self._loading.get(bariq_id) is token:
+                del self._loading[bariq_id]
+                if customer is not None:
+                    self.backend.set(self._key(bariq_id), json.dumps(list(customer)), self.ttl, [])
+        return customer
+
+    @staticmethod
+    def _load(bariq_id):
+        row = db.session.query(
+            Customer.id, Customer.bariq_id, Customer.full_name_ar, Customer.full_name_en, Customer.status,
+            Customer.credit_limit, Customer.available_credit, Customer.used_credit
+        ).filter(Customer.bariq_id == bariq_id).first()
+        if row is None:
+            return None
+        return CachedCustomer(
+            row.id, row.bariq_id, row.full_name_ar, row.full_name_en, row.status,
+            float(row.credit_limit or 0), float(row.available_credit or 0), float(row.used_credit or 0)
+        )
+
+    # ==================== Invalidation ====================
+
+    def mark_dirty(self, session, *bariq_ids):
+        """Evict these customers now and again once the session commits"""
+        bariq_ids = [bariq_id for bariq_id in bariq_ids if bariq_id]
+        if not bariq_ids:
+            return
+        session.info.setdefault(PENDING_BARIQ_IDS_KEY, set()).update(bariq_ids)
+        self.invalidate(*bariq_ids)
+
+    def invalidate(self, *bariq_ids):
+        if self.backend is None:
+            return
+        with self._lock:
+            for bariq_id in bariq_ids:
+                self._loading.pop(bariq_id, None)
+                self.backend.delete(self._key(bariq_id))
+
+    def clear(self):
+        if self.backend is not None:
+            with self._lock:
+                self._loading.clear()
+                self.backend.clear()
+
+
+customer_lookup_cache = CustomerLookupCache()
+
+
+@event.listens_for(Customer, 'after_update')
+@event.listens_for(Customer, 'after_delete')
+def _mark_customer_dirty(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is None:
+        return
+    history = inspect(target).attrs.bariq_id.history
+    customer_lookup_cache.mark_dirty(session, target.bariq_id, *(history.deleted or ()))
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed_customers(session):
+    bariq_ids = session.info.pop(PENDING_BARIQ_IDS_KEY, None)
+    if bariq_ids:
+        customer_lookup_cache.invalidate(*bariq_ids)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_pending_customers(session):
+    session.info.pop(PENDING_BARIQ_IDS_KEY, None)
@@ -0,0 +1,233 @@
+"""
+Customer Search - Normalized search documents and indexed substring lookup for customers
+"""
+import re
+import threading
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.extensions import db
+from app.models.customer import Customer
+
+
+PENDING_DOCUMENTS_KEY = 'customer_search_documents'
+
+# Harakat, superscript alef and tatweel
+_ARABIC_DIACRITICS = re.compile('[\u064B-\u0652\u0670\u0640]')
+_ARABIC_FOLDING = str.maketrans({
+    '\u0623': '\u0627',  # alef with hamza above -> alef
+    '\u0625': '\u0627',  # alef with hamza below -> alef
+    '\u0622': '\u0627',  # alef with madda -> alef
+    '\u0671': '\u0627',  # alef wasla -> alef
+    '\u0649': '\u064A',  # alef maksura -> ya
+    '\u0626': '\u064A',  # ya with hamza -> ya
+    '\u0624': '\u0648',  # waw with hamza -> waw
+    '\u0629': '\u0647',  # ta marbuta -> ha
+    **{chr(0x0660 + i): str(i) for i in range(10)},  # Arabic-Indic digits
+    **{chr(0x06F0 + i): str(i) for i in range(10)},  # Extended Arabic-Indic digits
+})
+_WHITESPACE = re.compile(r'\s+')
+
+SEARCH_FIELDS = ['full_name_ar', 'full_name_en', 'phone', 'national_id', 'email', 'bariq_id']
+
+
+def normalize_search_text(value):
+    """
+    Normalize text for search: lowercase, strip Arabic diacritics and tatweel,
+    fold alef/ya/waw/ta-marbuta variants and Arabic-Indic digits, collapse spaces.
+    """
+    if not value:
+        return ''
+    value = _ARABIC_DIACRITICS.sub('', str(value)).translate(_ARABIC_FOLDING).lower()
+    return _WHITESPACE.sub(' ', value).strip()
+
+
+def build_customer_search_text(customer):
+    """Search document for a customer: its searchable fields, normalized, one per line"""
+    parts = [normalize_search_text(getattr(customer, field)) for field in SEARCH_FIELDS]
+    if customer.phone:
+        # Digits-only phone so '+966 5x' and '05x' style queries both match
+        parts.append(re.sub(r'\D', '', normalize_search_text(customer.phone)))
+    return '\n'.join(part for part in parts if part)
+
+
+class NgramIndex:
+    """In-process trigram index over search documents (fallback where pg_trgm is not available)"""
+
+    def __init__(self, n=3):
+        self.n = n
+        self.documents = {}
+        self.postings = {}
+        self._lock = threading.Lock()
+
+    def _grams(self, text):
+        return {text[i:i + self.n] for i in range(len(text) - self.n + 1)}
+
+    def add(self, doc_id, text):
+        with self._lock:
+            self._remove(doc_id)
+            self.documents[doc_id] = text
+            for gram in self._grams(text):
+                self.postings.setdefault(gram, set()).add(doc_id)
+
+    def remove(self, doc_id):
+        with self._lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id):
+        text = self.documents.pop(doc_id, None)
+        if text is None:
+            return
+        for gram in self._grams(text):
+            ids = self.postings.get(gram)
+            if ids is not None:
+                ids.discard(doc_id)
+                if not ids:
+                    del self.postings[gram]
+
+    def search(self, term):
+        """Ids of documents containing term as a substring"""
+        with self._lock:
+            if len(term) < self.n:
+                candidates = self.documents.keys()
+            else:
+                posting_sets = sorted(
+                    (self.postings.get(gram, set()) for gram in self._grams(term)), key=len
+                )
+                candidates = set(posting_sets[0])
+                for ids in posting_sets[1:]:
+                    candidates &= ids
+                    if not candidates:
+                        break
+            return [doc_id for doc_id in candidates if term in self.documents[doc_id]]
+
+    def __len__(self):
+        return len(self.documents)
+
+
+class CustomerSearch:
+    """
+    Substring search over customers' normalized search documents.
+
+    PostgreSQL: LIKE on customers.search_text, served by a pg_trgm GIN index.
+    Other databases: an in-process trigram index built on first use and kept
+    in sync from committed customer inserts/updates; the matching ids are
+    then used to filter the query.
+    """
+
+    # Above this many matches the id list is not worth sending; filter with LIKE instead
+    MAX_INDEX_IDS = 5000
+
+    def init_app(self, app):
+        app.extensions['customer_search'] = {'index': None, 'lock': threading.Lock()}
+
+    def _index(self):
+        from flask import current_app
+        state = current_app.extensions['customer_search']
+        with state['lock']:
+            if state['index'] is None:
+                index = NgramIndex()
+                for customer_id, text in db.session.query(Customer.id, Customer.search_text).yield_per(10000):
+                    if text:
+                        index.add(customer_id, text)
+                state['index'] = index
+            return state['index']
+
+    def _loaded_index(self):
+        from flask import current_app, has_app_context
+        if not has_app_context():
+            return None
+        state = current_app.extensions.get('customer_search')
+        return state['index'] if state else None
+
+    @staticmethod
+    def _uses_trigram_index():
+        return db.engine.dialect.name == 'postgresql'
+
+    def filter_query(self, query, term):
+        """Restrict a Customer query to customers matching the search term"""
+        normalized = normalize_search_text(term)
+        if not normalized:
+            return query
+
+        if not self._uses_trigram_index():
+            ids = self._index().search(normalized)
+            if len(ids) <= self.MAX_INDEX_IDS:
+                return query.filter(Customer.id.in_(ids))
+
+        escaped = normalized.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        return query.filter(Customer.search_text.like(f'%{escaped}%', escape='\\'))
+
+    def rebuild(self, chunk_size=1000):
+        """
+        Recompute search_text for every customer (backfill after migrating) and reset the index.
+
+        Returns:
+            dict with success flag and number of customers updated
+        """
+        try:
+            updated = 0
+            last_id = ''
+            while True:
+                customers = Customer.query.filter(Customer.id > last_id) \
+                    .order_by(Customer.id).limit(chunk_size).all()
+                if not customers:
+                    break
+                rows = []
+                for customer in customers:
+                    text = build_customer_search_text(customer)
+                    if text != customer.search_text:
+                        rows.append({'id': customer.id, 'search_text': text})
+                if rows:
+                    db.session.execute(db.update(Customer), rows)
+                db.session.commit()
+                updated += len(rows)
+                last_id = customers[-1].id
+                db.session.expunge_all()
+
+            from flask import current_app
+            current_app.extensions['customer_search']['index'] = None
+
+            return {
+                'success': True,
+                'data': {'updated': updated}
+            }
+        except Exception as e:
+            db.session.rollback()
+            return {
+                'success': False,
+                'message': f'Failed to rebuild customer search: {str(e)}',
+                'error_code': 'SYS_001'
+            }
+
+
+customer_search = CustomerSearch()
+
+
+@event.listens_for(Customer, 'before_insert')
+@event.listens_for(Customer, 'before_update')
+def _set_search_text(mapper, connection, target):
+    target.search_text = build_customer_search_text(target)
+
+
+@event.listens_for(Customer, 'after_insert')
+@event.listens_for(Customer, 'after_update')
+def _queue_search_document(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is not None:
+        session.info.setdefault(PENDING_DOCUMENTS_KEY, {})[target.id] = target.search_text
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_committed_documents(session):
+    documents = session.info.pop(PENDING_DOCUMENTS_KEY, None)
+    if not documents:
+        return
+    index = customer_search._loaded_index()
+    if index is not None:
+        for customer_id, text in documents.items():
+            index.add(customer_id, text)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_pending_documents(session):
+    session.info.pop(PENDING_DOCUMENTS_KEY, None)
@@ -0,0 +1,178 @@
+"""
+ID Rekey - Move existing rows of the high-insert tables from UUIDv4 to UUIDv7 keys
+"""
+import secrets
+import time
+from datetime import timezone
+from sqlalchemy import Column, MetaData, String, Table, and_, func, select, text
+from uuid6 import UUID
+from app.extensions import db
+
+
+# Tables whose new rows get UUIDv7 keys (see generate_uuid7)
+REKEY_TABLES = ['transactions', 'payments', 'notifications', 'audit_logs']
+
+# Columns pointing at a row by id without a foreign key: (table, type column, id column)
+POLYMORPHIC_REFERENCES = [
+    ('notifications', 'related_entity_type', 'related_entity_id'),
+    ('audit_logs', 'entity_type', 'entity_id'),
+]
+ENTITY_TYPES = {'transactions': 'transaction', 'payments': 'payment'}
+
+
+def uuid7_at(moment):
+    """UUIDv7 string for a naive UTC datetime, so a rekeyed row sorts by its created_at"""
+    if moment is None:
+        milliseconds = time.time_ns() // 10 ** 6
+    else:
+        milliseconds = int(moment.replace(tzinfo=timezone.utc).timestamp() * 1000)
+    value = (milliseconds & 0xFFFFFFFFFFFF) << 80 | secrets.randbits(76)
+    return str(UUID(int=value, version=7))
+
+
+def _references(table_name):
+    """(table, id column, type column, type value) for every column holding ids of table_name"""
+    references = []
+    for table in db.metadata.sorted_tables:
+        for foreign_key in table.foreign_keys:
+            if foreign_key.column.table.name == table_name and foreign_key.column.name == 'id':
+                references.append((table, foreign_key.parent, None, None))
+    entity_type = ENTITY_TYPES.get(table_name)
+    if entity_type:
+        for name, type_column, id_column in POLYMORPHIC_REFERENCES:
+            table = db.metadata.tables[name]
+            references.append((table, table.c[id_column], table.c[type_column], entity_type))
+    return references
+
+
+def _inbound_constraints(connection, table_name):
+    """Foreign key constraints on PostgreSQL that reference table_name: [(table, constraint)]"""
+    if connection.dialect.name != 'postgresql':
+        return []
+    return [tuple(row) for row in connection.execute(text(
+        "SELECT conrelid::regclass::text, conname FROM pg_constraint "
+        "WHERE contype = 'f' AND confrelid = CAST(:table AS regclass)"
+    ), {'table': table_name})]
+
+
+def rekey_table(table_name, batch_size=1000, dry_run=False, progress=None):
+    """
+    Give every row of table_name that still has a random UUIDv4 key a
+    UUIDv7 key derived from its created_at, updating every column that
+    refers to it in the same batch transaction.
+
+    This is optional: new rows get UUIDv7 keys either way and old keys stay
+    valid. Rekeying makes id order match creation order for the old rows
+    too. Ids change, so clients holding old ids (links, cached responses,
+    stored idempotency responses) no longer find those rows; run it in a
+    maintenance window. Safe to re-run; rows already on UUIDv7 are skipped.
+    Callers clear the report cache and rebuild the analytics snapshot
+    (AnalyticsSnapshotService.refresh(full=True)) afterwards, as the
+    rekey-uuid7 command does: both hold rows by their old ids.
+
+    On PostgreSQL, foreign keys referencing the table are made deferrable
+    while it runs and restored afterwards, and every deferrable constraint
+    (including the reference triggers of a partitioned transactions table)
+    is deferred to the end of each batch.
+
+    Args:
+        table_name: one of REKEY_TABLES
+        batch_size: rows per transaction
+        dry_run: only count the rows that would be rekeyed
+        progress: optional callable receiving the running metrics after each batch
+
+    Returns:
+        dict with success flag and metrics (rekeyed, references, batches, duration_ms)
+    """
+    if table_name not in REKEY_TABLES:
+        return {
+            'success': False,
+            'message': f"table must be one of {', '.join(REKEY_TABLES)}",
+            'error_code': 'VAL_001'
+        }
+
+    table = db.metadata.tables[table_name]
+    # Version nibble: the 15th character of the canonical form
+    not_rekeyed = func.substr(table.c.id, 15, 1) != '7'
+    started = time.perf_counter()
+    metrics = {'table': table_name, 'rekeyed': 0, 'references': 0, 'batches': 0, 'duration_ms': 0}
+
+    if dry_run:
+        metrics['pending'] = db.session.execute(
+            select(func.count()).select_from(table).where(not_rekeyed)
+        ).scalar()
+        return {'success': True, 'data': metrics}
+
+    id_map = Table(
+        'id_rekey_map', MetaData(),
+        Column('old_id', String(36), primary_key=True),
+        Column('new_id', String(36), nullable=False),
+        prefixes=['TEMPORARY']
+    )
+    references = _references(table_name)
+
+    # One connection throughout: the mapping table is temporary to it
+    with db.engine.connect() as connection:
+        constraints = _inbound_constraints(connection, table_name)
+        try:
+            for child, constraint in constraints:
+                connection.execute(text(f'ALTER TABLE {child} ALTER CONSTRAINT {constraint} DEFERRABLE INITIALLY DEFERRED'))
+            id_map.create(connection, checkfirst=True)
+            connection.commit()
+
+            while True:
+                rows = connection.execute(
+                    select(table.c.id, table.c.created_at).where(not_rekeyed)
+                    .order_by(table.c.created_at).limit(batch_size)
+                ).all()
+                if not rows:
+                    break
+
+                if connection.dialect.name == 'postgresql':
+                    # Also defers the reference triggers standing in for foreign keys on partitioned transactions
+                    connection.execute(text('SET CONSTRAINTS ALL DEFERRED'))
+                connection.execute(id_map.delete())
+                connection.execute(id_map.insert(), [
+                    {'old_id': row.id, 'new_id': uuid7_at(row.created_at)} for row in rows
+                ])
+                old_ids = select(id_map.c.old_id)
+
+                for child, column, type_column, entity_type in references:
+                    condition = column.in_(old_ids)
+                    if type_column is not None:
+                        condition = and_(type_column == entity_type, condition)
+                    metrics['references'] += connection.execute(
+                        child.update().where(condition).values({
+                            column.name: select(id_map.c.new_id).where(id_map.c.old_id == column).scalar_subquery()
+                        })
+                    ).rowcount
+                connection.execute(
+                    table.update().where(table.c.id.in_(old_ids)).values(
+                        id=select(id_map.c.new_id).where(id_map.c.old_id == table.c.id).scalar_subquery()
+                    )
+                )
+                connection.commit()
+
+                metrics['rekeyed'] += len(rows)
+                metrics['batches'] += 1
+                metrics['duration_ms'] = int((time.perf_counter() - started) * 1000)
+                if progress:
+                    progress(metrics)
+
+            result = {'success': True, 'data': metrics}
+        except Exception as e:
+            connection.rollback()
+            result = {
+                'success': False,
+                'message': f'Failed to rekey {table_name}: {str(e)}',
+                'error_code': 'SYS_001',
+                'data': metrics
+            }
+        finally:
+            for child, constraint in constraints:
+                connection.execute(text(f'ALTER TABLE {child} ALTER CONSTRAINT {constraint} NOT DEFERRABLE'))
+            id_map.drop(connection, checkfirst=True)
+            connection.commit()
+
+    metrics['duration_ms'] = int((time.perf_counter() - started) * 1000)
+    return result
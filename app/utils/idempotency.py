@@ -0,0 +1,187 @@
+"""
+Idempotency - Idempotency-Key handling for endpoints that create transactions or payments
+"""
+import base64
+import hashlib
+import json
+import threading
+import time
+import zlib
+from functools import wraps
+from flask import Response, jsonify, make_response, request
+from flask_jwt_extended import current_user
+from app.utils.report_cache import create_backend
+
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyStore:
+    """
+    Responses stored by idempotency key, with expiry.
+
+    The first request for a key claims it with an atomic add (SET NX on
+    the shared store) and executes; repeats get the stored response back.
+    Requests arriving while the first is still running wait for it instead
+    of executing again: on the same process through an Event, on other
+    workers by polling the store. Bodies are kept zlib-compressed. A claim
+    expires after in_flight_ttl so a worker dying mid-request does not
+    block the key for the full TTL.
+    """
+
+    POLL_INTERVAL = 0.05  # Seconds between store lookups while another worker runs the request
+
+    def __init__(self):
+        self.backend = None
+        self.ttl = 86400
+        self.in_flight_ttl = 300
+        self.wait_timeout = 30
+        self._in_flight = {}  # key -> (fingerprint, Event) for requests running in this process
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.ttl = app.config.get('IDEMPOTENCY_KEY_TTL', 86400)
+        self.in_flight_ttl = app.config.get('IDEMPOTENCY_IN_FLIGHT_TTL', 300)
+        self.wait_timeout = app.config.get('IDEMPOTENCY_WAIT_TIMEOUT', 30)
+        self.backend = create_backend(
+            app.config.get('REPORT_CACHE_BACKEND', 'memory'),
+            url=app.config.get('REPORT_CACHE_URL'),
+            max_entries=app.config.get('IDEMPOTENCY_MAX_KEYS', 100000),
+            prefix='bariq:idempotency:'
+        )
+        app.extensions['idempotency'] = self
+
+    def begin(self, key, fingerprint):
+        """
+        Claim a key or find its stored response.
+
+        Returns:
+            ('execute', None) - caller owns the key and must call complete() or abort()
+            ('replay', (body, status, mimetype)) - stored response
+            ('mismatch', None) - key was used with a different request
+            ('in_progress', None) - the first request is still running after wait_timeout
+        """
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            # Same-process fast path: wait on the running request's Event
+            with self._lock:
+                running = self._in_flight.get(key)
+                if running is None and self.backend.add(
+                        key, json.dumps({'fingerprint': fingerprint}), self.in_flight_ttl):
+                    self._in_flight[key] = (fingerprint, threading.Event())
+                    return 'execute', None
+
+            if running is not None:
+                running_fingerprint, done = running
+                if running_fingerprint != fingerprint:
+                    return 'mismatch', None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not done.wait(remaining):
+                    return 'in_progress', None
+                continue  # Finished (stored or aborted): look again
+
+            stored = self.backend.get(key)
+            if stored is not None:
+                entry = json.loads(stored)
+                if entry['fingerprint'] != fingerprint:
+                    return 'mismatch', None
+                if 'body' in entry:
+                    body = zlib.decompress(base64.b64decode(entry['body']))
+                    return 'replay', (body, entry['status'], entry['mimetype'])
+
+            # Claimed by another worker (or released since the add): poll until it settles
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return 'in_progress', None
+            time.sleep(min(self.POLL_INTERVAL, remaining))
+
+    def complete(self, key, body, status, mimetype):
+        with self._lock:
+            running = self._in_flight.pop(key, None)
+            if running is None:
+                return
+            self.backend.set(key, json.dumps({
+                'fingerprint': running[0],
+                'body': base64.b64encode(zlib.compress(body)).decode(),
+                'status': status,
+                'mimetype': mimetype,
+            }), self.ttl, [])
+        running[1].set()
+
+    def abort(self, key):
+        """Release a key without storing a response, so a retry executes again"""
+        with self._lock:
+            running = self._in_flight.pop(key, None)
+            if running is None:
+                return
+            self.backend.delete(key)
+        running[1].set()
+
+    def size(self):
+        return self.backend.size() if self.backend else 0
+
+
+idempotency_store = IdempotencyStore()
+
+
+def idempotent(scope):
+    """
+    Honor an Idempotency-Key header on a JWT-protected endpoint.
+
+    Keys are scoped to the endpoint and the authenticated user. Responses
+    below 500 are stored and replayed (with an Idempotent-Replayed header);
+    server errors and exceptions release the key so the client can retry.
+    Requests without the header run as usual.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            idempotency_key = request.headers.get(IDEMPOTENCY_HEADER)
+            if not idempotency_key:
+                return fn(*args, **kwargs)
+
+            if len(idempotency_key) > MAX_KEY_LENGTH:
+                return jsonify({
+                    'success': False,
+                    'message': f'{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters',
+                    'error_code': 'VAL_001'
+                }), 400
+
+            identity = current_user
+            key = f"{scope}:{identity.get('type')}:{identity['id']}:{idempotency_key}"
+            fingerprint = hashlib.sha256(request.get_data()).hexdigest()
+
+            outcome, stored = idempotency_store.begin(key, fingerprint)
+            if outcome == 'replay':
+                body, status, mimetype = stored
+                response = Response(body, status=status, mimetype=mimetype)
+                response.headers[REPLAYED_HEADER] = 'true'
+                return response
+            if outcome == 'mismatch':
+                return jsonify({
+                    'success': False,
+                    'message': f'{IDEMPOTENCY_HEADER} was already used for a different request',
+                    'error_code': 'IDEMP_001'
+                }), 422
+            if outcome == 'in_progress':
+                return jsonify({
+                    'success': False,
+                    'message': 'A request with this idempotency key is still being processed',
+                    'error_code': 'IDEMP_002'
+                }), 409
+
+            try:
+                response = make_response(fn(*args, **kwargs))
+            except Exception:
+                idempotency_store.abort(key)
+                raise
+
+            if response.status_code >= 500 or response.is_streamed:
+                idempotency_store.abort(key)
+            else:
+                idempotency_store.complete(key, response.get_data(), response.status_code, response.mimetype)
+            return response
+        return wrapper
+    return decorator
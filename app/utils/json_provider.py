@@ -0,0 +1,49 @@
+"""
+JSON Provider - orjson-backed JSON encoding for API responses
+"""
+import logging
+from flask.json.provider import DefaultJSONProvider
+
+logger = logging.getLogger(__name__)
+
+# orjson - optional import
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    logger.warning("orjson not installed. JSON responses will use the standard library encoder.")
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider (jsonify, request.get_json) backed by orjson.
+
+    Output matches the default provider: sorted keys, dates as HTTP dates,
+    Decimal and UUID as strings, and pretty-printing in debug mode. The one
+    difference is that non-ASCII text (Arabic names) is written as UTF-8
+    instead of \\u escapes.
+    """
+
+    def _option(self):
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return option
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._option()).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=self._option() | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
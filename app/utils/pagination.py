@@ -0,0 +1,178 @@
+"""
+Pagination - Shared offset and keyset (cursor) pagination for list endpoints
+"""
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from flask import current_app, request
+from sqlalchemy import and_, or_
+from werkzeug.exceptions import BadRequest
+
+
+class InvalidCursorError(BadRequest):
+    """Raised for a cursor that cannot be decoded or belongs to another ordering"""
+
+    description = 'Invalid pagination cursor'
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return ['dt', value.isoformat()]
+    if isinstance(value, date):
+        return ['d', value.isoformat()]
+    if isinstance(value, Decimal):
+        return ['n', str(value)]
+    return ['v', value]
+
+
+def _decode_value(tagged):
+    kind, value = tagged
+    if kind == 'dt':
+        return datetime.fromisoformat(value)
+    if kind == 'd':
+        return date.fromisoformat(value)
+    if kind == 'n':
+        return Decimal(value)
+    if kind == 'v':
+        return value
+    raise ValueError(kind)
+
+
+def encode_cursor(sort_key, sort_value, row_id):
+    """Opaque cursor for the position after (sort_value, row_id)"""
+    payload = json.dumps([sort_key, _encode_value(sort_value), row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, sort_key):
+    """
+    Decode a cursor produced by encode_cursor for this sort key.
+
+    Returns:
+        (sort_value, row_id)
+
+    Raises:
+        InvalidCursorError
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        key, tagged, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if key != sort_key:
+            raise ValueError('cursor belongs to another ordering')
+        return _decode_value(tagged), row_id
+    except (ValueError, TypeError, binascii.Error) as e:
+        raise InvalidCursorError() from e
+
+
+class Page:
+    """One page of results, with the same attributes as Flask-SQLAlchemy's Pagination"""
+
+    def __init__(self, items, page, per_page, total, has_more, next_cursor):
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.total = total
+        self.has_more = has_more
+        self.next_cursor = next_cursor
+
+    @property
+    def pages(self):
+        if self.total is None:
+            return None
+        return (self.total + self.per_page - 1) // self.per_page if self.total else 0
+
+    @property
+    def pagination(self):
+        """meta in the shape the admin endpoints return under data.pagination"""
+        return {
+            'page': self.page,
+            'per_page': self.per_page,
+            'total': self.total,
+            'pages': self.pages,
+            'has_more': self.has_more,
+            'next_cursor': self.next_cursor
+        }
+
+    @property
+    def meta(self):
+        return {
+            'page': self.page,
+            'per_page': self.per_page,
+            'total': self.total,
+            'total_pages': self.pages,
+            'has_more': self.has_more,
+            'next_cursor': self.next_cursor
+        }
+
+
+def pagination_args():
+    """
+    Pagination parameters of the current list request, as keyword arguments
+    for the service: page and per_page for offset pages, cursor for keyset
+    pages, include_total (include_total=false skips the COUNT). per_page is
+    capped at MAX_PAGE_SIZE.
+    """
+    per_page = request.args.get('per_page', current_app.config.get('DEFAULT_PAGE_SIZE', 20), type=int)
+    return {
+        'page': request.args.get('page', 1, type=int),
+        'per_page': min(per_page, current_app.config.get('MAX_PAGE_SIZE', 100)),
+        'cursor': request.args.get('cursor'),
+        'include_total': request.args.get('include_total', 'true').lower() != 'false',
+    }
+
+
+def paginate(query, page=1, per_page=20, cursor=None, include_total=True, order_by=None, descending=True):
+    """
+    Paginate a query by offset (page) or by keyset (cursor).
+
+    order_by is a (sort_column, id_column) pair; the query is ordered by it
+    (id breaking ties) and every page that has more rows after it returns a
+    next_cursor. Passing that cursor back fetches the following rows with a
+    WHERE on (sort_column, id) instead of an OFFSET, so the cost of a page
+    does not grow with its depth. sort_column must be non-nullable.
+
+    include_total=False skips the COUNT(*); total and total_pages are then
+    None and has_more tells whether another page exists.
+
+    Returns:
+        Page
+
+    Raises:
+        InvalidCursorError: the cursor is malformed, or no order_by was given
+    """
+    per_page = max(per_page or 20, 1)
+
+    if order_by is not None:
+        sort_column, id_column = order_by
+        if descending:
+            query = query.order_by(None).order_by(sort_column.desc(), id_column.desc())
+        else:
+            query = query.order_by(None).order_by(sort_column.asc(), id_column.asc())
+
+    total = query.order_by(None).count() if include_total else None
+
+    if cursor:
+        if order_by is None:
+            raise InvalidCursorError()
+        sort_value, last_id = decode_cursor(cursor, sort_column.key)
+        if descending:
+            after = or_(sort_column < sort_value, and_(sort_column == sort_value, id_column < last_id))
+        else:
+            after = or_(sort_column > sort_value, and_(sort_column == sort_value, id_column > last_id))
+        page = None
+        rows = query.filter(after).limit(per_page + 1).all()
+    else:
+        page = max(page or 1, 1)
+        rows = query.offset((page - 1) * per_page).limit(per_page + 1).all()
+
+    has_more = len(rows) > per_page
+    items = rows[:per_page]
+
+    next_cursor = None
+    if has_more and order_by is not None:
+        last = items[-1]
+        next_cursor = encode_cursor(sort_column.key, getattr(last, sort_column.key), getattr(last, id_column.key))
+
+    return Page(items, page, per_page, total, has_more, next_cursor)
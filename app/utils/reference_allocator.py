@@ -0,0 +1,124 @@
+"""
+Reference Allocator - Unique reference numbers handed out from blocks reserved in the database
+"""
+import os
+import threading
+from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.extensions import db
+from app.models.reference_counter import ReferenceCounter
+
+
+SESSION_BLOCKS_KEY = 'reference_blocks'
+
+
+class ReferenceAllocator:
+    """
+    Sequential numbers per series (BRQ-2026, PAY-2026, BARIQ_ID, ...).
+
+    Each process reserves a block of block_size numbers at a time by
+    advancing the series' row in reference_counters in its own short
+    transaction, then hands them out from memory. Numbers are never given
+    out twice; numbers left in a block when a process exits are skipped.
+
+    SQLite allows a single writer, so a second connection would wait
+    forever on a session that already wrote. There the block is reserved
+    on the session's own connection instead and stays private to the
+    session: it is shared once the session commits (the reservation
+    commits with it) and dropped if it rolls back.
+    """
+
+    def __init__(self):
+        self.block_size = 100
+        self._blocks = {}  # series -> [next, end)
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.block_size = app.config.get('REFERENCE_BLOCK_SIZE', 100)
+        app.extensions['reference_allocator'] = self
+
+    def allocate(self, series, start):
+        """
+        Next number in a series; a new series starts at `start`.
+
+        Returns:
+            int
+        """
+        session = db.session()
+        if db.engine.dialect.name == 'sqlite' and session.in_transaction():
+            blocks = session.info.setdefault(SESSION_BLOCKS_KEY, {})
+            block = blocks.get(series)
+            if block is None or block[0] >= block[1]:
+                block = blocks[series] = list(self._reserve_block(series, start, session.connection()))
+            value = block[0]
+            block[0] += 1
+            return value
+
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked worker: blocks reserved by the parent belong to the parent
+                self._blocks = {}
+                self._pid = os.getpid()
+
+            block = self._blocks.get(series)
+            if block is None or block[0] >= block[1]:
+                block = self._blocks[series] = list(self._reserve_block(series, start))
+
+            value = block[0]
+            block[0] += 1
+            return value
+
+    def adopt(self, blocks):
+        """Share blocks reserved by a session that has committed them"""
+        with self._lock:
+            if self._pid != os.getpid():
+                return
+            for series, block in blocks.items():
+                current = self._blocks.get(series)
+                if block[0] < block[1] and (current is None or current[0] >= current[1]):
+                    self._blocks[series] = block
+
+    def _reserve_block(self, series, start, connection=None):
+        if connection is not None:
+            return self._advance(connection, series, start)
+        for _ in range(3):
+            try:
+                # Separate connection: the block is committed whatever happens to the caller's transaction
+                with db.engine.begin() as own_connection:
+                    return self._advance(own_connection, series, start)
+            except IntegrityError:
+                continue  # Another worker created the series first
+        raise RuntimeError(f'Could not reserve reference numbers for {series}')
+
+    def _advance(self, connection, series, start):
+        table = ReferenceCounter.__table__
+        end = connection.execute(
+            table.update()
+            .where(table.c.name == series)
+            .values(next_value=table.c.next_value + self.block_size, updated_at=datetime.utcnow())
+            .returning(table.c.next_value)
+        ).scalar()
+        if end is None:
+            end = start + self.block_size
+            connection.execute(
+                table.insert().values(name=series, next_value=end, updated_at=datetime.utcnow())
+            )
+        return end - self.block_size, end
+
+
+reference_allocator = ReferenceAllocator()
+
+
+@event.listens_for(Session, 'after_commit')
+def _adopt_session_blocks(session):
+    blocks = session.info.pop(SESSION_BLOCKS_KEY, None)
+    if blocks:
+        reference_allocator.adopt(blocks)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_session_blocks(session):
+    session.info.pop(SESSION_BLOCKS_KEY, None)
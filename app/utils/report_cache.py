@@ -0,0 +1,440 @@
+"""
+Report Cache - TTL/LRU cache for report results with commit-driven invalidation
+"""
+import fnmatch
+import json
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+PENDING_SCOPES_KEY = 'report_cache_scopes'
+
+# Generation bumped by clear(), next to the per-tag ones bumped by invalidate_tags()
+CLEAR_GENERATION = '*'
+
+
+# ==================== Backends ====================
+
+class InProcessBackend:
+    """Single-node backend: an LRU-ordered dict with per-entry expiry"""
+
+    name = 'memory'
+
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value, tags)
+        self._tags = {}  # tag -> set of keys
+        self._generations = {}  # tag -> number of invalidations
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl, tags):
+        """Store a value; returns the number of entries evicted to make room"""
+        evicted = 0
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, value, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                evicted += 1
+        return evicted
+
+    def add(self, key, value, ttl):
+        """Store an untagged value only if the key is absent; returns whether it was stored"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    return False
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, value, [])
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+        return True
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def generations(self, tags):
+        """Invalidation counters of these tags (0 for a tag never invalidated)"""
+        with self._lock:
+            return [self._generations.get(tag, 0) for tag in tags]
+
+    def invalidate_tags(self, tags):
+        removed = 0
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+                for key in self._tags.pop(tag, set()):
+                    if key in self._entries:
+                        self._remove(key)
+                        removed += 1
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._generations[CLEAR_GENERATION] = self._generations.get(CLEAR_GENERATION, 0) + 1
+
+    def size(self):
+        return len(self._entries)
+
+    def _remove(self, key):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+class LocalSharedStore:
+    """
+    In-memory stand-in for a shared key-value store.
+
+    Implements the subset of the redis-py client API used by
+    SharedStoreBackend (get, set with ex/nx, delete, incr, sadd, smembers,
+    expire, scan_iter) with LRU eviction, so the shared backend can run on a
+    single node or in development without a Redis server.
+    """
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._data = OrderedDict()  # key -> (expires_at or None, value)
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        with self._lock:
+            value = self._live(name)
+            return value if isinstance(value, str) else None
+
+    def set(self, name, value, ex=None, nx=False):
+        with self._lock:
+            if nx and self._live(name) is not None:
+                return None
+            self._data.pop(name, None)
+            self._data[name] = (time.monotonic() + ex if ex else None, value)
+            while len(self._data) > self.max_keys:
+                self._data.popitem(last=False)
+        return True
+
+    def delete(self, *names):
+        with self._lock:
+            return sum(1 for name in names if self._data.pop(name, None) is not None)
+
+    def incr(self, name):
+        with self._lock:
+            value = int(self._live(name) or 0) + 1
+            expires_at = self._data[name][0] if name in self._data else None
+            self._data[name] = (expires_at, str(value))
+            while len(self._data) > self.max_keys:
+                self._data.popitem(last=False)
+            return value
+
+    def sadd(self, name, *values):
+        with self._lock:
+            members = self._live(name)
+            if not isinstance(members, set):
+                members = set()
+            before = len(members)
+            members.update(values)
+            expires_at = self._data[name][0] if name in self._data else None
+            self._data[name] = (expires_at, members)
+            return len(members) - before
+
+    def smembers(self, name):
+        with self._lock:
+            members = self._live(name)
+            return set(members) if isinstance(members, set) else set()
+
+    def expire(self, name, seconds):
+        with self._lock:
+            if name not in self._data:
+                return False
+            self._data[name] = (time.monotonic() + seconds, self._data[name][1])
+            return True
+
+    def scan_iter(self, match=None):
+        with self._lock:
+            names = [name for name in self._data if match is None or fnmatch.fnmatchcase(name, match)]
+        return iter(names)
+
+    def _live(self, name):
+        entry = self._data.get(name)
+        if entry is None:
+            return None
+        if entry[0] is not None and entry[0] <= time.monotonic():
+            del self._data[name]
+            return None
+        self._data.move_to_end(name)
+        return entry[1]
+
+
+class SharedStoreBackend:
+    """
+    Multi-node backend on a shared key-value store (Redis or LocalSharedStore).
+
+    Entries, tag sets and generation counters live in the store, so an
+    invalidation on one node is seen by all of them. LRU eviction is left to
+    the store (maxmemory-policy allkeys-lru on Redis); generation counters
+    have no TTL and there is one per merchant and branch.
+    """
+
+    name = 'shared'
+
+    def __init__(self, client, prefix='bariq:report-cache:'):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        if value is None:
+            return None
+        return value.decode() if isinstance(value, bytes) else value
+
+    def set(self, key, value, ttl, tags):
+        self.client.set(self.prefix + key, value, ex=ttl)
+        for tag in tags:
+            tag_key = self.prefix + 'tag:' + tag
+            self.client.sadd(tag_key, key)
+            self.client.expire(tag_key, ttl)
+        return 0
+
+    def add(self, key, value, ttl):
+        # SET NX: atomic across every node sharing the store
+        return bool(self.client.set(self.prefix + key, value, ex=ttl, nx=True))
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def generations(self, tags):
+        """Invalidation counters of these tags (0 for a tag never invalidated)"""
+        return [int(self.client.get(self.prefix + 'gen:' + tag) or 0) for tag in tags]
+
+    def invalidate_tags(self, tags):
+        removed = 0
+        for tag in tags:
+            # Bumped before the delete, so a compute that checks after it never stores stale data
+            self.client.incr(self.prefix + 'gen:' + tag)
+            tag_key = self.prefix + 'tag:' + tag
+            keys = [k.decode() if isinstance(k, bytes) else k for k in self.client.smembers(tag_key)]
+            if keys:
+                removed += self.client.delete(*[self.prefix + k for k in keys])
+            self.client.delete(tag_key)
+        return removed
+
+    def clear(self):
+        # Only this cache's keys: the store may be shared with rate limits and other caches.
+        # Generation counters are kept, so a compute that started before the clear still sees them move.
+        keys = [key for key in self.client.scan_iter(match=self.prefix + '*')
+                if not self._is_internal(key, 'gen:')]
+        for start in range(0, len(keys), 500):
+            self.client.delete(*keys[start:start + 500])
+        self.client.incr(self.prefix + 'gen:' + CLEAR_GENERATION)
+
+    def size(self):
+        return sum(1 for key in self.client.scan_iter(match=self.prefix + '*')
+                   if not self._is_internal(key, 'tag:', 'gen:'))
+
+    def _is_internal(self, key, *kinds):
+        key = key.decode() if isinstance(key, bytes) else key
+        return key.startswith(tuple(self.prefix + kind for kind in kinds))
+
+
+def create_backend(kind='memory', url=None, max_entries=1000, prefix='bariq:report-cache:'):
+    """Backend for a cache: in-process, or shared (Redis at url, else LocalSharedStore)"""
+    if kind == 'shared':
+        if url:
+            import redis
+            client = redis.Redis.from_url(url)
+        else:
+            client = LocalSharedStore(max_keys=max_entries * 2)
+        return SharedStoreBackend(client, prefix=prefix)
+    return InProcessBackend(max_entries=max_entries)
+
+
+# ==================== Cache ====================
+
+class ReportCache:
+    """
+    Cache for report results keyed by (report type, merchant, branch set,
+    date range, group_by).
+
+    Entries are tagged with the scope they cover. Code that changes a
+    transaction calls mark_dirty() before committing; once the session
+    commits, every entry whose scope includes that merchant/branch (and all
+    platform-wide admin entries) is dropped. Rolled-back changes are ignored.
+    A result computed while an invalidation of its scope went through, on
+    this node or any other sharing the backend, is returned but not stored:
+    the backend keeps a generation counter per tag, read before the compute
+    and checked again around the write. Backend I/O is never done under the
+    cache's lock.
+    """
+
+    def __init__(self):
+        self.backend = None
+        self.enabled = False
+        self.ttl = 300
+        self._metrics = {'hits': {}, 'misses': {}, 'evictions': 0, 'invalidations': 0}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.enabled = app.config.get('REPORT_CACHE_ENABLED', True)
+        self.ttl = app.config.get('REPORT_CACHE_TTL', 300)
+        self.backend = create_backend(
+            app.config.get('REPORT_CACHE_BACKEND', 'memory'),
+            url=app.config.get('REPORT_CACHE_URL'),
+            max_entries=app.config.get('REPORT_CACHE_MAX_ENTRIES', 1000)
+        )
+
+        app.extensions['report_cache'] = self
+
+    # ==================== Lookups ====================
+
+    @staticmethod
+    def make_key(report_type, merchant_id=None, branch_ids=None, from_date=None, to_date=None, group_by=None):
+        return json.dumps([
+            report_type,
+            merchant_id,
+            sorted(branch_ids) if branch_ids is not None else None,
+            str(from_date) if from_date else None,
+            str(to_date) if to_date else None,
+            group_by
+        ], separators=(',', ':'))
+
+    @staticmethod
+    def scope_tags(merchant_id=None, branch_ids=None):
+        """Tags an entry is stored under; see invalidate() for the matching side"""
+        if merchant_id is None:
+            return ['admin']
+        if branch_ids is None:
+            return [f'merchant:{merchant_id}']
+        return [f'branch:{branch_id}' for branch_id in branch_ids]
+
+    def get_or_compute(self, report_type, compute, merchant_id=None, branch_ids=None,
+                       from_date=None, to_date=None, group_by=None, ttl=None, invalidate_on_commit=True):
+        """
+        Return the cached result for this key, or call compute() and cache it.
+
+        Only successful results ({'success': True, ...}) are stored. With
+        invalidate_on_commit=False the entry is untagged and lives for its
+        TTL only (for short-lived snapshots like the admin dashboard).
+        """
+        if not self.enabled or self.backend is None:
+            return compute()
+
+        key = self.make_key(report_type, merchant_id, branch_ids, from_date, to_date, group_by)
+        cached = self.backend.get(key)
+        if cached is not None:
+            self._count('hits', report_type)
+            return json.loads(cached)
+
+        self._count('misses', report_type)
+        tags = self.scope_tags(merchant_id, branch_ids) if invalidate_on_commit else []
+        watched = tags + [CLEAR_GENERATION]
+        generations = self.backend.generations(watched)
+
+        result = compute()
+
+        # The compute may have read rows an invalidation has since replaced
+        if not result.get('success') or self.backend.generations(watched) != generations:
+            return result
+        evicted = self.backend.set(key, json.dumps(result), ttl or self.ttl, tags)
+        if self.backend.generations(watched) != generations:
+            # Invalidated between the check and the write, possibly before the entry was tagged
+            self.backend.delete(key)
+        with self._lock:
+            self._metrics['evictions'] += evicted
+        return result
+
+    # ==================== Invalidation ====================
+
+    def mark_dirty(self, session, merchant_id, branch_id=None):
+        """Queue an invalidation for this scope, applied when the session commits"""
+        session.info.setdefault(PENDING_SCOPES_KEY, set()).add((merchant_id, branch_id))
+
+    def invalidate(self, merchant_id=None, branch_id=None):
+        """Drop cached entries covering this merchant/branch and all admin entries"""
+        if self.backend is None:
+            return 0
+        tags = ['admin']
+        if merchant_id:
+            tags.append(f'merchant:{merchant_id}')
+        if branch_id:
+            tags.append(f'branch:{branch_id}')
+        # Bumps the tags' generations: computations still running for these scopes are not stored
+        removed = self.backend.invalidate_tags(tags)
+        with self._lock:
+            self._metrics['invalidations'] += removed
+        return removed
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+
+    # ==================== Metrics ====================
+
+    def _count(self, kind, report_type):
+        with self._lock:
+            self._metrics[kind][report_type] = self._metrics[kind].get(report_type, 0) + 1
+
+    def stats(self):
+        with self._lock:
+            hits = dict(self._metrics['hits'])
+            misses = dict(self._metrics['misses'])
+            evictions = self._metrics['evictions']
+            invalidations = self._metrics['invalidations']
+
+        total_hits = sum(hits.values())
+        total_lookups = total_hits + sum(misses.values())
+        return {
+            'enabled': self.enabled,
+            'backend': self.backend.name if self.backend else None,
+            'ttl': self.ttl,
+            'size': self.backend.size() if self.backend else 0,
+            'hits': total_hits,
+            'misses': total_lookups - total_hits,
+            'hit_rate': (total_hits / total_lookups * 100) if total_lookups else 0,
+            'evictions': evictions,
+            'invalidations': invalidations,
+            'by_report': {
+                report_type: {'hits': hits.get(report_type, 0), 'misses': misses.get(report_type, 0)}
+                for report_type in sorted(set(hits) | set(misses))
+            }
+        }
+
+
+report_cache = ReportCache()
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed_scopes(session):
+    scopes = session.info.pop(PENDING_SCOPES_KEY, None)
+    if scopes:
+        for merchant_id, branch_id in scopes:
+            report_cache.invalidate(merchant_id, branch_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_pending_scopes(session):
+    session.info.pop(PENDING_SCOPES_KEY, None)
@@ -0,0 +1,42 @@
+"""Add daily_sales_rollup table for dashboard aggregates
+
+Revision ID: 006_add_sales_rollup
+Revises: 005_add_payment_lock
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '006_add_sales_rollup'
+down_revision = '005_add_payment_lock'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Pre-aggregated transaction totals per (day, merchant, branch, cashier, status)
+    # Backfill after upgrading with: flask rebuild-sales-rollup
+    op.create_table('daily_sales_rollup',
+        sa.Column('id', sa.String(36), primary_key=True),
+        sa.Column('rollup_date', sa.Date(), nullable=False),
+        sa.Column('merchant_id', sa.String(36), sa.ForeignKey('merchants.id'), nullable=False),
+        sa.Column('branch_id', sa.String(36), sa.ForeignKey('branches.id'), nullable=False),
+        sa.Column('cashier_id', sa.String(36), nullable=False, server_default=''),
+        sa.Column('status', sa.String(20), nullable=False),
+        sa.Column('transaction_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('total_amount', sa.Numeric(14, 2), nullable=False, server_default='0'),
+        sa.Column('paid_amount', sa.Numeric(14, 2), nullable=False, server_default='0'),
+        sa.Column('returned_amount', sa.Numeric(14, 2), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.UniqueConstraint('rollup_date', 'merchant_id', 'branch_id', 'cashier_id', 'status',
+                            name='uq_daily_sales_rollup_key')
+    )
+    op.create_index('ix_daily_sales_rollup_merchant_date', 'daily_sales_rollup', ['merchant_id', 'rollup_date'])
+
+
+def downgrade():
+    op.drop_index('ix_daily_sales_rollup_merchant_date', table_name='daily_sales_rollup')
+    op.drop_table('daily_sales_rollup')
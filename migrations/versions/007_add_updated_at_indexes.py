@@ -0,0 +1,28 @@
+"""Index updated_at on transactions, payments and customers
+
+Revision ID: 007_add_updated_at_indexes
+Revises: 006_add_sales_rollup
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '007_add_updated_at_indexes'
+down_revision = '006_add_sales_rollup'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The analytics snapshot refresh reads only rows changed since its last run
+    op.create_index('ix_transactions_updated_at', 'transactions', ['updated_at'])
+    op.create_index('ix_payments_updated_at', 'payments', ['updated_at'])
+    op.create_index('ix_customers_updated_at', 'customers', ['updated_at'])
+
+
+def downgrade():
+    op.drop_index('ix_customers_updated_at', table_name='customers')
+    op.drop_index('ix_payments_updated_at', table_name='payments')
+    op.drop_index('ix_transactions_updated_at', table_name='transactions')
@@ -0,0 +1,36 @@
+"""Add customers.search_text with a trigram index
+
+Revision ID: 008_add_customer_search
+Revises: 007_add_updated_at_indexes
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '008_add_customer_search'
+down_revision = '007_add_updated_at_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('customers', sa.Column('search_text', sa.Text(), nullable=True))
+
+    # Substring search on PostgreSQL is served by pg_trgm; other databases
+    # use the in-process index in app.utils.customer_search.
+    # Backfill existing rows afterwards with: flask rebuild-customer-search
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.execute(
+            'CREATE INDEX ix_customers_search_text_trgm ON customers '
+            'USING gin (search_text gin_trgm_ops)'
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_customers_search_text_trgm', table_name='customers')
+    op.drop_column('customers', 'search_text')
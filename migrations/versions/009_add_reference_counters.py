@@ -0,0 +1,33 @@
+"""Add reference_counters for block-allocated reference numbers
+
+Revision ID: 009_add_reference_counters
+Revises: 008_add_customer_search
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '009_add_reference_counters'
+down_revision = '008_add_customer_search'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Series rows are created on first use. New numbers start one digit
+    # longer than the random ones issued before (BRQ-2026-100000, Bariq ID
+    # 1000000), so they cannot collide with existing rows.
+    op.create_table(
+        'reference_counters',
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('next_value', sa.BigInteger(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('reference_counters')
@@ -0,0 +1,37 @@
+"""Add partial indexes on pending transactions
+
+Revision ID: 010_add_pending_transaction_indexes
+Revises: 009_add_reference_counters
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '010_add_pending_transaction_indexes'
+down_revision = '009_add_reference_counters'
+branch_labels = None
+depends_on = None
+
+
+PENDING = sa.text("status = 'pending'")
+
+
+def upgrade():
+    # Only pending rows are indexed, so both stay small: the expiry sweep
+    # reads pending rows by age, pending counts read them by customer.
+    op.create_index(
+        'ix_transactions_pending_created_at', 'transactions', ['created_at'],
+        postgresql_where=PENDING, sqlite_where=PENDING
+    )
+    op.create_index(
+        'ix_transactions_pending_customer', 'transactions', ['customer_id'],
+        postgresql_where=PENDING, sqlite_where=PENDING
+    )
+
+
+def downgrade():
+    op.drop_index('ix_transactions_pending_customer', table_name='transactions')
+    op.drop_index('ix_transactions_pending_created_at', table_name='transactions')
@@ -0,0 +1,225 @@
+"""Partition transactions by transaction_date month (PostgreSQL)
+
+Revision ID: 011_partition_transactions
+Revises: 010_add_pending_transaction_indexes
+Create Date: 2026-10-18
+
+"""
+from datetime import date
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '011_partition_transactions'
+down_revision = '010_add_pending_transaction_indexes'
+branch_labels = None
+depends_on = None
+
+
+MONTHS_AHEAD = 3
+
+# Unique keys of a partitioned table must contain the partition key, so
+# reference_number is unique together with transaction_date (reference
+# numbers come from app.utils.reference_allocator and never repeat).
+INDEXES = [
+    ('ix_transactions_branch_id', ['branch_id'], False, None),
+    ('ix_transactions_customer_id', ['customer_id'], False, None),
+    ('ix_transactions_due_date', ['due_date'], False, None),
+    ('ix_transactions_merchant_id', ['merchant_id'], False, None),
+    ('ix_transactions_reference_number', ['reference_number', 'transaction_date'], True, None),
+    ('ix_transactions_status', ['status'], False, None),
+    ('ix_transactions_transaction_date', ['transaction_date'], False, None),
+    ('ix_transactions_updated_at', ['updated_at'], False, None),
+    ('ix_transactions_pending_created_at', ['created_at'], False, "status = 'pending'"),
+    ('ix_transactions_pending_customer', ['customer_id'], False, "status = 'pending'"),
+]
+
+OUTBOUND_FOREIGN_KEYS = [
+    ('branch_id', 'branches'),
+    ('cashier_id', 'merchant_users'),
+    ('customer_id', 'customers'),
+    ('merchant_id', 'merchants'),
+    ('settlement_id', 'settlements'),
+]
+
+# (table, column) pairs pointing at transactions.id. A foreign key needs a
+# unique id on the referenced table, which a partitioned table cannot have
+# on id alone, so these are dropped on upgrade and restored on downgrade.
+# Triggers take their place on the partitioned table (see _create_reference_triggers).
+INBOUND_FOREIGN_KEYS = [
+    ('payments', 'transaction_id'),
+    ('transaction_returns', 'transaction_id'),
+    ('customer_ratings', 'transaction_id'),
+    ('support_tickets', 'related_transaction_id'),
+]
+
+
+def _add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _create_indexes():
+    for name, columns, unique, where in INDEXES:
+        op.create_index(
+            name, 'transactions', columns, unique=unique,
+            postgresql_where=sa.text(where) if where else None
+        )
+
+
+def _create_outbound_foreign_keys():
+    for column, referenced in OUTBOUND_FOREIGN_KEYS:
+        op.create_foreign_key(f'fk_transactions_{column}', 'transactions', referenced, [column], ['id'])
+
+
+def _drop_foreign_keys_to(table):
+    bind = op.get_bind()
+    constraints = bind.execute(sa.text(
+        "SELECT conrelid::regclass::text, conname FROM pg_constraint "
+        "WHERE contype = 'f' AND confrelid = CAST(:table AS regclass)"
+    ), {'table': table}).all()
+    for referencing_table, name in constraints:
+        op.execute(f'ALTER TABLE {referencing_table} DROP CONSTRAINT {name}')
+
+
+def _create_reference_triggers():
+    """
+    Enforce the dropped inbound foreign keys with triggers.
+
+    Referencing side: a constraint trigger per table checks that the new
+    transaction id exists and takes FOR KEY SHARE on it, like a foreign key,
+    so a concurrent delete waits. The triggers are deferrable (initially
+    immediate), so rekey_table can defer them with SET CONSTRAINTS.
+
+    Referenced side: deleting a transaction, or changing its id, fails while
+    a row still points at it (NO ACTION). A row moved to another partition
+    by a transaction_date change fires a delete too; its id is still
+    present, so it passes.
+    """
+    op.execute("""
+        CREATE FUNCTION transactions_reference_exists() RETURNS trigger AS $$
+        DECLARE
+            referenced text := to_jsonb(NEW) ->> TG_ARGV[0];
+        BEGIN
+            IF referenced IS NULL THEN
+                RETURN NULL;
+            END IF;
+            PERFORM 1 FROM transactions WHERE id = referenced FOR KEY SHARE;
+            IF NOT FOUND THEN
+                RAISE foreign_key_violation USING MESSAGE = format(
+                    'insert or update on table "%s" violates reference to transactions: id %s does not exist',
+                    TG_TABLE_NAME, referenced
+                );
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    for table, column in INBOUND_FOREIGN_KEYS:
+        op.execute(
+            f'CREATE CONSTRAINT TRIGGER {table}_{column}_exists '
+            f'AFTER INSERT OR UPDATE OF {column} ON {table} '
+            f'DEFERRABLE INITIALLY IMMEDIATE FOR EACH ROW '
+            f"EXECUTE FUNCTION transactions_reference_exists('{column}')"
+        )
+
+    referenced = ' OR '.join(
+        f'EXISTS (SELECT 1 FROM {table} WHERE {column} = OLD.id)' for table, column in INBOUND_FOREIGN_KEYS
+    )
+    op.execute(f"""
+        CREATE FUNCTION transactions_not_referenced() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'UPDATE' AND NEW.id = OLD.id THEN
+                RETURN NULL;
+            END IF;
+            IF EXISTS (SELECT 1 FROM transactions WHERE id = OLD.id) THEN
+                RETURN NULL;
+            END IF;
+            IF {referenced} THEN
+                RAISE foreign_key_violation USING MESSAGE = format(
+                    'transaction %s is still referenced', OLD.id
+                );
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute(
+        'CREATE TRIGGER transactions_not_referenced AFTER DELETE OR UPDATE OF id ON transactions '
+        'FOR EACH ROW EXECUTE FUNCTION transactions_not_referenced()'
+    )
+
+
+def _drop_reference_triggers():
+    op.execute('DROP TRIGGER IF EXISTS transactions_not_referenced ON transactions')
+    op.execute('DROP FUNCTION IF EXISTS transactions_not_referenced()')
+    for table, column in INBOUND_FOREIGN_KEYS:
+        op.execute(f'DROP TRIGGER IF EXISTS {table}_{column}_exists ON {table}')
+    op.execute('DROP FUNCTION IF EXISTS transactions_reference_exists()')
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        # Partitioning is PostgreSQL only; other databases keep the plain table
+        return
+
+    op.execute('ALTER TABLE transactions RENAME TO transactions_unpartitioned')
+    op.execute(
+        'CREATE TABLE transactions (LIKE transactions_unpartitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+        'PARTITION BY RANGE (transaction_date)'
+    )
+    op.execute('ALTER TABLE transactions ADD CONSTRAINT transactions_pkey_partitioned PRIMARY KEY (id, transaction_date)')
+
+    # One partition per month from the oldest row to MONTHS_AHEAD months from
+    # now; the default partition catches anything outside them. Later months
+    # are added by PartitionService.ensure_partitions.
+    oldest = bind.execute(sa.text('SELECT min(transaction_date) FROM transactions_unpartitioned')).scalar()
+    this_month = date.today().replace(day=1)
+    month = min(oldest.date().replace(day=1), this_month) if oldest else this_month
+    last = _add_months(this_month, MONTHS_AHEAD)
+    while month <= last:
+        op.execute(
+            f"CREATE TABLE transactions_p{month:%Y%m} PARTITION OF transactions "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+        )
+        month = _add_months(month, 1)
+    op.execute('CREATE TABLE transactions_default PARTITION OF transactions DEFAULT')
+
+    # Load first, index after
+    op.execute('INSERT INTO transactions SELECT * FROM transactions_unpartitioned')
+    _drop_foreign_keys_to('transactions_unpartitioned')
+    op.execute('DROP TABLE transactions_unpartitioned')
+    op.execute('ALTER TABLE transactions RENAME CONSTRAINT transactions_pkey_partitioned TO transactions_pkey')
+
+    _create_indexes()
+    _create_outbound_foreign_keys()
+    _create_reference_triggers()
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    # Partitions already archived out of transactions are not brought back
+    _drop_reference_triggers()
+    op.execute('ALTER TABLE transactions RENAME TO transactions_partitioned')
+    op.execute(
+        'CREATE TABLE transactions (LIKE transactions_partitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'
+    )
+    op.execute('INSERT INTO transactions SELECT * FROM transactions_partitioned')
+    op.execute('DROP TABLE transactions_partitioned')
+    op.execute('ALTER TABLE transactions ADD CONSTRAINT transactions_pkey PRIMARY KEY (id)')
+
+    for name, columns, unique, where in INDEXES:
+        if name == 'ix_transactions_reference_number':
+            columns = ['reference_number']
+        op.create_index(
+            name, 'transactions', columns, unique=unique,
+            postgresql_where=sa.text(where) if where else None
+        )
+    _create_outbound_foreign_keys()
+    for table, column in INBOUND_FOREIGN_KEYS:
+        op.create_foreign_key(f'fk_{table}_{column}', table, 'transactions', [column], ['id'])
@@ -0,0 +1,56 @@
+"""Composite and partial indexes for the hot transaction, payment and notification queries
+
+Revision ID: 012_add_composite_indexes
+Revises: 011_partition_transactions
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '012_add_composite_indexes'
+down_revision = '011_partition_transactions'
+branch_labels = None
+depends_on = None
+
+
+UNSETTLED = sa.text('settlement_id IS NULL')
+
+# name, table, columns, where
+INDEXES = [
+    ('ix_transactions_merchant_created_at', 'transactions', ['merchant_id', 'created_at'], None),
+    ('ix_transactions_merchant_transaction_date', 'transactions', ['merchant_id', 'transaction_date'], None),
+    ('ix_transactions_cashier_created_at', 'transactions', ['cashier_id', 'created_at'], None),
+    ('ix_transactions_customer_status_due_date', 'transactions', ['customer_id', 'status', 'due_date'], None),
+    ('ix_transactions_status_due_date', 'transactions', ['status', 'due_date'], None),
+    ('ix_transactions_unsettled', 'transactions', ['merchant_id', 'branch_id', 'status', 'transaction_date'], UNSETTLED),
+    ('ix_transactions_settlement_id', 'transactions', ['settlement_id'], None),
+    ('ix_notifications_customer_unread', 'notifications', ['customer_id', 'is_read', 'created_at'], None),
+    ('ix_notifications_merchant_user_unread', 'notifications', ['merchant_user_id', 'is_read', 'created_at'], None),
+    ('ix_payments_customer_created_at', 'payments', ['customer_id', 'created_at'], None),
+]
+
+# Single-column indexes that are now the leading column of a composite one
+REPLACED = [
+    ('ix_transactions_merchant_id', 'transactions', ['merchant_id']),
+    ('ix_transactions_customer_id', 'transactions', ['customer_id']),
+    ('ix_transactions_status', 'transactions', ['status']),
+    ('ix_notifications_customer_id', 'notifications', ['customer_id']),
+    ('ix_payments_customer_id', 'payments', ['customer_id']),
+]
+
+
+def upgrade():
+    for name, table, columns, where in INDEXES:
+        op.create_index(name, table, columns, postgresql_where=where, sqlite_where=where)
+    for name, table, columns in REPLACED:
+        op.drop_index(name, table_name=table)
+
+
+def downgrade():
+    for name, table, columns in REPLACED:
+        op.create_index(name, table, columns)
+    for name, table, columns, where in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,730 @@
+#!/usr/bin/env python3
+"""
+Performance Benchmarks - Compare optimized service paths against the previous implementations
+Run: python3 scripts/benchmark.py transaction-report --transactions 200000 --days 90
+
+Benchmarks seed synthetic rows into their database: in-memory SQLite unless
+--database-url (or BENCHMARK_DATABASE_URL) names a scratch database. The
+application's DATABASE_URL is never used.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.config import TestingConfig, config
+from app.extensions import db
+from app.models import Customer, Merchant, Branch, MerchantUser, Transaction, Payment
+from app.services.sales_rollup_service import SalesRollupService
+from app.utils.report_cache import report_cache
+
+
+class BenchmarkConfig(TestingConfig):
+    """Testing settings on the benchmark database (set by main)"""
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+
+
+STATUSES = ['pending', 'confirmed', 'paid', 'overdue', 'cancelled']
+PAYMENT_METHODS = ['card', 'bank_transfer', 'wallet']
+
+
+# ==================== Helpers ====================
+
+def timed(fn, repeat):
+    """Run fn `repeat` times and return (min, median) wall time in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return min(samples), statistics.median(samples)
+
+
+def report(label, timings):
+    best, median = timings
+    print(f"  {label:<28} min {best:10.2f} ms   median {median:10.2f} ms")
+
+
+def seed_benchmark_data(transactions=100000, days=90, customers=500, branches=5, chunk_size=5000):
+    """
+    Insert a synthetic merchant with branches, an owner, customers and transactions.
+
+    Rows are written with bulk inserts so seeding a few hundred thousand
+    transactions takes seconds, not minutes. Paid transactions also get a
+    completed payment row.
+
+    Returns:
+        dict with merchant_id, owner_id, branch_ids and customer_ids
+    """
+    now = datetime.utcnow()
+    merchant = Merchant(
+        name_ar='متجر الاختبار',
+        name_en='Benchmark Store',
+        commercial_registration=f'CR{uuid.uuid4().hex[:10]}',
+        email=f'bench-{uuid.uuid4().hex[:8]}@bariq.sa',
+        phone='0500000000',
+        status='active'
+    )
+    db.session.add(merchant)
+    db.session.flush()
+
+    branch_rows = [
+        Branch(merchant_id=merchant.id, name_ar=f'فرع {i}', city='Riyadh', code=f'B{i:03d}')
+        for i in range(branches)
+    ]
+    db.session.add_all(branch_rows)
+
+    owner = MerchantUser(
+        merchant_id=merchant.id,
+        email=f'owner-{uuid.uuid4().hex[:8]}@bariq.sa',
+        password_hash='-',
+        full_name='Benchmark Owner',
+        role='owner'
+    )
+    db.session.add(owner)
+    db.session.flush()
+
+    customer_ids = []
+    customer_rows = []
+    for i in range(customers):
+        customer_id = str(uuid.uuid4())
+        customer_ids.append(customer_id)
+        customer_rows.append({
+            'id': customer_id,
+            'national_id': f'9{i:09d}',
+            'full_name_ar': f'عميل {i}',
+            'phone': f'05{i:08d}',
+            'status': 'active',
+            'credit_limit': 5000,
+            'available_credit': 5000,
+            'used_credit': 0,
+            'language': 'ar',
+            'notifications_enabled': True,
+            'created_at': now,
+            'updated_at': now,
+        })
+    db.session.execute(db.insert(Customer), customer_rows)
+
+    branch_ids = [b.id for b in branch_rows]
+    rows = []
+    payment_rows = []
+    for i in range(transactions):
+        created_at = now - timedelta(seconds=random.randint(0, days * 86400))
+        total = round(random.uniform(10, 2000), 2)
+        status = random.choice(STATUSES)
+        rows.append({
+            'id': str(uuid.uuid4()),
+            'reference_number': f'BEN-{i:012d}',
+            'customer_id': random.choice(customer_ids),
+            'merchant_id': merchant.id,
+            'branch_id': random.choice(branch_ids),
+            'cashier_id': owner.id,
+            'subtotal': total,
+            'discount': 0,
+            'total_amount': total,
+            'items': [],
+            'transaction_date': created_at,
+            'due_date': (created_at + timedelta(days=10)).date(),
+            'status': status,
+            'paid_amount': total if status == 'paid' else 0,
+            'returned_amount': 0,
+            'created_at': created_at,
+            'updated_at': created_at,
+        })
+        if status == 'paid':
+            paid_at = created_at + timedelta(hours=random.randint(1, 240))
+            payment_rows.append({
+                'id': str(uuid.uuid4()),
+                'reference_number': f'BPY-{i:012d}',
+                'transaction_id': rows[-1]['id'],
+                'customer_id': rows[-1]['customer_id'],
+                'amount': total,
+                'payment_method': random.choice(PAYMENT_METHODS),
+                'status': 'completed',
+                'completed_at': paid_at,
+                'created_at': paid_at,
+                'updated_at': paid_at,
+            })
+        if len(rows) >= chunk_size:
+            db.session.execute(db.insert(Transaction), rows)
+            rows = []
+    if rows:
+        db.session.execute(db.insert(Transaction), rows)
+    for start in range(0, len(payment_rows), chunk_size):
+        db.session.execute(db.insert(Payment), payment_rows[start:start + chunk_size])
+
+    db.session.commit()
+    SalesRollupService.rebuild()
+    return {'merchant_id': merchant.id, 'owner_id': owner.id, 'branch_ids': branch_ids, 'customer_ids': customer_ids}
+
+
+# ==================== Transaction Report ====================
+
+def legacy_transaction_report(merchant_id, from_date, to_date, group_by):
+    """Previous implementation: load every row and bucket it in Python"""
+    transactions = Transaction.query.filter(
+        Transaction.merchant_id == merchant_id,
+        Transaction.created_at >= from_date,
+        Transaction.created_at <= to_date
+    ).order_by(Transaction.created_at).all()
+
+    formats = {'day': '%Y-%m-%d', 'week': '%Y-W%W', 'month': '%Y-%m'}
+    grouped = {}
+    for t in transactions:
+        key = t.created_at.strftime(formats.get(group_by, '%Y-%m-%d'))
+        if key not in grouped:
+            grouped[key] = {'date': key, 'count': 0, 'amount': 0, 'paid': 0}
+        grouped[key]['count'] += 1
+        grouped[key]['amount'] += float(t.total_amount or 0)
+        grouped[key]['paid'] += float(t.paid_amount or 0)
+    db.session.expunge_all()
+    return list(grouped.values())
+
+
+def bench_transaction_report(args):
+    from app.services.report_service import ReportService
+
+    seeded = seed_benchmark_data(transactions=args.transactions, days=args.days)
+    to_date = datetime.utcnow() + timedelta(days=1)
+    from_date = to_date - timedelta(days=args.days + 1)
+
+    print(f"Transaction report: {args.transactions} transactions over {args.days} days")
+    for group_by in ('day', 'week', 'month'):
+        current = ReportService.get_transaction_report(
+            seeded['merchant_id'], staff_id=seeded['owner_id'],
+            from_date=from_date, to_date=to_date, group_by=group_by
+        )['data']['data']
+        legacy = legacy_transaction_report(seeded['merchant_id'], from_date, to_date, group_by)
+        assert [(r['date'], r['count']) for r in current] == [(r['date'], r['count']) for r in legacy], \
+            f'bucket mismatch for group_by={group_by}'
+
+        print(f" group_by={group_by} ({len(current)} buckets)")
+        report('python grouping (legacy)', timed(
+            lambda: legacy_transaction_report(seeded['merchant_id'], from_date, to_date, group_by),
+            args.repeat
+        ))
+        report('sql grouping', timed(
+            lambda: ReportService.get_transaction_report(
+                seeded['merchant_id'], staff_id=seeded['owner_id'],
+                from_date=from_date, to_date=to_date, group_by=group_by
+            ),
+            args.repeat
+        ))
+
+
+# ==================== Financial Report ====================
+
+def legacy_financial_report(from_date, to_date):
+    """Previous implementation: load transactions and payments, look up merchants one by one"""
+    transactions = Transaction.query.filter(
+        Transaction.created_at >= from_date,
+        Transaction.created_at <= to_date
+    ).all()
+    payments = Payment.query.filter(
+        Payment.created_at >= from_date,
+        Payment.created_at <= to_date,
+        Payment.status == 'completed'
+    ).all()
+
+    rates = {}
+    daily = {}
+    for t in transactions:
+        if t.merchant_id not in rates:
+            merchant = Merchant.query.get(t.merchant_id)
+            rates[t.merchant_id] = float(merchant.commission_rate or 2.5) if merchant else 2.5
+        day = t.created_at.strftime('%Y-%m-%d')
+        if day not in daily:
+            daily[day] = {'date': day, 'transactions_count': 0, 'revenue': 0, 'payments': 0, 'commission': 0}
+        daily[day]['transactions_count'] += 1
+        daily[day]['revenue'] += float(t.total_amount or 0)
+        daily[day]['commission'] += float(t.paid_amount or 0) * 0.025
+
+    payment_methods = {}
+    for p in payments:
+        day = p.created_at.strftime('%Y-%m-%d')
+        if day in daily:
+            daily[day]['payments'] += float(p.amount or 0)
+        method = p.payment_method or 'other'
+        payment_methods[method] = payment_methods.get(method, 0) + float(p.amount or 0)
+
+    db.session.expunge_all()
+    return sorted(daily.values(), key=lambda x: x['date']), payment_methods
+
+
+def bench_financial_report(args):
+    from app.services.report_service import ReportService
+
+    seed_benchmark_data(transactions=args.transactions, days=args.days)
+    to_day = datetime.utcnow().date()
+    from_day = to_day - timedelta(days=args.days)
+    from_date = datetime.combine(from_day, datetime.min.time())
+    to_date = datetime.combine(to_day, datetime.max.time())
+
+    current = ReportService.get_financial_report(from_date=from_day.isoformat(), to_date=to_day.isoformat())['data']
+    legacy_daily, legacy_methods = legacy_financial_report(from_date, to_date)
+    assert [(d['date'], d['transactions_count']) for d in current['daily_breakdown']] == \
+        [(d['date'], d['transactions_count']) for d in legacy_daily], 'daily breakdown mismatch'
+    assert sorted(current['payment_methods']) == sorted(legacy_methods), 'payment methods mismatch'
+
+    print(f"Financial report: {args.transactions} transactions over {args.days} days")
+    report('python aggregation (legacy)', timed(lambda: legacy_financial_report(from_date, to_date), args.repeat))
+    report('sql aggregation', timed(
+        lambda: ReportService.get_financial_report(from_date=from_day.isoformat(), to_date=to_day.isoformat()),
+        args.repeat
+    ))
+
+
+# ==================== Admin Analytics ====================
+
+def bench_admin_analytics(args):
+    from flask import current_app
+    from app.services.analytics_snapshot_service import AnalyticsSnapshotService
+    from app.services.report_service import ReportService
+
+    seed_benchmark_data(transactions=args.transactions, days=args.days)
+    from_date = (datetime.utcnow() - timedelta(days=args.days + 1)).strftime('%Y-%m-%d')
+    to_date = (datetime.utcnow() + timedelta(days=1)).strftime('%Y-%m-%d')
+
+    def run(report_type, snapshot):
+        current_app.config['ANALYTICS_SNAPSHOT_ENABLED'] = snapshot
+        result = ReportService.get_admin_overview(from_date=from_date, to_date=to_date, report_type=report_type)
+        db.session.expunge_all()
+        return result
+
+    started = time.perf_counter()
+    AnalyticsSnapshotService.refresh(full=True)
+    print(f"Admin analytics: {args.transactions} transactions over {args.days} days")
+    print(f"  snapshot build {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    for report_type in ('overview', 'transactions', 'customers'):
+        database, snapshot = run(report_type, False)['data'], run(report_type, True)['data']
+        for field in ('total_transactions', 'overdue_amount', 'total_customers', 'credit_utilization'):
+            if field in database:
+                assert abs(database[field] - snapshot[field]) < 0.01, f'{report_type}.{field} mismatch'
+
+        print(f" report_type={report_type}")
+        report('orm loops (database)', timed(lambda: run(report_type, False), args.repeat))
+        report('numpy snapshot', timed(lambda: run(report_type, True), args.repeat))
+
+
+# ==================== Customer Search ====================
+
+FIRST_NAMES_AR = ['أحمد', 'إبراهيم', 'آمنة', 'فاطمة', 'مصطفى', 'عائشة', 'يوسف', 'مريم', 'عبدالله', 'نورة']
+FAMILY_NAMES_AR = ['الأحمدي', 'القحطاني', 'العتيبي', 'الشهري', 'الدوسري', 'الزهراني', 'المطيري', 'الغامدي']
+NAMES_EN = ['Ahmed', 'Ibrahim', 'Amina', 'Fatima', 'Mustafa', 'Aisha', 'Yousef', 'Mariam', 'Abdullah', 'Noura']
+
+
+def seed_search_customers(count, chunk_size=5000):
+    """Bulk insert customers with varied Arabic names, then build their search documents"""
+    from app.utils.customer_search import customer_search
+
+    now = datetime.utcnow()
+    rows = []
+    for i in range(count):
+        first = random.randrange(len(FIRST_NAMES_AR))
+        rows.append({
+            'id': str(uuid.uuid4()),
+            'bariq_id': f'{100000 + i}',
+            'national_id': f'1{i:09d}',
+            'full_name_ar': f'{FIRST_NAMES_AR[first]} {random.choice(FAMILY_NAMES_AR)}',
+            'full_name_en': NAMES_EN[first],
+            'email': f'customer{i}@example.sa',
+            'phone': f'05{i:08d}',
+            'status': 'active',
+            'credit_limit': 5000,
+            'available_credit': 5000,
+            'used_credit': 0,
+            'language': 'ar',
+            'notifications_enabled': True,
+            'created_at': now - timedelta(seconds=i),
+            'updated_at': now,
+        })
+        if len(rows) >= chunk_size:
+            db.session.execute(db.insert(Customer), rows)
+            rows = []
+    if rows:
+        db.session.execute(db.insert(Customer), rows)
+    db.session.commit()
+    # Bulk inserts skip the mapper events that maintain search_text
+    customer_search.rebuild(chunk_size=chunk_size)
+
+
+def legacy_customer_search(search):
+    search_term = f'%{search}%'
+    query = Customer.query.filter(db.or_(
+        Customer.full_name_ar.ilike(search_term),
+        Customer.full_name_en.ilike(search_term),
+        Customer.email.ilike(search_term),
+        Customer.phone.ilike(search_term),
+        Customer.bariq_id.ilike(search_term),
+        Customer.national_id.ilike(search_term)
+    ))
+    return query.order_by(Customer.created_at.desc()).paginate(page=1, per_page=20, error_out=False)
+
+
+def indexed_customer_search(search):
+    from app.utils.customer_search import customer_search
+    query = customer_search.filter_query(Customer.query, search)
+    return query.order_by(Customer.created_at.desc()).paginate(page=1, per_page=20, error_out=False)
+
+
+def bench_customer_search(args):
+    from app.utils.customer_search import customer_search
+
+    started = time.perf_counter()
+    seed_search_customers(args.customers)
+    print(f"Customer search: {args.customers} customers")
+    print(f"  seed + search_text backfill {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    started = time.perf_counter()
+    customer_search.filter_query(Customer.query, 'warm-up')
+    print(f"  index build {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    # Rare and common terms; 'احمد' (no hamza) is only found by the normalized search
+    for term in ('0500001234', 'customer1234@', 'Mustafa', 'القحطاني', 'احمد'):
+        legacy_total = legacy_customer_search(term).total
+        indexed_total = indexed_customer_search(term).total
+        assert indexed_total >= legacy_total, f'{term}: indexed search missed matches'
+        db.session.expunge_all()
+
+        print(f" search={term!r} (legacy {legacy_total} matches, indexed {indexed_total})")
+        report('ilike over columns (legacy)', timed(lambda: legacy_customer_search(term), args.repeat))
+        report('search index', timed(lambda: indexed_customer_search(term), args.repeat))
+
+
+# ==================== Pagination ====================
+
+def bench_pagination(args):
+    from app.services.transaction_service import TransactionService
+    from app.utils.pagination import encode_cursor
+
+    seeded = seed_benchmark_data(transactions=args.transactions, days=args.days)
+    per_page = 20
+    last_page = (args.transactions + per_page - 1) // per_page
+
+    def list_page(**kwargs):
+        result = TransactionService.get_merchant_transactions(
+            merchant_id=seeded['merchant_id'], staff_id=seeded['owner_id'], per_page=per_page, **kwargs
+        )
+        db.session.expunge_all()
+        return result
+
+    print(f"Pagination: {args.transactions} transactions, {per_page} per page")
+    for page in sorted({1, last_page // 10, last_page // 2, last_page}):
+        # Cursor for the row just before this page, in the listing's (transaction_date, id) order
+        previous = Transaction.query.filter_by(merchant_id=seeded['merchant_id']) \
+            .order_by(Transaction.transaction_date.desc(), Transaction.id.desc()) \
+            .offset((page - 1) * per_page - 1).first() if page > 1 else None
+        cursor = encode_cursor('transaction_date', previous.transaction_date, previous.id) if previous else None
+
+        offset_ids = [t['id'] for t in list_page(page=page)['data']['transactions']]
+        cursor_ids = [t['id'] for t in list_page(cursor=cursor, include_total=False)['data']['transactions']]
+        assert offset_ids == cursor_ids, f'page {page} mismatch'
+
+        print(f" page={page}")
+        report('offset + count', timed(lambda: list_page(page=page), args.repeat))
+        report('offset, no count', timed(lambda: list_page(page=page, include_total=False), args.repeat))
+        report('cursor, no count', timed(lambda: list_page(cursor=cursor, include_total=False), args.repeat))
+
+
+# ==================== Statement Counting ====================
+
+def count_queries(fn):
+    """Run fn and return how many SQL statements it executed"""
+    from sqlalchemy import event
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        fn()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    return len(statements)
+
+
+# ==================== Serialization ====================
+
+def bench_serialization(args):
+    """to_dict() + the standard JSON provider against the precompiled serializers + orjson"""
+    import json
+    from flask import current_app
+    from flask.json.provider import DefaultJSONProvider
+    from app.schemas.serializers import serialize_transaction, serialize_payment
+    from app.utils.json_provider import ORJSON_AVAILABLE, OrjsonProvider
+
+    seeded = seed_benchmark_data(transactions=args.transactions, days=args.days)
+    transactions = Transaction.query.filter_by(merchant_id=seeded['merchant_id']).limit(args.page_size).all()
+    payments = Payment.query.join(Transaction) \
+        .filter(Transaction.merchant_id == seeded['merchant_id']).limit(args.page_size).all()
+
+    app = current_app._get_current_object()
+    standard = DefaultJSONProvider(app)
+    fast = OrjsonProvider(app) if ORJSON_AVAILABLE else standard
+    if not ORJSON_AVAILABLE:
+        print('orjson not installed: timing the serializers with the standard encoder')
+
+    for label, rows, serializer in (
+        ('transactions', transactions, serialize_transaction),
+        ('payments', payments, serialize_payment),
+    ):
+        if not rows:
+            continue
+        legacy_body = standard.dumps({'data': [row.to_dict() for row in rows]})
+        fast_body = fast.dumps({'data': [serializer(row) for row in rows]})
+        assert json.loads(legacy_body) == json.loads(fast_body), f'{label} serializer differs from to_dict()'
+
+        print(f"Serialization: page of {len(rows)} {label}")
+        report('to_dict()', timed(lambda: [row.to_dict() for row in rows], args.repeat))
+        report('serializer', timed(lambda: [serializer(row) for row in rows], args.repeat))
+        report('to_dict() + json', timed(
+            lambda: standard.dumps({'data': [row.to_dict() for row in rows]}), args.repeat))
+        report('serializer + orjson', timed(
+            lambda: fast.dumps({'data': [serializer(row) for row in rows]}), args.repeat))
+
+
+# ==================== Insert Throughput ====================
+
+def bench_insert_throughput(args):
+    """Inserts keyed by random UUIDv4 against time-ordered UUIDv7, into an indexed scratch table"""
+    from sqlalchemy import Column, DateTime, MetaData, String, Table
+    from app.models.mixins import UUIDMixin, generate_uuid7
+
+    generators = {'uuid4': UUIDMixin.generate_uuid, 'uuid7': generate_uuid7}
+    rows_per_commit = 1000
+
+    print(f"Insert throughput: {args.transactions} rows, {rows_per_commit} per commit")
+    for label, generate in generators.items():
+        # Shaped like notifications: string primary key plus an indexed foreign key and timestamp
+        table = Table(
+            f'benchmark_keys_{label}', MetaData(),
+            Column('id', String(36), primary_key=True),
+            Column('customer_id', String(36), index=True),
+            Column('title', String(200)),
+            Column('created_at', DateTime, index=True),
+        )
+        table.drop(db.engine, checkfirst=True)
+        table.create(db.engine)
+
+        customer_ids = [str(uuid.uuid4()) for _ in range(1000)]
+        started = time.perf_counter()
+        for offset in range(0, args.transactions, rows_per_commit):
+            now = datetime.utcnow()
+            db.session.execute(table.insert(), [
+                {'id': generate(), 'customer_id': random.choice(customer_ids), 'title': 'benchmark', 'created_at': now}
+                for _ in range(min(rows_per_commit, args.transactions - offset))
+            ])
+            db.session.commit()
+        elapsed = time.perf_counter() - started
+
+        size = ''
+        if db.engine.dialect.name == 'postgresql':
+            index_bytes = db.session.execute(db.text(
+                f"SELECT pg_relation_size('{table.name}_pkey')"
+            )).scalar()
+            size = f"   pkey {index_bytes / 1024 / 1024:8.1f} MB"
+        print(f"  {label:<28} {args.transactions / elapsed:10.0f} rows/s{size}")
+        table.drop(db.engine)
+
+
+# ==================== Bulk Payment ====================
+
+def legacy_bulk_payment(customer_id, total_amount):
+    """Previous implementation: one Payment object and one rollup update per transaction"""
+    customer = db.session.get(Customer, customer_id)
+    outstanding = Transaction.query.filter(
+        Transaction.customer_id == customer_id,
+        Transaction.status.in_(['confirmed', 'overdue'])
+    ).order_by(Transaction.due_date.asc()).all()
+
+    remaining_payment = total_amount
+    for txn in outstanding:
+        if remaining_payment <= 0:
+            break
+        payment_for_txn = min(remaining_payment, txn.remaining_amount)
+        db.session.add(Payment(
+            transaction_id=txn.id, customer_id=customer_id, amount=payment_for_txn,
+            payment_method='cash', status='completed', completed_at=datetime.utcnow()
+        ))
+        previous = SalesRollupService.snapshot(txn)
+        txn.paid_amount = float(txn.paid_amount) + payment_for_txn
+        txn.updated_at = datetime.utcnow()
+        if txn.remaining_amount <= 0:
+            txn.status = 'paid'
+            txn.paid_at = datetime.utcnow()
+        SalesRollupService.record_transaction(txn, previous)
+        remaining_payment -= payment_for_txn
+    customer.release_credit(total_amount)
+    db.session.commit()
+
+
+def bench_bulk_payment(args):
+    """Paying off a customer's outstanding transactions: per-row ORM loop against the bulk write path"""
+    from app.services.payment_service import PaymentService
+
+    seed_benchmark_data(transactions=0, days=args.days)
+    merchant_id = db.session.query(Merchant.id).order_by(Merchant.created_at.desc()).limit(1).scalar()
+    branch_id = db.session.query(Branch.id).filter(Branch.merchant_id == merchant_id).limit(1).scalar()
+    per_customer = 50
+    now = datetime.utcnow()
+
+    def customer_with_debt():
+        customer_id = str(uuid.uuid4())
+        db.session.execute(db.insert(Customer), [{
+            'id': customer_id, 'national_id': uuid.uuid4().hex[:10], 'full_name_ar': 'عميل',
+            'phone': uuid.uuid4().hex[:12], 'status': 'active', 'credit_limit': 100000,
+            'available_credit': 100000 - per_customer * 100, 'used_credit': per_customer * 100,
+            'language': 'ar', 'notifications_enabled': True, 'created_at': now, 'updated_at': now,
+        }])
+        db.session.execute(db.insert(Transaction), [{
+            'id': str(uuid.uuid4()), 'reference_number': f'BLK-{uuid.uuid4().hex[:12]}',
+            'customer_id': customer_id, 'merchant_id': merchant_id, 'branch_id': branch_id,
+            'subtotal': 100, 'discount': 0, 'total_amount': 100, 'items': [],
+            'transaction_date': now - timedelta(days=i), 'due_date': (now + timedelta(days=i)).date(),
+            'status': 'confirmed', 'paid_amount': 0, 'returned_amount': 0,
+            'created_at': now - timedelta(days=i), 'updated_at': now,
+        } for i in range(per_customer)])
+        db.session.commit()
+        return customer_id
+
+    amount = per_customer * 100 - 50
+    print(f"Bulk payment: {amount} SAR across {per_customer} outstanding transactions")
+    for label, pay in (
+        ('per-row loop (legacy)', lambda customer_id: legacy_bulk_payment(customer_id, amount)),
+        ('bulk write path', lambda customer_id: PaymentService.make_bulk_payment(customer_id, amount)),
+    ):
+        customers = [customer_with_debt() for _ in range(args.repeat + 1)]
+        statements = count_queries(lambda: pay(customers.pop()))
+        report(f'{label}, {statements} queries', timed(lambda: pay(customers.pop()), args.repeat))
+
+
+# ==================== Payment Reminders ====================
+
+def legacy_payment_reminders(reminder_days):
+    """send_payment_reminders before the batched pipeline: a query per offset, a commit per reminder"""
+    from app.models import Notification
+
+    today = datetime.utcnow().date()
+    for days in reminder_days:
+        for txn in Transaction.query.filter(
+            Transaction.status == 'confirmed',
+            Transaction.due_date == today + timedelta(days=days)
+        ).all():
+            db.session.add(Notification(
+                customer_id=txn.customer.id, title_ar='تذكير', body_ar=txn.reference_number,
+                type='payment_reminder', related_entity_type='transaction', related_entity_id=txn.id
+            ))
+            db.session.commit()
+
+
+def bench_payment_reminders(args):
+    """Daily payment reminders: per-row loop against the batched pipeline"""
+    from app.models import Notification
+    from app.models.device import CustomerDevice
+    from app.services.payment_service import PaymentService
+
+    reminder_days = [3, 1, 0]
+    today = datetime.utcnow().date()
+    now = datetime.utcnow()
+
+    # Both paths remind (and push to) every customer with a transaction due on these days
+    due_elsewhere = db.session.query(db.func.count(Transaction.id)).filter(
+        Transaction.status == 'confirmed',
+        Transaction.due_date.in_([today + timedelta(days=days) for days in reminder_days])
+    ).scalar()
+    if due_elsewhere:
+        sys.exit(f'payment-reminders: {due_elsewhere} transactions already due in this database '
+                 f'would be reminded; run it on a scratch database')
+
+    seeded = seed_benchmark_data(transactions=0, days=args.days)
+    merchant_id, branch_id = seeded['merchant_id'], seeded['branch_ids'][0]
+    customer_ids = seeded['customer_ids'][:args.customers]
+
+    db.session.execute(db.insert(CustomerDevice), [{
+        'id': str(uuid.uuid4()), 'customer_id': customer_id, 'fcm_token': uuid.uuid4().hex,
+        'device_type': 'android', 'is_active': True, 'created_at': now, 'updated_at': now,
+    } for customer_id in customer_ids])
+    db.session.execute(db.insert(Transaction), [{
+        'id': str(uuid.uuid4()), 'reference_number': f'REM-{uuid.uuid4().hex[:12]}',
+        'customer_id': customer_id, 'merchant_id': merchant_id, 'branch_id': branch_id,
+        'subtotal': 100, 'discount': 0, 'total_amount': 100, 'items': [],
+        'transaction_date': now, 'due_date': today + timedelta(days=random.choice(reminder_days)),
+        'status': 'confirmed', 'paid_amount': 0, 'returned_amount': 0, 'created_at': now, 'updated_at': now,
+    } for customer_id in customer_ids for _ in range(2)])
+    db.session.commit()
+
+    seeded_transaction_ids = db.select(Transaction.id).where(Transaction.merchant_id == merchant_id)
+
+    def fresh(send):
+        # Only the reminders of the seeded transactions, so each run sends them all again
+        db.session.execute(db.delete(Notification).where(
+            Notification.related_entity_type == 'transaction',
+            Notification.related_entity_id.in_(seeded_transaction_ids)
+        ))
+        db.session.commit()
+        send()
+
+    print(f"Payment reminders: {len(customer_ids) * 2} transactions due for {len(customer_ids)} customers")
+    for label, send in (
+        ('per-row loop (legacy)', lambda: legacy_payment_reminders(reminder_days)),
+        ('batched pipeline', lambda: PaymentService.send_payment_reminders()),
+    ):
+        statements = count_queries(lambda: fresh(send))
+        report(f'{label}, {statements} queries', timed(lambda: fresh(send), args.repeat))
+
+
+# ==================== Entry Point ====================
+
+BENCHMARKS = {
+    'transaction-report': bench_transaction_report,
+    'financial-report': bench_financial_report,
+    'admin-analytics': bench_admin_analytics,
+    'customer-search': bench_customer_search,
+    'pagination': bench_pagination,
+    'serialization': bench_serialization,
+    'insert-throughput': bench_insert_throughput,
+    'bulk-payment': bench_bulk_payment,
+    'payment-reminders': bench_payment_reminders,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bariq performance benchmarks')
+    parser.add_argument('benchmark', choices=sorted(BENCHMARKS))
+    parser.add_argument('--transactions', type=int, default=100000)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--customers', type=int, default=50000)
+    parser.add_argument('--page-size', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--database-url', default=os.environ.get('BENCHMARK_DATABASE_URL'),
+                        help='Scratch database to seed (default BENCHMARK_DATABASE_URL, else in-memory SQLite)')
+    args = parser.parse_args()
+
+    # DATABASE_URL is the application's database (.env fills it in): never seed that one
+    database_url = args.database_url or 'sqlite:///:memory:'
+    if database_url == os.environ.get('DATABASE_URL'):
+        parser.error('--database-url is the application DATABASE_URL; point the benchmark at a scratch database')
+    BenchmarkConfig.SQLALCHEMY_DATABASE_URI = database_url
+    config['benchmark'] = BenchmarkConfig
+    app = create_app('benchmark')
+    # Time the queries themselves, not report cache hits
+    report_cache.enabled = False
+
+    with app.app_context():
+        db.create_all()
+        BENCHMARKS[args.benchmark](args)
+
+
+if __name__ == '__main__':
+    main()
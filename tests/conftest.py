@@ -0,0 +1,79 @@
+"""
+Test fixtures: an application on a scratch database with a merchant, branch, cashier and customers
+"""
+import os
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+
+# A file so that threads in a test share the database; TEST_DATABASE_URL points the suite elsewhere (e.g. PostgreSQL)
+os.environ.setdefault(
+    'TEST_DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='bariq-tests-'), 'bariq.db')
+)
+
+import pytest
+
+from app import create_app
+from app.extensions import db
+from app.models import Branch, Customer, Merchant, MerchantUser, Transaction
+
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def merchant(app):
+    """(merchant, branch, cashier) of an active merchant"""
+    merchant = Merchant(
+        name_ar='متجر الاختبار', commercial_registration=uuid.uuid4().hex[:10],
+        email=f'{uuid.uuid4().hex[:8]}@merchant.sa', phone=uuid.uuid4().hex[:10], status='active'
+    )
+    db.session.add(merchant)
+    db.session.flush()
+    branch = Branch(merchant_id=merchant.id, name_ar='الفرع الرئيسي', city='Riyadh', code=uuid.uuid4().hex[:6])
+    db.session.add(branch)
+    db.session.flush()
+    cashier = MerchantUser(
+        merchant_id=merchant.id, branch_id=branch.id, email=f'{uuid.uuid4().hex[:8]}@cashier.sa',
+        password_hash='-', full_name='Cashier', role='cashier'
+    )
+    db.session.add(cashier)
+    db.session.commit()
+    return merchant, branch, cashier
+
+
+@pytest.fixture
+def make_customer(app):
+    def make_customer(credit=1000, **fields):
+        customer = Customer(
+            national_id=uuid.uuid4().hex[:10], full_name_ar='عميل الاختبار', phone=uuid.uuid4().hex[:10],
+            status='active', credit_limit=credit, available_credit=credit, used_credit=0,
+            bariq_id=str(uuid.uuid4().int % 900000 + 100000), **fields
+        )
+        db.session.add(customer)
+        db.session.commit()
+        return customer
+    return make_customer
+
+
+@pytest.fixture
+def make_transaction(app, merchant):
+    def make_transaction(customer, amount=100, status='pending', **fields):
+        merchant_, branch, cashier = merchant
+        fields.setdefault('due_date', (datetime.utcnow() + timedelta(days=10)).date())
+        transaction = Transaction(
+            customer_id=customer.id, merchant_id=merchant_.id, branch_id=branch.id, cashier_id=cashier.id,
+            subtotal=amount, total_amount=amount, status=status, **fields
+        )
+        db.session.add(transaction)
+        db.session.commit()
+        return transaction
+    return make_transaction
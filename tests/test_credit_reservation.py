@@ -0,0 +1,94 @@
+"""
+Concurrent credit reservation and transaction confirmation against one customer
+"""
+import threading
+from decimal import Decimal
+
+from app.extensions import db
+from app.models import Customer, Transaction
+from app.services.transaction_service import TransactionService
+
+
+def run_threads(app, count, target):
+    """Run target(index) on count threads released together, each in its own app context"""
+    start = threading.Barrier(count)
+    errors = []
+
+    def worker(index):
+        with app.app_context():
+            start.wait()
+            try:
+                target(index)
+            except Exception as e:
+                db.session.rollback()
+                errors.append(e)
+            finally:
+                db.session.remove()
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+
+def test_concurrent_reservations_never_overdraw(app, make_customer):
+    customer_id = make_customer(credit=500).id
+    reserved = []
+
+    def reserve(index):
+        for _ in range(20):
+            customer = db.session.get(Customer, customer_id)
+            if customer.reserve_credit(10):
+                db.session.commit()
+                reserved.append(index)
+            else:
+                db.session.rollback()
+
+    errors = run_threads(app, 8, reserve)
+
+    customer = db.session.get(Customer, customer_id)
+    db.session.refresh(customer)
+    assert errors == []
+    assert len(reserved) == 50
+    assert customer.available_credit == Decimal('0')
+    assert customer.used_credit == Decimal('500')
+
+
+def test_concurrent_confirms_deduct_credit_once(app, make_customer, make_transaction):
+    customer = make_customer(credit=1000)
+    customer_id, transaction_id = customer.id, make_transaction(customer, amount=100).id
+    results = []
+
+    errors = run_threads(app, 8, lambda index: results.append(
+        TransactionService.confirm_transaction(customer_id, transaction_id)
+    ))
+
+    assert errors == []
+    assert [result['success'] for result in results].count(True) == 1
+    assert {result['error_code'] for result in results if not result['success']} == {'TXN_002'}
+    customer = db.session.get(Customer, customer_id)
+    db.session.refresh(customer)
+    assert customer.available_credit == Decimal('900')
+    assert customer.used_credit == Decimal('100')
+    assert db.session.get(Transaction, transaction_id).status == 'confirmed'
+
+
+def test_confirm_loses_to_a_concurrent_cancel(app, make_customer, make_transaction):
+    customer = make_customer(credit=1000)
+    transaction = make_transaction(customer, amount=100)
+    assert transaction.status == 'pending'
+
+    # The pending expiry sweep cancels the row behind the session's back
+    with db.engine.begin() as connection:
+        connection.execute(
+            db.update(Transaction).where(Transaction.id == transaction.id).values(status='cancelled')
+        )
+
+    result = TransactionService.confirm_transaction(customer.id, transaction.id)
+
+    assert result['error_code'] == 'TXN_002'
+    db.session.refresh(customer)
+    assert customer.available_credit == Decimal('1000')
+    assert db.session.get(Transaction, transaction.id).status == 'cancelled'
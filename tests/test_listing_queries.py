@@ -0,0 +1,119 @@
+"""
+Merchant listings run a fixed number of statements per page, whatever the page size
+"""
+import uuid
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from app.extensions import db
+from app.models import MerchantUser, Transaction, TransactionReturn
+from app.services.transaction_service import TransactionService
+
+
+PAGE_SIZES = (5, 20, 60)
+
+
+@contextmanager
+def count_statements():
+    """Collect the SQL statements executed inside the block"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+
+@pytest.fixture
+def listings(merchant, make_customer):
+    """An owner and 60 transactions across 12 customers, each with a return"""
+    merchant_, branch, cashier = merchant
+    owner = MerchantUser(
+        merchant_id=merchant_.id, email=f'{uuid.uuid4().hex[:8]}@owner.sa',
+        password_hash='-', full_name='Owner', role='owner'
+    )
+    db.session.add(owner)
+    customers = [make_customer() for _ in range(12)]
+
+    transactions = [
+        Transaction(
+            customer_id=customers[index % len(customers)].id, merchant_id=merchant_.id, branch_id=branch.id,
+            cashier_id=cashier.id, subtotal=100, total_amount=100, status='confirmed'
+        )
+        for index in range(max(PAGE_SIZES))
+    ]
+    db.session.add_all(transactions)
+    db.session.flush()
+    db.session.add_all([
+        TransactionReturn(
+            transaction_id=transaction.id, return_amount=1, reason='test',
+            processed_by=cashier.id, status='completed'
+        )
+        for transaction in transactions
+    ])
+    db.session.commit()
+    return {
+        'merchant_id': merchant_.id,
+        'owner_id': owner.id,
+        'cashier_id': cashier.id,
+        'transaction_ids': [transaction.id for transaction in transactions[:3]],
+    }
+
+
+def statements_per_page_size(list_page):
+    """Statement count of list_page(per_page) for each page size, on a cold session"""
+    counts = []
+    for per_page in PAGE_SIZES:
+        db.session.expunge_all()
+        with count_statements() as statements:
+            result = list_page(per_page)
+        assert result['success'], result
+        counts.append(len(statements))
+    return counts
+
+
+def test_merchant_transactions(listings):
+    counts = statements_per_page_size(lambda per_page: TransactionService.get_merchant_transactions(
+        merchant_id=listings['merchant_id'], staff_id=listings['owner_id'], per_page=per_page))
+    assert len(set(counts)) == 1, counts
+
+
+def test_staff_transactions(listings):
+    counts = statements_per_page_size(lambda per_page: TransactionService.get_staff_transactions(
+        listings['cashier_id'], per_page=per_page))
+    assert len(set(counts)) == 1, counts
+
+
+def test_merchant_returns(listings):
+    counts = statements_per_page_size(lambda per_page: TransactionService.get_merchant_returns(
+        merchant_id=listings['merchant_id'], staff_id=listings['owner_id'], per_page=per_page))
+    assert len(set(counts)) == 1, counts
+
+
+def test_transaction_detail(listings):
+    # The detail page has no page size: the same statements for any transaction, related rows eager-loaded
+    counts = []
+    for transaction_id in listings['transaction_ids']:
+        db.session.expunge_all()
+        with count_statements() as statements:
+            result = TransactionService.get_transaction_for_merchant(
+                listings['merchant_id'], transaction_id, staff_id=listings['owner_id'])
+        assert result['success'], result
+        assert not any('FROM customers' in statement for statement in statements[1:]), statements
+        counts.append(len(statements))
+    assert len(set(counts)) == 1, counts
+
+
+def test_pages_are_full(listings):
+    result = TransactionService.get_merchant_transactions(
+        merchant_id=listings['merchant_id'], staff_id=listings['owner_id'], per_page=PAGE_SIZES[0])
+    assert len(result['data']['transactions']) == PAGE_SIZES[0]
+    result = TransactionService.get_merchant_returns(
+        merchant_id=listings['merchant_id'], staff_id=listings['owner_id'], per_page=PAGE_SIZES[0])
+    assert len(result['data']['returns']) == PAGE_SIZES[0]
@@ -0,0 +1,175 @@
+"""
+Query plans of the hot service calls: no sequential scan of a large table
+
+Runs against the suite's database: SQLite by default, PostgreSQL when
+TEST_DATABASE_URL points at one; sequential_scans() reads the plan of either.
+"""
+import random
+import re
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app.extensions import db
+from app.models import Customer, MerchantUser, Notification, Payment, Transaction
+from app.services.customer_service import CustomerService
+from app.services.merchant_service import MerchantService
+from app.services.notification_service import NotificationService
+from app.services.payment_service import PaymentService
+from app.services.report_service import ReportService
+from app.services.settlement_service import SettlementService
+from app.services.transaction_service import TransactionService
+from app.utils.report_cache import report_cache
+
+
+# Tables that grow with usage; a sequential scan on them is a missing index
+PLAN_CHECKED_TABLES = {'transactions', 'payments', 'notifications', 'transaction_returns'}
+
+STATUSES = ['pending', 'confirmed', 'paid', 'overdue', 'cancelled']
+
+
+def hot_queries(seeded):
+    today = datetime.utcnow().date()
+    from_date = (today - timedelta(days=30)).isoformat()
+    merchant_id, owner_id, branch_id, customer_id = (
+        seeded['merchant_id'], seeded['owner_id'], seeded['branch_id'], seeded['customer_id']
+    )
+    return {
+        'merchant transactions': lambda: TransactionService.get_merchant_transactions(
+            merchant_id=merchant_id, staff_id=owner_id),
+        'staff transactions': lambda: TransactionService.get_staff_transactions(
+            owner_id, from_date=from_date, to_date=today.isoformat()),
+        'merchant dashboard': lambda: MerchantService.get_mobile_dashboard(owner_id, merchant_id),
+        'staff today activity': lambda: MerchantService.get_today_activity(owner_id, merchant_id),
+        'transaction report': lambda: ReportService.get_transaction_report(
+            merchant_id, staff_id=owner_id, from_date=from_date, to_date=today.isoformat()),
+        'customer credit details': lambda: CustomerService.get_credit_details(customer_id),
+        'customer debt': lambda: PaymentService.get_customer_debt(customer_id),
+        'customer payments': lambda: PaymentService.get_customer_payments(customer_id),
+        'customer notifications': lambda: NotificationService.get_customer_notifications(
+            customer_id, unread_only=True),
+        'staff notifications': lambda: NotificationService.get_merchant_staff_notifications(owner_id),
+        'pending settlement': lambda: SettlementService.get_pending_settlement_amount(merchant_id, branch_id),
+        'overdue sweep': lambda: TransactionService.mark_overdue_transactions(),
+    }
+
+
+HOT_QUERIES = list(hot_queries(dict.fromkeys(['merchant_id', 'owner_id', 'branch_id', 'customer_id'])))
+
+
+@pytest.fixture
+def seeded(app, merchant):
+    """An owner, 50 customers, 2000 transactions over 90 days with payments, and 200 notifications"""
+    merchant_, branch, _ = merchant
+    owner = MerchantUser(
+        merchant_id=merchant_.id, email=f'{uuid.uuid4().hex[:8]}@owner.sa',
+        password_hash='-', full_name='Owner', role='owner'
+    )
+    db.session.add(owner)
+    db.session.flush()
+
+    now = datetime.utcnow()
+    customer_ids = [str(uuid.uuid4()) for _ in range(50)]
+    db.session.execute(db.insert(Customer), [
+        {
+            'id': customer_id, 'national_id': uuid.uuid4().hex[:10], 'full_name_ar': 'عميل',
+            'phone': uuid.uuid4().hex[:10], 'status': 'active', 'credit_limit': 5000,
+            'available_credit': 5000, 'used_credit': 0, 'created_at': now, 'updated_at': now,
+        }
+        for customer_id in customer_ids
+    ])
+
+    transactions = []
+    payments = []
+    for index in range(2000):
+        created_at = now - timedelta(seconds=random.randint(0, 90 * 86400))
+        status = STATUSES[index % len(STATUSES)]
+        transactions.append({
+            'id': str(uuid.uuid4()), 'reference_number': f'TST-{index:012d}',
+            'customer_id': customer_ids[index % len(customer_ids)], 'merchant_id': merchant_.id,
+            'branch_id': branch.id, 'cashier_id': owner.id, 'subtotal': 100, 'discount': 0,
+            'total_amount': 100, 'items': [], 'transaction_date': created_at,
+            'due_date': (created_at + timedelta(days=10)).date(), 'status': status,
+            'paid_amount': 100 if status == 'paid' else 0, 'returned_amount': 0,
+            'created_at': created_at, 'updated_at': created_at,
+        })
+        if status == 'paid':
+            payments.append({
+                'id': str(uuid.uuid4()), 'reference_number': f'TPY-{index:012d}',
+                'transaction_id': transactions[-1]['id'], 'customer_id': transactions[-1]['customer_id'],
+                'amount': 100, 'payment_method': 'card', 'status': 'completed', 'completed_at': created_at,
+                'created_at': created_at, 'updated_at': created_at,
+            })
+    db.session.execute(db.insert(Transaction), transactions)
+    db.session.execute(db.insert(Payment), payments)
+    db.session.execute(db.insert(Notification), [
+        {
+            'customer_id': customer_ids[0] if index % 2 else None,
+            'merchant_user_id': None if index % 2 else owner.id,
+            'title_ar': 'تنبيه', 'body_ar': 'تنبيه', 'type': 'test', 'is_read': index % 3 == 0,
+            'created_at': now - timedelta(minutes=index), 'updated_at': now,
+        }
+        for index in range(200)
+    ])
+    db.session.commit()
+
+    # Plan the queries themselves, not report cache hits
+    report_cache.enabled = False
+    yield {
+        'merchant_id': merchant_.id, 'owner_id': owner.id,
+        'branch_id': branch.id, 'customer_id': customer_ids[0],
+    }
+    report_cache.enabled = True
+
+
+def capture_statements(fn):
+    """Run fn and return the (statement, parameters) it executed, leaving out executemany batches"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if not executemany:
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        fn()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    return statements
+
+
+def sequential_scans(statement, parameters):
+    """Plan lines of statement that read a checked table sequentially"""
+    connection = db.session.connection()
+    if db.engine.dialect.name == 'postgresql':
+        # With sequential scans priced out, one only appears when no index can serve the query
+        connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+        lines = [row[0] for row in connection.exec_driver_sql('EXPLAIN ' + statement, parameters)]
+        # Partitions (transactions_p202610, transactions_default) count as their table
+        return [
+            line.strip() for line in lines
+            if 'Seq Scan on ' in line
+            and re.sub(r'_(p\d{6}|default)$', '', line.split('Seq Scan on ')[1].split()[0]) in PLAN_CHECKED_TABLES
+        ]
+    lines = [row[3] for row in connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters)]
+    return [
+        line for line in lines
+        if line.startswith('SCAN ') and line.split()[1] in PLAN_CHECKED_TABLES
+    ]
+
+
+@pytest.mark.parametrize('label', HOT_QUERIES)
+def test_no_sequential_scans(app, seeded, label):
+    db.session.expunge_all()
+    statements = capture_statements(hot_queries(seeded)[label])
+    db.session.rollback()
+    assert statements
+
+    scans = []
+    for statement, parameters in statements:
+        if statement.lstrip().split(None, 1)[0].upper() in ('SELECT', 'UPDATE', 'DELETE', 'WITH'):
+            scans.extend(sequential_scans(statement, parameters))
+    db.session.rollback()
+    assert not scans, scans